@@ -0,0 +1,10 @@
+"""
+This module contains the benchmark suite for the classify and assemble pipelines,
+along with the synthetic library generator it runs on.
+"""
+
+# Import submodules
+from .generator import LibraryGenerator
+from .suite import BenchmarkSuite, save_results, load_results, compare_results
+
+__all__ = ["LibraryGenerator", "BenchmarkSuite", "save_results", "load_results", "compare_results"]
@@ -0,0 +1,74 @@
+"""
+Command line entry point for the benchmarks.
+
+    python -m classifier.benchmarks run --sizes 10k 100k --out results.json
+    python -m classifier.benchmarks generate library.db --files 100000
+    python -m classifier.benchmarks compare baseline.json results.json
+"""
+
+import argparse
+import json
+from classifier.utils.config import BENCHMARK_SEED, CLASSIFY_ENGINE
+from .generator import LibraryGenerator
+from .suite import BenchmarkSuite, save_results, load_results, compare_results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m classifier.benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    library = argparse.ArgumentParser(add_help=False)
+    library.add_argument("--seed", type=int, default=BENCHMARK_SEED)
+    library.add_argument("--franchise-depth", type=int, default=1)
+    library.add_argument("--franchise-share", type=float, default=0.4)
+    library.add_argument("--series-share", type=float, default=0.2)
+    library.add_argument("--genre-mix", type=json.loads, default=None, help='JSON weights, e.g. \'{"Action": 3, "Drama": 1}\'')
+
+    run = commands.add_parser("run", parents=[library], help="Run the benchmarks and write JSON results")
+    run.add_argument("--sizes", nargs="+", default=["10k"], help="Library sizes: 10k, 100k, 1M or a number of files")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--workers", type=int, default=1)
+    run.add_argument("--engine", choices=["python", "columnar"], default=CLASSIFY_ENGINE)
+    run.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    run.add_argument("--no-assemble", action="store_true", help="Skip MetAssembly.fetchType()")
+    run.add_argument("--workdir", default=None, help="Keep the generated libraries in this directory")
+    run.add_argument("--out", default="benchmark-results.json")
+
+    generate = commands.add_parser("generate", parents=[library], help="Write a synthetic library database")
+    generate.add_argument("path")
+    generate.add_argument("--files", default="10k")
+
+    compare = commands.add_parser("compare", help="Compare two results files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+
+    args = parser.parse_args(argv)
+    options = {
+        "seed": getattr(args, "seed", BENCHMARK_SEED),
+        "franchise_depth": getattr(args, "franchise_depth", 1),
+        "franchise_share": getattr(args, "franchise_share", 0.4),
+        "series_share": getattr(args, "series_share", 0.2),
+        "genre_mix": getattr(args, "genre_mix", None),
+    }
+
+    if args.command == "run":
+        suite = BenchmarkSuite(args.sizes, repeat=args.repeat, memory=not args.no_memory, workers=args.workers,
+                               engine=args.engine, assemble=not args.no_assemble, workdir=args.workdir, **options)
+        results = suite.run()
+        save_results(results, args.out)
+        for benchmark in results["benchmarks"]:
+            for name, stage in benchmark["stages"].items():
+                print("{:>9} files  {:<24} {:>9.3f}s best  {:>8} statements  {}".format(
+                    benchmark["files"], name, stage["wall_best"], stage["statements"],
+                    "skipped" if "skipped" in stage else "{:.1f} MiB peak".format(stage.get("peak_memory", 0) / 2 ** 20)))
+        print("Results written to {}".format(args.out))
+    elif args.command == "generate":
+        LibraryGenerator(BenchmarkSuite.parseSize(args.files), **options).generate(args.path)
+    else:
+        for files, name, before, after, ratio in compare_results(load_results(args.baseline), load_results(args.current)):
+            print("{:>9} files  {:<24} {:>9.3f}s -> {:>9.3f}s  {}".format(
+                files, name, before, after, "x{:.2f}".format(ratio) if ratio is not None else "n/a"))
+
+
+if __name__ == "__main__":
+    main()
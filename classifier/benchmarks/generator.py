@@ -0,0 +1,295 @@
+"""
+This module contains the LibraryGenerator class, which writes seeded synthetic
+media libraries (filepaths, filesteps, filedetails and filemetadata) for the
+benchmarks.
+"""
+
+import os
+import random
+import sqlite3
+from classifier.utils.logger import log_info
+
+SCHEMA = """
+    CREATE TABLE filepaths (
+        id INTEGER PRIMARY KEY,
+        filepath TEXT,
+        filetitle TEXT
+    );
+    CREATE TABLE filesteps (
+        filepath_id INTEGER,
+        parent TEXT,
+        child TEXT
+    );
+    CREATE TABLE filedetails (
+        file_id INTEGER,
+        title TEXT,
+        year INTEGER
+    );
+    CREATE TABLE filemetadata (
+        file_id INTEGER,
+        title TEXT,
+        year TEXT,
+        genre TEXT,
+        type TEXT,
+        rated TEXT,
+        released TEXT,
+        runtime TEXT,
+        director TEXT,
+        writer TEXT,
+        actors TEXT,
+        plot TEXT,
+        language TEXT,
+        country TEXT,
+        awards TEXT,
+        poster TEXT,
+        imdbRating TEXT,
+        imdbVotes TEXT,
+        rottenTomatoes TEXT,
+        boxOffice TEXT
+    );
+"""
+
+# Genre folders under Films and their relative weights
+DEFAULT_GENRE_MIX = {
+    "Action": 4, "Drama": 3, "Comedy": 3, "Sci-Fi": 2, "Thriller": 2, "Horror": 1, "Animation": 1,
+}
+
+WORDS = [
+    "Dark", "Last", "Silent", "Red", "Lost", "Iron", "Golden", "Hidden", "Broken", "Wild",
+    "Night", "River", "Empire", "Shadow", "Storm", "City", "Garden", "Machine", "Kingdom", "Signal",
+]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+RATINGS = ["G", "PG", "TV-PG", "PG-13", "R", "NC", "N/A"]
+LANGUAGES = ["English", "French", "Spanish", "Japanese", "Korean", "German", "Hindi"]
+COUNTRIES = ["USA", "UK", "France", "Japan", "South Korea", "Germany", "India", "Canada"]
+AWARDS = [
+    "Won {a} Oscars. {w} wins & {n} nominations total",
+    "Nominated for {a} Oscars. {w} wins & {n} nominations total",
+    "{w} wins & {n} nominations",
+    "{n} nominations",
+    "N/A",
+]
+
+
+class LibraryGenerator:
+    """
+    Generates a seeded, realistic media library database.
+
+    Movies live under E:\\Films\\<genre>\\, optionally inside franchise folders nested
+    `franchise_depth` levels deep, and episodes live under E:\\Series\\<show>\\Season N\\.
+    Every file sits in its own release folder, as the SortingHat expects. The same seed and
+    options always produce the same database.
+
+    Attributes:
+        files (int): The number of files to generate.
+        seed (int): The random seed.
+        genre_mix (dict): A dictionary where keys are genre folder names and values are their weights.
+        franchise_share (float): The share of movies that belong to a franchise.
+        franchise_depth (int): Collection levels above a franchise's movies, 1 for a plain franchise folder.
+        franchise_size (tuple): The minimum and maximum number of movies per franchise.
+        series_share (float): The share of files that are episodes.
+        metadata_share (float): The share of files that have a filemetadata row.
+        missing_share (float): The share of metadata fields set to 'N/A'.
+    """
+
+    def __init__(self, files, seed=42, genre_mix=None, franchise_share=0.4, franchise_depth=1,
+                 franchise_size=(2, 6), series_share=0.2, metadata_share=0.95, missing_share=0.1):
+        """
+        Initializes the LibraryGenerator instance.
+
+        Args:
+            files (int): The number of files to generate.
+            seed (int): The random seed.
+            genre_mix (dict): Genre folder weights, defaults to DEFAULT_GENRE_MIX.
+            franchise_share (float): The share of movies that belong to a franchise.
+            franchise_depth (int): Collection levels above a franchise's movies.
+            franchise_size (tuple): The minimum and maximum number of movies per franchise.
+            series_share (float): The share of files that are episodes.
+            metadata_share (float): The share of files that have a filemetadata row.
+            missing_share (float): The share of metadata fields set to 'N/A'.
+        """
+        self.files = files
+        self.seed = seed
+        self.genre_mix = dict(genre_mix or DEFAULT_GENRE_MIX)
+        self.franchise_share = franchise_share
+        self.franchise_depth = max(1, franchise_depth)
+        self.franchise_size = franchise_size
+        self.series_share = series_share
+        self.metadata_share = metadata_share
+        self.missing_share = missing_share
+
+    def options(self):
+        """
+        Returns the generator options, as recorded in benchmark results.
+
+        Returns:
+            dict: The options that determine the generated library.
+        """
+        return {
+            "files": self.files,
+            "seed": self.seed,
+            "genre_mix": self.genre_mix,
+            "franchise_share": self.franchise_share,
+            "franchise_depth": self.franchise_depth,
+            "franchise_size": list(self.franchise_size),
+            "series_share": self.series_share,
+            "metadata_share": self.metadata_share,
+            "missing_share": self.missing_share,
+        }
+
+    def generate(self, path, batch=10000):
+        """
+        Writes the library to a new database, replacing any existing file.
+
+        Args:
+            path (str): Path of the database to create.
+            batch (int): Rows written per executemany call.
+
+        Returns:
+            int: The number of files written.
+        """
+        log_info("Generating a %d file library at %s", self.files, path)
+        if os.path.exists(path):
+            os.remove(path)
+        self.random = random.Random(self.seed)
+        self.people = ["Person {}".format(index) for index in range(max(50, int(self.files ** 0.5) * 4))]
+        self.rows = {"filepaths": [], "filesteps": [], "filedetails": [], "filemetadata": []}
+        self.count = 0
+
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.executescript(SCHEMA)
+            self.conn = conn
+            self.batch = batch
+            episodes = int(self.files * self.series_share)
+            self.addMovies(self.files - episodes)
+            self.addSeries(episodes)
+            self.flush()
+            conn.commit()
+        self.conn = None
+        log_info("Generated %d files at %s", self.count, path)
+        return self.count
+
+    def addMovies(self, total):
+        """
+        Adds movies to the genre folders, grouping a share of them into franchises.
+
+        Args:
+            total (int): The number of movie files to add.
+        """
+        genres = list(self.genre_mix)
+        weights = [self.genre_mix[genre] for genre in genres]
+        added = 0
+        franchise = 0
+        while added < total:
+            genre = self.random.choices(genres, weights)[0]
+            base = ["E:", "Films", genre]
+            if self.random.random() < self.franchise_share:
+                franchise += 1
+                name = "{} {} {}".format(self.random.choice(WORDS), self.random.choice(WORDS), franchise)
+                # Deeper libraries nest sagas around the franchise folder
+                levels = ["{} Saga".format(name) if level else name for level in reversed(range(self.franchise_depth))]
+                size = min(self.random.randint(*self.franchise_size), total - added)
+                for part in range(size):
+                    self.addMovie(base + levels, "{} Part {}".format(name, part + 1), genre)
+                added += size
+            else:
+                self.addMovie(base, "{} {} {}".format(self.random.choice(WORDS), self.random.choice(WORDS), added), genre)
+                added += 1
+
+    def addSeries(self, total):
+        """
+        Adds shows with seasons of episodes under the Series folder.
+
+        Args:
+            total (int): The number of episode files to add.
+        """
+        added = 0
+        show = 0
+        while added < total:
+            show += 1
+            name = "{} {} Show {}".format(self.random.choice(WORDS), self.random.choice(WORDS), show)
+            genre = self.random.choice(list(self.genre_mix))
+            for season in range(1, self.random.randint(1, 5) + 1):
+                for episode in range(1, self.random.randint(6, 12) + 1):
+                    if added == total:
+                        return
+                    release = "{} S{:02d}E{:02d}".format(name, season, episode)
+                    self.addFile(["E:", "Series", name, "Season {}".format(season), release], release, genre, "episode")
+                    added += 1
+
+    def addMovie(self, folders, title, genre):
+        """
+        Adds a movie in its own release folder named after the title and year.
+
+        Args:
+            folders (list): The folders above the release folder.
+            title (str): The movie title without the year.
+            genre (str): The genre folder the movie is filed under.
+        """
+        year = self.random.randint(1960, 2024)
+        release = "{} ({})".format(title, year)
+        self.addFile(folders + [release], release, genre, "movie", year)
+
+    def addFile(self, folders, title, genre, media_type, year=None):
+        """
+        Queues the rows of one file: its path, its folder steps, its details and its metadata.
+
+        Args:
+            folders (list): The folders from the drive down to the release folder.
+            title (str): The release title, which is also the release folder name.
+            genre (str): The genre folder the release is filed under.
+            media_type (str): 'movie' or 'episode'.
+            year (int): The release year, random when None.
+        """
+        rand = self.random
+        self.count += 1
+        file_id = self.count
+        year = year or rand.randint(1960, 2024)
+        parts = folders + ["{}.mkv".format(title)]
+        self.rows["filepaths"].append((file_id, "\\".join(parts), title))
+        for parent, child in zip(parts, parts[1:]):
+            self.rows["filesteps"].append((file_id, parent, child))
+        self.rows["filedetails"].append((file_id, title, year))
+
+        if rand.random() < self.metadata_share:
+            def field(value):
+                return "N/A" if rand.random() < self.missing_share else value
+
+            genres = [genre] + rand.sample([g for g in self.genre_mix if g != genre], rand.randint(0, 2))
+            self.rows["filemetadata"].append((
+                file_id, title, str(year), ", ".join(genres), media_type,
+                field(rand.choice(RATINGS)),
+                field("{:02d} {} {}".format(rand.randint(1, 28), rand.choice(MONTHS), year)),
+                field("{} min".format(rand.randint(20, 60) if media_type == "episode" else rand.randint(80, 180))),
+                ", ".join(rand.sample(self.people, rand.randint(1, 2))),
+                ", ".join(rand.sample(self.people, rand.randint(1, 3))),
+                ", ".join(rand.sample(self.people, rand.randint(3, 6))),
+                "{} faces the {} {}. Nothing is what it seems.".format(title, rand.choice(WORDS).lower(), rand.choice(WORDS).lower()),
+                ", ".join(rand.sample(LANGUAGES, rand.randint(1, 2))),
+                ", ".join(rand.sample(COUNTRIES, rand.randint(1, 2))),
+                rand.choice(AWARDS).format(a=rand.randint(1, 5), w=rand.randint(0, 80), n=rand.randint(1, 150)),
+                field("https://posters.example/{}.jpg".format(file_id)),
+                field("{:.1f}".format(rand.uniform(3, 9.5))),
+                field("{:,}".format(rand.randint(100, 2500000))),
+                field("{}%".format(rand.randint(5, 100))),
+                field("${:,}".format(rand.randint(10000, 900000000))),
+            ))
+
+        if len(self.rows["filesteps"]) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the queued rows to the database.
+        """
+        statements = {
+            "filepaths": "INSERT INTO filepaths (id, filepath, filetitle) VALUES (?, ?, ?)",
+            "filesteps": "INSERT INTO filesteps (filepath_id, parent, child) VALUES (?, ?, ?)",
+            "filedetails": "INSERT INTO filedetails (file_id, title, year) VALUES (?, ?, ?)",
+            "filemetadata": "INSERT INTO filemetadata VALUES ({})".format(", ".join("?" * 20)),
+        }
+        for table, rows in self.rows.items():
+            self.conn.executemany(statements[table], rows)
+            rows.clear()
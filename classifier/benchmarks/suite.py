@@ -0,0 +1,322 @@
+"""
+This module contains the BenchmarkSuite class, which times the classify and
+assemble pipelines on synthetic libraries and writes the results as JSON.
+"""
+
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+from classifier.utils.config import BENCHMARK_SIZES, BENCHMARK_SEED, CLASSIFY_ENGINE
+from classifier.db.connection import close_connections
+from classifier.utils.logger import log_info, log_warning
+from .generator import LibraryGenerator
+
+# Version of the results file layout
+RESULTS_FORMAT = 1
+
+
+class StatementCounter:
+    """
+    Counts the SQL statements run on every connection opened while it is active.
+
+    The pipeline opens its own connections, so `sqlite3.connect` is wrapped to install a
+    trace callback on each new one, and the shared connections are closed on entry and exit
+    so none outlives the counter. Statements run in worker processes are not counted.
+
+    Attributes:
+        count (int): The number of statements traced so far.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.connect = None
+
+    def trace(self, statement):
+        self.count += 1
+
+    def __enter__(self):
+        close_connections()
+        self.connect = sqlite3.connect
+        original = self.connect
+
+        def connect(*args, **kwargs):
+            conn = original(*args, **kwargs)
+            conn.set_trace_callback(self.trace)
+            return conn
+
+        sqlite3.connect = connect
+        return self
+
+    def __exit__(self, *exc):
+        sqlite3.connect = self.connect
+        close_connections()
+
+
+class BenchmarkSuite:
+    """
+    Runs repeatable benchmarks of SortingHat.classify() and MetAssembly.fetchType().
+
+    Each size gets a generated library. Every repeat works on a fresh copy of it and records
+    the wall time and SQL statement count of each stage. An extra pass under tracemalloc records
+    each stage's peak Python memory, so tracing overhead never inflates the timings.
+
+    Attributes:
+        sizes (list): Library sizes in files.
+        repeat (int): Timed runs per size.
+        memory (bool): Whether to record peak memory with tracemalloc.
+        workers (int): Worker processes passed to SortingHat.classify().
+        engine (str): Classification engine passed to SortingHat.classify().
+        assemble (bool): Whether to benchmark MetAssembly.fetchType().
+        workdir (str): Directory for the generated libraries.
+        options (dict): Keyword arguments for the LibraryGenerator.
+    """
+
+    def __init__(self, sizes=("10k",), repeat=3, memory=True, workers=1, engine=CLASSIFY_ENGINE, assemble=True, workdir=None, **options):
+        """
+        Initializes the BenchmarkSuite instance.
+
+        Args:
+            sizes (iterable): Library sizes, as file counts or BENCHMARK_SIZES labels such as "100k".
+            repeat (int): Timed runs per size.
+            memory (bool): Whether to record peak memory with tracemalloc.
+            workers (int): Worker processes passed to SortingHat.classify().
+            engine (str): Classification engine passed to SortingHat.classify(), "python" or "columnar".
+            assemble (bool): Whether to benchmark MetAssembly.fetchType().
+            workdir (str): Directory for the generated libraries, a temporary directory when None.
+            **options: LibraryGenerator options such as seed, franchise_depth or genre_mix.
+        """
+        self.sizes = [self.parseSize(size) for size in sizes]
+        self.repeat = repeat
+        self.memory = memory
+        self.workers = workers
+        self.engine = engine
+        self.assemble = assemble
+        self.workdir = workdir
+        options.setdefault("seed", BENCHMARK_SEED)
+        self.options = options
+
+    @staticmethod
+    def parseSize(size):
+        """
+        Converts a size label or number into a file count.
+
+        Args:
+            size (str): A BENCHMARK_SIZES label, or a number of files.
+
+        Returns:
+            int: The number of files.
+        """
+        if isinstance(size, int):
+            return size
+        if size in BENCHMARK_SIZES:
+            return BENCHMARK_SIZES[size]
+        return int(size)
+
+    def run(self):
+        """
+        Runs the benchmarks for every size.
+
+        Returns:
+            dict: The results, see `results()`.
+        """
+        workdir = self.workdir or tempfile.mkdtemp(prefix="classifier-bench-")
+        os.makedirs(workdir, exist_ok=True)
+        benchmarks = []
+        try:
+            for files in self.sizes:
+                benchmarks.append(self.runSize(files, workdir))
+        finally:
+            if not self.workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+        return self.results(benchmarks)
+
+    def runSize(self, files, workdir):
+        """
+        Generates a library of the given size and benchmarks every stage on it.
+
+        Args:
+            files (int): The number of files.
+            workdir (str): Directory for the generated library.
+
+        Returns:
+            dict: The benchmark entry for this size.
+        """
+        generator = LibraryGenerator(files, **self.options)
+        library = os.path.join(workdir, "library-{}.db".format(files))
+        start = time.perf_counter()
+        generator.generate(library)
+        generate_time = time.perf_counter() - start
+
+        runs = []
+        for index in range(self.repeat):
+            log_info("Benchmark run %d of %d on %d files", index + 1, self.repeat, files)
+            runs.append(self.runPipeline(library, workdir, trace_memory=False))
+        peaks = self.runPipeline(library, workdir, trace_memory=True) if self.memory else {}
+
+        stages = {}
+        for name in runs[0]:
+            walls = [run[name]["wall"] for run in runs]
+            stages[name] = {
+                "wall": walls,
+                "wall_best": min(walls),
+                "wall_median": statistics.median(walls),
+                "statements": runs[-1][name]["statements"],
+            }
+            if "peak_memory" in peaks.get(name, {}):
+                stages[name]["peak_memory"] = peaks[name]["peak_memory"]
+            if "skipped" in runs[0][name]:
+                stages[name]["skipped"] = runs[0][name]["skipped"]
+        return {
+            "files": files,
+            "generator": generator.options(),
+            "generate_time": generate_time,
+            "repeat": self.repeat,
+            "workers": self.workers,
+            "engine": self.engine,
+            "stages": stages,
+        }
+
+    def runPipeline(self, library, workdir, trace_memory):
+        """
+        Runs the pipeline stages once on a fresh copy of the library.
+
+        Args:
+            library (str): Path of the generated library.
+            workdir (str): Directory for the working copy.
+            trace_memory (bool): Record each stage's peak memory instead of relying on its timings.
+
+        Returns:
+            dict: A dictionary where keys are stage names and values are their measurements.
+        """
+        from classifier.sortinghat.sorter import SortingHat
+
+        dbpath = os.path.join(workdir, "work.db")
+        for path in (dbpath, dbpath + "-wal", dbpath + "-shm", dbpath + ".snapshot"):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.copy(library, dbpath)
+
+        stages = {}
+        hat = self.measure(stages, "sortinghat.init", lambda: SortingHat(dbpath, snapshot=dbpath + ".snapshot"), trace_memory)
+        self.measure(stages, "sortinghat.classify", lambda: hat.classify(workers=self.workers, engine=self.engine), trace_memory)
+        self.measure(stages, "sortinghat.warm_init", lambda: SortingHat(dbpath, snapshot=dbpath + ".snapshot"), trace_memory)
+        if self.assemble:
+            try:
+                from classifier.metadata.assembler import MetAssembly
+            except ImportError as e:
+                log_warning("Skipping the assembly benchmark: %s", e)
+                stages["metassembly.fetchType"] = {"wall": 0.0, "statements": 0, "skipped": str(e)}
+            else:
+                self.measure(stages, "metassembly.fetchType", lambda: MetAssembly(dbpath).fetchType(), trace_memory)
+        return stages
+
+    @staticmethod
+    def measure(stages, name, stage, trace_memory):
+        """
+        Runs one stage and records its wall time, SQL statement count and optionally its peak memory.
+
+        Args:
+            stages (dict): The run's measurements, updated in place.
+            name (str): The stage name.
+            stage (callable): The stage to run.
+            trace_memory (bool): Whether to record the stage's peak memory with tracemalloc.
+
+        Returns:
+            The stage's return value.
+        """
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            with StatementCounter() as counter:
+                start = time.perf_counter()
+                result = stage()
+                wall = time.perf_counter() - start
+            stages[name] = {"wall": wall, "statements": counter.count}
+            if trace_memory:
+                stages[name]["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+        return result
+
+    @staticmethod
+    def results(benchmarks):
+        """
+        Wraps benchmark entries with the environment they were measured in.
+
+        Args:
+            benchmarks (list): Benchmark entries from runSize.
+
+        Returns:
+            dict: The results document.
+        """
+        return {
+            "format": RESULTS_FORMAT,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "benchmarks": benchmarks,
+        }
+
+
+def save_results(results, path):
+    """
+    Writes benchmark results to a JSON file.
+
+    Args:
+        results (dict): The results document from BenchmarkSuite.run().
+        path (str): The output file path.
+    """
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    """
+    Reads benchmark results from a JSON file.
+
+    Args:
+        path (str): The results file path.
+
+    Returns:
+        dict: The results document.
+    """
+    with open(path) as f:
+        results = json.load(f)
+    if results.get("format") != RESULTS_FORMAT:
+        raise ValueError("Unsupported benchmark results format in {}: {}".format(path, results.get("format")))
+    return results
+
+
+def compare_results(baseline, current):
+    """
+    Compares the stages two results documents have in common.
+
+    Args:
+        baseline (dict): The reference results, e.g. from the last release.
+        current (dict): The results to check.
+
+    Returns:
+        list: (files, stage, baseline seconds, current seconds, ratio) tuples using each stage's best wall time.
+    """
+    before = {
+        (benchmark["files"], name): stage["wall_best"]
+        for benchmark in baseline["benchmarks"] for name, stage in benchmark["stages"].items()
+    }
+    rows = []
+    for benchmark in current["benchmarks"]:
+        for name, stage in benchmark["stages"].items():
+            key = (benchmark["files"], name)
+            if key in before and "skipped" not in stage:
+                ratio = stage["wall_best"] / before[key] if before[key] else None
+                rows.append((benchmark["files"], name, before[key], stage["wall_best"], ratio))
+    return rows
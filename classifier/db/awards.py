@@ -0,0 +1,277 @@
+"""
+Typed award counts parsed from the filemetadata awards strings.
+
+OMDb summarizes awards as text such as "Won 2 Oscars. 45 wins & 120 nominations total" or,
+in older records, "Nominated for 1 Golden Globe. Another 3 wins & 7 nominations.". The
+fileawards table keeps each file's counts as integers: Oscars won, Oscar nominations, and
+the other wins and nominations. A franchise's totals are then one grouped SUM over
+filesteps, and format_awards() renders them as 'Total: X wins & Y nominations'.
+
+Triggers on filemetadata queue the file_id of every inserted, updated or deleted row in
+awardspending, and ingest_awards() parses the queued files, as ingest_people() does for
+names. Strings the parser does not recognize are stored with parsed = 0, so their
+franchises can fall back to text generation. OMDb's 'N/A' placeholder is not stored.
+"""
+
+import re
+from classifier.db.connection import execute_script
+
+# Values that stand for missing awards
+MISSING_AWARDS = ("", "N/A")
+
+# Files parsed per batch
+INGEST_BATCH = 5000
+
+# Folders summed per statement, below SQLite's bound parameter limit
+LOOKUP_BATCH = 500
+
+# "Won 2 Oscars", "Nominated for 1 Golden Globe"
+AWARDS_HEADLINE = re.compile(r"^(Won|Nominated for) (\d+) (.+)$")
+
+# "45 wins & 120 nominations total", "Another 3 wins & 7 nominations", "1 win", "12 nominations"
+AWARDS_COUNTS = re.compile(r"^(Another )?(?:(\d+) wins?(?: & (\d+) nominations?)?|(\d+) nominations?)( total)?$")
+
+AWARDS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS fileawards (
+        file_id INTEGER PRIMARY KEY,
+        oscar_wins INTEGER,
+        oscar_nominations INTEGER,
+        wins INTEGER,
+        nominations INTEGER,
+        parsed INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS awardspending (
+        file_id INTEGER PRIMARY KEY
+    );
+
+    CREATE INDEX IF NOT EXISTS filesteps_parent ON filesteps (parent, filepath_id);
+    CREATE INDEX IF NOT EXISTS filemetadata_file_id ON filemetadata (file_id);
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_awards_insert AFTER INSERT ON filemetadata
+    BEGIN
+        INSERT OR IGNORE INTO awardspending (file_id) VALUES (NEW.file_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_awards_update AFTER UPDATE OF file_id, awards ON filemetadata
+    BEGIN
+        INSERT OR IGNORE INTO awardspending (file_id) VALUES (OLD.file_id), (NEW.file_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_awards_delete AFTER DELETE ON filemetadata
+    BEGIN
+        INSERT OR IGNORE INTO awardspending (file_id) VALUES (OLD.file_id);
+    END;
+"""
+
+# The summed counts of the files directly under one folder
+FOLDER_AWARDS_QUERY = """
+    SELECT COUNT(*), SUM(fileawards.parsed), SUM(fileawards.oscar_wins), SUM(fileawards.oscar_nominations),
+           SUM(fileawards.wins), SUM(fileawards.nominations)
+    FROM filesteps
+    JOIN filepaths ON filepaths.id = filesteps.filepath_id
+    JOIN fileawards ON fileawards.file_id = filepaths.id
+    WHERE filesteps.parent = ?
+"""
+
+
+def install_awards(conn):
+    """
+    Creates the award tables and triggers, queueing every existing file on first install.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+
+    Returns:
+        bool: True if the tables were created by this call.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fileawards'").fetchone()
+    execute_script(conn, AWARDS_SCHEMA)
+    if not exists:
+        conn.execute("INSERT OR IGNORE INTO awardspending (file_id) SELECT file_id FROM filemetadata WHERE file_id IS NOT NULL")
+    return not exists
+
+
+def parse_awards(value):
+    """
+    Parses an OMDb awards string into typed counts.
+
+    Oscars named in the headline are counted apart from the other awards. A "total" count
+    includes the headline's awards, while an "Another" count comes on top of them; a total
+    below the headline count is read as covering only the headline.
+
+    Args:
+        value (str): A value such as 'Won 2 Oscars. 45 wins & 120 nominations total'.
+
+    Returns:
+        dict: The "oscar_wins", "oscar_nominations", "wins" (other wins) and "nominations" (other nominations),
+            or None if the string is not recognized.
+    """
+    sentences = [sentence.strip() for sentence in value.strip().rstrip(".").split(". ")]
+    counts = {"oscar_wins": 0, "oscar_nominations": 0, "wins": 0, "nominations": 0}
+
+    headline = AWARDS_HEADLINE.match(sentences[0])
+    won = nominated = 0
+    if headline:
+        sentences.pop(0)
+        number = int(headline.group(2))
+        if headline.group(1) == "Won":
+            won = number
+        else:
+            nominated = number
+        if re.fullmatch(r"(Academy Awards?|Oscars?)", headline.group(3)):
+            counts["oscar_wins"], counts["oscar_nominations"] = won, nominated
+            won = nominated = 0
+    if len(sentences) > 1 or (not headline and not sentences):
+        return None
+
+    wins = nominations = 0
+    if sentences:
+        match = AWARDS_COUNTS.match(sentences[0])
+        if match is None or (match.group(1) and match.group(5)) or (match.group(1) and not headline):
+            return None
+        wins = int(match.group(2) or 0)
+        nominations = int(match.group(3) or match.group(4) or 0)
+        if not match.group(1):
+            # A total already includes the headline's awards; the Oscars among them are counted apart
+            wins = max(0, wins - counts["oscar_wins"])
+            nominations = max(0, nominations - counts["oscar_nominations"])
+            won = nominated = 0
+    counts["wins"] = wins + won
+    counts["nominations"] = nominations + nominated
+    return counts
+
+
+def format_awards(counts):
+    """
+    Renders award counts in the franchiseassemble awards format.
+
+    Args:
+        counts (dict): Counts as returned by parse_awards, or sums of them.
+
+    Returns:
+        str: 'Total: X wins & Y nominations', Oscars included.
+    """
+    return "Total: {} wins & {} nominations".format(
+        counts["oscar_wins"] + counts["wins"], counts["oscar_nominations"] + counts["nominations"]
+    )
+
+
+def ingest_awards(conn, batch=INGEST_BATCH):
+    """
+    Parses the awards of every queued file and empties the queue.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        batch (int): Files parsed per statement batch.
+
+    Returns:
+        int: The number of files ingested.
+    """
+    cursor = conn.cursor()
+    files = 0
+    while True:
+        pending = [row[0] for row in cursor.execute("SELECT file_id FROM awardspending ORDER BY file_id LIMIT ?", (batch,))]
+        if not pending:
+            break
+        marks = ", ".join("?" * len(pending))
+        rows = {}
+        cursor.execute("SELECT file_id, awards FROM filemetadata WHERE file_id IN ({})".format(marks), pending)
+        for file_id, value in cursor.fetchall():
+            if value is None or value.strip() in MISSING_AWARDS:
+                continue
+            counts = parse_awards(value)
+            row = rows.setdefault(file_id, [0, 0, 0, 0, 1])
+            if counts is None or row[4] == 0:
+                rows[file_id] = [None, None, None, None, 0]
+                continue
+            for index, name in enumerate(("oscar_wins", "oscar_nominations", "wins", "nominations")):
+                row[index] += counts[name]
+
+        cursor.execute("DELETE FROM fileawards WHERE file_id IN ({})".format(marks), pending)
+        cursor.executemany(
+            "INSERT INTO fileawards (file_id, oscar_wins, oscar_nominations, wins, nominations, parsed) VALUES (?, ?, ?, ?, ?, ?)",
+            [(file_id,) + tuple(row) for file_id, row in rows.items()],
+        )
+        cursor.execute("DELETE FROM awardspending WHERE file_id IN ({})".format(marks), pending)
+        files += len(pending)
+    return files
+
+
+def rebuild_awards(conn):
+    """
+    Queues every file and parses all awards from scratch.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+
+    Returns:
+        int: The number of files ingested.
+    """
+    conn.execute("DELETE FROM fileawards")
+    conn.execute("INSERT OR IGNORE INTO awardspending (file_id) SELECT file_id FROM filemetadata WHERE file_id IS NOT NULL")
+    return ingest_awards(conn)
+
+
+def folder_awards_row(row):
+    """
+    Turns a row of summed folder awards into award counts.
+
+    Args:
+        row (tuple): The file count, the parsed file count and the four summed counts, as selected by FOLDER_AWARDS_QUERY.
+
+    Returns:
+        dict: The summed counts as in parse_awards, an empty dictionary if no file has awards,
+            or None if the awards of some file could not be parsed.
+    """
+    files, parsed = row[0], row[1]
+    if not files:
+        return {}
+    if parsed < files:
+        return None
+    return dict(zip(("oscar_wins", "oscar_nominations", "wins", "nominations"), row[2:]))
+
+
+def get_folder_awards(conn, folder):
+    """
+    Sums the award counts of the files directly under a folder.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        folder (str): The folder name, as stored in filesteps.parent.
+
+    Returns:
+        dict: The summed counts as in parse_awards, an empty dictionary if no file has awards,
+            or None if the awards of some file could not be parsed.
+    """
+    return folder_awards_row(conn.execute(FOLDER_AWARDS_QUERY, (folder,)).fetchone())
+
+
+def load_folder_awards(conn, folders):
+    """
+    Sums the award counts of several folders, one grouped query per batch of folders.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        folders (iterable): Folder names, as stored in filesteps.parent.
+
+    Returns:
+        dict: A dictionary where keys are folder names and values are as returned by get_folder_awards;
+            folders without any awards are left out.
+    """
+    awards = {}
+    folders = list(folders)
+    for start in range(0, len(folders), LOOKUP_BATCH):
+        batch = folders[start:start + LOOKUP_BATCH]
+        cursor = conn.execute("""
+            SELECT filesteps.parent, COUNT(*), SUM(fileawards.parsed), SUM(fileawards.oscar_wins),
+                   SUM(fileawards.oscar_nominations), SUM(fileawards.wins), SUM(fileawards.nominations)
+            FROM filesteps
+            JOIN filepaths ON filepaths.id = filesteps.filepath_id
+            JOIN fileawards ON fileawards.file_id = filepaths.id
+            WHERE filesteps.parent IN ({})
+            GROUP BY filesteps.parent
+        """.format(", ".join("?" * len(batch))), batch)
+        for row in cursor:
+            awards[row[0]] = folder_awards_row(row[1:])
+    return awards
@@ -0,0 +1,191 @@
+"""
+Shared SQLite connections for the pipelines.
+
+Connections are cached per thread and per process, so repeated calls reuse one
+connection instead of reopening the database, and worker processes never inherit
+a parent's connection. Every connection gets the DB_PRAGMAS settings. Read-only
+connections open the database with mode=ro. Writes go through `writer()`, which
+lets one thread of the process write at a time and retries BEGIN IMMEDIATE while
+another process holds the lock, so readers and writers in WAL mode do not stall
+each other with "database is locked" errors.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.request import pathname2url
+from classifier.utils.config import DB_PATH, DB_PRAGMAS, DB_BUSY_TIMEOUT
+from classifier.utils.logger import log_debug, log_warning
+
+_local = threading.local()
+_writer_locks = {}
+_writer_locks_guard = threading.Lock()
+
+
+def open_connection(dbpath, readonly=False):
+    """
+    Opens a new connection with the configured pragmas.
+
+    Args:
+        dbpath (str): Path to the SQLite database.
+        readonly (bool): Open the database read-only.
+
+    Returns:
+        sqlite3.Connection: The new connection.
+    """
+    if readonly:
+        uri = "file:{}?mode=ro".format(pathname2url(os.path.abspath(dbpath)))
+        conn = sqlite3.connect(uri, uri=True, timeout=DB_BUSY_TIMEOUT)
+    else:
+        conn = sqlite3.connect(dbpath, timeout=DB_BUSY_TIMEOUT)
+    for name, value in DB_PRAGMAS.items():
+        # The journal mode is stored in the database file and needs write access to change
+        if name == "journal_mode" and readonly:
+            continue
+        conn.execute("PRAGMA {} = {}".format(name, value))
+    log_debug("Opened %s connection to %s", "read-only" if readonly else "writable", dbpath)
+    return conn
+
+
+def get_connection(dbpath=DB_PATH, readonly=False):
+    """
+    Returns this thread's cached connection to the database, opening it on first use.
+
+    The connection stays open for reuse; use it as a context manager to commit or roll back,
+    not to close it. Call close_connections() to release it.
+
+    Args:
+        dbpath (str): Path to the SQLite database.
+        readonly (bool): Return a read-only connection.
+
+    Returns:
+        sqlite3.Connection: The connection.
+    """
+    pid = os.getpid()
+    if getattr(_local, "pid", None) != pid:
+        # A forked child must not use the parent's connections
+        _local.pid = pid
+        _local.connections = {}
+        _local.writer_depths = {}
+    key = (os.path.abspath(dbpath), readonly)
+    conn = _local.connections.get(key)
+    if conn is not None:
+        try:
+            conn.total_changes
+        except sqlite3.ProgrammingError:
+            conn = None  # Closed by its user
+    if conn is None:
+        conn = _local.connections[key] = open_connection(dbpath, readonly)
+    return conn
+
+
+def close_connections():
+    """
+    Closes and forgets every cached connection of the calling thread.
+
+    Read-only connections are closed first, so the last connection to close can checkpoint the WAL.
+    """
+    if getattr(_local, "pid", None) != os.getpid():
+        return
+    for (dbpath, readonly), conn in sorted(_local.connections.items(), key=lambda item: not item[0][1]):
+        conn.close()
+    _local.connections = {}
+
+
+def writer_lock(dbpath):
+    """
+    Returns the process-wide lock that serializes writers of a database.
+
+    Args:
+        dbpath (str): Path to the SQLite database.
+
+    Returns:
+        threading.RLock: The lock.
+    """
+    key = os.path.abspath(dbpath)
+    with _writer_locks_guard:
+        lock = _writer_locks.get(key)
+        if lock is None:
+            lock = _writer_locks[key] = threading.RLock()
+        return lock
+
+
+@contextmanager
+def writer(dbpath=DB_PATH, timeout=DB_BUSY_TIMEOUT):
+    """
+    Runs a block as the database's single writer, inside one write transaction.
+
+    The transaction starts with BEGIN IMMEDIATE, so the write lock is taken up front and
+    retried with backoff while another process holds it. The block's changes are committed
+    on exit and rolled back on error. Nested writers in the same thread join the outer
+    transaction. A transaction that plain DML on the cached connection opened outside any
+    writer is committed first rather than joined, so the block still rolls back on its own.
+
+    Args:
+        dbpath (str): Path to the SQLite database.
+        timeout (float): Seconds to keep retrying a busy database.
+
+    Yields:
+        sqlite3.Connection: The thread's writable connection.
+    """
+    lock = writer_lock(dbpath)
+    with lock:
+        conn = get_connection(dbpath)
+        key = os.path.abspath(dbpath)
+        depth = _local.writer_depths.get(key, 0)
+        if depth:
+            _local.writer_depths[key] = depth + 1
+            try:
+                yield conn
+            finally:
+                _local.writer_depths[key] = depth
+            return
+        if conn.in_transaction:
+            log_debug("Committing the implicit transaction open on %s before writing", dbpath)
+            conn.commit()
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        while True:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                if time.monotonic() >= deadline:
+                    log_warning("Gave up waiting for the write lock on %s after %.1fs", dbpath, timeout)
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+        _local.writer_depths[key] = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            _local.writer_depths[key] = 0
+
+
+def execute_script(conn, script):
+    """
+    Runs the statements of a script one at a time inside the current transaction.
+
+    sqlite3's executescript() commits the open transaction before it runs, which would end
+    a `writer()` block early, so schema scripts are run through this instead.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        script (str): SQL statements separated by semicolons; trigger bodies may contain semicolons.
+    """
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \t\r\n;"):
+                conn.execute(statement)
+            statement = ""
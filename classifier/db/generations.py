@@ -0,0 +1,107 @@
+"""
+Persistent cache of generated text.
+
+Every response of the local model is stored in generationcache under the SHA-256 of
+the model, the prompt and the generation options. The prompt embeds the franchise's
+child plots or awards, so a franchise whose inputs did not change maps to the same key
+and its text is read back instead of generated again. Each entry counts its hits.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+
+# Keys looked up per statement, below SQLite's bound parameter limit
+LOOKUP_BATCH = 500
+
+GENERATION_CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS generationcache (
+        key TEXT PRIMARY KEY,
+        kind TEXT,
+        response TEXT,
+        created TEXT,
+        used TEXT,
+        hits INTEGER DEFAULT 0
+    ) WITHOUT ROWID
+"""
+
+
+def generation_key(model, prompt, options):
+    """
+    Returns the cache key of a generation request.
+
+    Args:
+        model (str): The model name.
+        prompt (str): The prompt.
+        options (dict): The generation options.
+
+    Returns:
+        str: The hex SHA-256 of the request.
+    """
+    request = json.dumps({"model": model, "prompt": prompt, "options": options}, sort_keys=True)
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+def install_generation_cache(conn):
+    """
+    Creates the generation cache table if it does not exist.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+    """
+    conn.execute(GENERATION_CACHE_SCHEMA)
+
+
+def load_generations(conn, keys):
+    """
+    Reads the cached responses of the given keys.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        keys (list): Cache keys.
+
+    Returns:
+        dict: A dictionary where keys are the cached keys and values are their responses.
+    """
+    found = {}
+    keys = list(keys)
+    for start in range(0, len(keys), LOOKUP_BATCH):
+        batch = keys[start:start + LOOKUP_BATCH]
+        found.update(conn.execute(
+            "SELECT key, response FROM generationcache WHERE key IN ({})".format(", ".join("?" * len(batch))), batch
+        ))
+    return found
+
+
+def store_generations(conn, kind, generated, hits=()):
+    """
+    Stores new responses and counts the hits of cached ones.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        kind (str): The prompt kind, e.g. "plot".
+        generated (list): (key, response) tuples of new responses.
+        hits (iterable): Keys that were served from the cache.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    conn.executemany(
+        "INSERT OR REPLACE INTO generationcache (key, kind, response, created, used, hits) VALUES (?, ?, ?, ?, ?, 0)",
+        [(key, kind, response, now, now) for key, response in generated],
+    )
+    conn.executemany("UPDATE generationcache SET hits = hits + 1, used = ? WHERE key = ?", [(now, key) for key in hits])
+
+
+def generation_cache_stats(conn):
+    """
+    Summarizes the cache per prompt kind.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+
+    Returns:
+        dict: A dictionary where keys are prompt kinds and values are dictionaries with "entries" and "hits".
+    """
+    return {
+        kind: {"entries": entries, "hits": hits}
+        for kind, entries, hits in conn.execute("SELECT kind, COUNT(*), COALESCE(SUM(hits), 0) FROM generationcache GROUP BY kind")
+    }
@@ -0,0 +1,130 @@
+"""
+Change journal for incremental pipeline runs.
+
+Triggers on filesteps and filemetadata record every folder touched by an insert,
+update or delete into the changejournal table. Consumers keep a named watermark
+of the last journal id they processed and only look at newer entries.
+"""
+
+from classifier.db.connection import execute_script
+
+JOURNAL_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS changejournal (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        folder TEXT,
+        role TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS watermark (
+        name TEXT PRIMARY KEY,
+        journal_id INTEGER
+    );
+
+    CREATE INDEX IF NOT EXISTS filesteps_filepath_id ON filesteps (filepath_id);
+
+    CREATE TRIGGER IF NOT EXISTS filesteps_journal_insert AFTER INSERT ON filesteps
+    BEGIN
+        INSERT INTO changejournal (folder, role) VALUES (NEW.parent, 'parent'), (NEW.child, 'child');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS filesteps_journal_delete AFTER DELETE ON filesteps
+    BEGIN
+        INSERT INTO changejournal (folder, role) VALUES (OLD.parent, 'parent'), (OLD.child, 'child');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS filesteps_journal_update AFTER UPDATE ON filesteps
+    BEGIN
+        INSERT INTO changejournal (folder, role) VALUES
+            (OLD.parent, 'parent'), (OLD.child, 'child'), (NEW.parent, 'parent'), (NEW.child, 'child');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_journal_insert AFTER INSERT ON filemetadata
+    BEGIN
+        INSERT INTO changejournal (folder, role)
+        SELECT child, 'metadata' FROM filesteps WHERE filepath_id = NEW.file_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_journal_delete AFTER DELETE ON filemetadata
+    BEGIN
+        INSERT INTO changejournal (folder, role)
+        SELECT child, 'metadata' FROM filesteps WHERE filepath_id = OLD.file_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_journal_update AFTER UPDATE ON filemetadata
+    BEGIN
+        INSERT INTO changejournal (folder, role)
+        SELECT child, 'metadata' FROM filesteps WHERE filepath_id IN (OLD.file_id, NEW.file_id);
+    END;
+"""
+
+
+def install_journal(conn):
+    """
+    Creates the journal tables and triggers if they do not exist yet.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+    """
+    execute_script(conn, JOURNAL_SCHEMA)
+
+
+def get_watermark(conn, name):
+    """
+    Returns the last journal id processed by the named consumer.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        name (str): The consumer name.
+
+    Returns:
+        int: The watermark, or None if the consumer has never completed a run.
+    """
+    row = conn.execute("SELECT journal_id FROM watermark WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def read_journal(conn, since):
+    """
+    Reads the folders journaled after the given watermark.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        since (int): The watermark to read from (exclusive).
+
+    Returns:
+        tuple: The newest journal id and a dictionary where keys are folder names and values are sets of roles.
+    """
+    latest = since
+    changes = {}
+    for journal_id, folder, role in conn.execute(
+        "SELECT id, folder, role FROM changejournal WHERE id > ? ORDER BY id", (since,)
+    ):
+        latest = journal_id
+        changes.setdefault(folder, set()).add(role)
+    return latest, changes
+
+
+def latest_journal_id(conn):
+    """
+    Returns the newest journal id, or 0 if the journal is empty.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+
+    Returns:
+        int: The newest journal id.
+    """
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM changejournal").fetchone()[0]
+
+
+def advance_watermark(conn, name, journal_id):
+    """
+    Records the named consumer's watermark and prunes entries every consumer has processed.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        name (str): The consumer name.
+        journal_id (int): The last journal id the consumer processed.
+    """
+    conn.execute("INSERT OR REPLACE INTO watermark (name, journal_id) VALUES (?, ?)", (name, journal_id))
+    conn.execute("DELETE FROM changejournal WHERE id <= (SELECT MIN(journal_id) FROM watermark)")
@@ -0,0 +1,108 @@
+"""
+Typed copies of the OMDb strings in filemetadata.
+
+filemetadata stores values the way OMDb returns them ("136 min", "1,234,567",
+"$123,456", "87%", "7.5/10", "05 Jan 2001"). The filemetadatatyped side table holds
+them parsed once, in SQL, as INTEGER minutes, INTEGER votes, INTEGER cents, REAL
+ratings and ISO dates, keyed by the filemetadata rowid. Triggers keep it in step
+with every insert, update and delete, so aggregations and sorting can run in SQL
+without parsing rows in Python.
+"""
+
+from classifier.db.connection import execute_script
+
+# Parsed values of a filemetadata row aliased as m, NULL where the value is missing or 'N/A'
+PARSE = {
+    "runtime": "CASE WHEN m.runtime IS NOT NULL AND m.runtime NOT IN ('', 'N/A') THEN CAST(m.runtime AS INTEGER) END",
+    "votes": "CASE WHEN m.imdbVotes IS NOT NULL AND m.imdbVotes NOT IN ('', 'N/A') THEN CAST(replace(m.imdbVotes, ',', '') AS INTEGER) END",
+    "rating": "CASE WHEN m.imdbRating IS NOT NULL AND m.imdbRating NOT IN ('', 'N/A') THEN CAST(m.imdbRating AS REAL) END",
+    "tomatoes": "CASE WHEN m.rottenTomatoes IS NOT NULL AND m.rottenTomatoes NOT IN ('', 'N/A') THEN CAST(replace(m.rottenTomatoes, '%', '') AS REAL) END",
+    "boxoffice": "CASE WHEN m.boxOffice IS NOT NULL AND m.boxOffice NOT IN ('', 'N/A') THEN CAST(replace(replace(m.boxOffice, '$', ''), ',', '') AS INTEGER) END",
+    # "05 Jan 2001" -> "2001-01-05", so dates compare and sort as text
+    "released": (
+        "CASE WHEN m.released IS NOT NULL AND m.released NOT IN ('', 'N/A') THEN printf('%04d-%02d-%02d', "
+        "CAST(substr(m.released, instr(m.released, ' ') + 5) AS INTEGER), "
+        "(instr('JANFEBMARAPRMAYJUNJULAUGSEPOCTNOVDEC', upper(substr(m.released, instr(m.released, ' ') + 1, 3))) + 2) / 3, "
+        "CAST(m.released AS INTEGER)) END"
+    ),
+}
+
+# Typed columns and the expressions that fill them
+TYPED_COLUMNS = {
+    "runtime": PARSE["runtime"],
+    "votes": PARSE["votes"],
+    "boxoffice_cents": "({}) * 100".format(PARSE["boxoffice"]),
+    "rating": PARSE["rating"],
+    "tomatoes": PARSE["tomatoes"],
+    "released": PARSE["released"],
+}
+
+# The filemetadata columns the expressions read
+SOURCE_COLUMNS = ("file_id", "runtime", "imdbVotes", "imdbRating", "rottenTomatoes", "boxOffice", "released")
+
+TYPED_INSERT = "INSERT OR REPLACE INTO filemetadatatyped (metadata_id, file_id, {}) SELECT {{rowid}}, m.file_id, {} FROM {{source}}".format(
+    ", ".join(TYPED_COLUMNS), ", ".join(TYPED_COLUMNS.values()))
+
+TYPED_METADATA_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS filemetadatatyped (
+        metadata_id INTEGER PRIMARY KEY,
+        file_id INTEGER,
+        runtime INTEGER,
+        votes INTEGER,
+        boxoffice_cents INTEGER,
+        rating REAL,
+        tomatoes REAL,
+        released TEXT
+    );
+
+    CREATE INDEX IF NOT EXISTS filemetadatatyped_file_id ON filemetadatatyped (file_id);
+    CREATE INDEX IF NOT EXISTS filemetadatatyped_released ON filemetadatatyped (released);
+    CREATE INDEX IF NOT EXISTS filemetadatatyped_rating ON filemetadatatyped (rating);
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_typed_insert AFTER INSERT ON filemetadata
+    BEGIN
+        {new};
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_typed_update AFTER UPDATE ON filemetadata
+    BEGIN
+        DELETE FROM filemetadatatyped WHERE metadata_id = OLD.rowid AND OLD.rowid != NEW.rowid;
+        {new};
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_typed_delete AFTER DELETE ON filemetadata
+    BEGIN
+        DELETE FROM filemetadatatyped WHERE metadata_id = OLD.rowid;
+    END;
+""".format(new=TYPED_INSERT.format(
+    rowid="NEW.rowid",
+    source="(SELECT {}) AS m".format(", ".join("NEW.{0} AS {0}".format(column) for column in SOURCE_COLUMNS)),
+))
+
+
+def install_typed_metadata(conn):
+    """
+    Creates the typed side table and its triggers, parsing the existing rows on first install.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+
+    Returns:
+        bool: True if the table was created and filled by this call.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'filemetadatatyped'").fetchone()
+    execute_script(conn, TYPED_METADATA_SCHEMA)
+    if not exists:
+        rebuild_typed_metadata(conn)
+    return not exists
+
+
+def rebuild_typed_metadata(conn):
+    """
+    Re-parses every filemetadata row into the typed side table.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+    """
+    conn.execute("DELETE FROM filemetadatatyped")
+    conn.execute(TYPED_INSERT.format(rowid="m.rowid", source="filemetadata AS m"))
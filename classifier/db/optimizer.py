@@ -0,0 +1,232 @@
+"""
+Index advisor and schema optimizer.
+
+The pipelines look files up by folder name (filesteps.parent and child), by title and
+by file id, and franchises by type and by (folder, file_id). INDEXES lists the covering
+indexes those lookups need. ensure_indexes() creates the missing ones, optimize()
+refreshes the statistics the query planner works from, and check_plans() runs
+EXPLAIN QUERY PLAN over the project's known lookups and raises QueryPlanError when one
+of them still scans a whole table. prepare_database() does all three; SortingHat.classify
+and MetAssembly.fetchType call it before each run when OPTIMIZE_BEFORE_RUN is set, and a
+full scan only aborts the run when OPTIMIZER_STRICT is set.
+"""
+
+import re
+import sqlite3
+from classifier.utils.config import OPTIMIZER_STRICT
+from classifier.utils.logger import log_info, log_warning
+
+# Indexes the pipelines' lookups need: name -> (table, columns); trailing columns make the lookups covering
+INDEXES = {
+    "filesteps_parent": ("filesteps", ("parent", "filepath_id")),
+    "filesteps_child": ("filesteps", ("child", "filepath_id")),
+    "filesteps_filepath_id": ("filesteps", ("filepath_id",)),
+    "filemetadata_title": ("filemetadata", ("title", "genre")),
+    "filemetadata_file_id": ("filemetadata", ("file_id",)),
+    "classifications_type": ("classifications", ("type",)),
+    "franchiseassemble_folder_file": ("franchiseassemble", ("folder", "file_id")),
+}
+
+# Lookups run once per folder, file or franchise; none of them may scan a whole table
+KNOWN_QUERIES = {
+    "children of a folder": """
+        SELECT filemetadata.director
+        FROM filemetadata
+        JOIN filepaths ON filemetadata.file_id = filepaths.id
+        JOIN filesteps ON filepaths.id = filesteps.filepath_id
+        WHERE filesteps.parent = ?
+    """,
+    "first step of a folder": "SELECT filepath_id FROM filesteps WHERE child = ? ORDER BY rowid LIMIT 1",
+    "folders of a file": "SELECT child FROM filesteps WHERE filepath_id = ?",
+    "metadata by title": "SELECT genre FROM filemetadata WHERE title = ?",
+    "metadata of a file": "SELECT * FROM filemetadata WHERE file_id = ?",
+    "franchises": "SELECT * FROM classifications WHERE type = 'Franchise'",
+    "assembled franchise": "SELECT id FROM franchiseassemble WHERE folder = ? AND file_id = ?",
+}
+
+# A plan step reading every row of a table or index ("SCAN TABLE x" before SQLite 3.36)
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?(?!CONSTANT ROW)\w+")
+
+
+class QueryPlanError(RuntimeError):
+    """
+    Raised when a known query would scan a whole table.
+
+    Attributes:
+        scans (dict): A dictionary where keys are query names and values are their full-scan plan steps.
+    """
+
+    def __init__(self, scans):
+        self.scans = scans
+        super().__init__("Known queries still scan whole tables: " + "; ".join(
+            "{} ({})".format(name, ", ".join(steps)) for name, steps in scans.items()
+        ))
+
+
+def table_exists(conn, table):
+    """
+    Checks whether a table exists.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        table (str): The table name.
+
+    Returns:
+        bool: True if the table exists.
+    """
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def index_columns(conn, name):
+    """
+    Returns the columns of an existing index.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        name (str): The index name.
+
+    Returns:
+        tuple: The indexed column names in order, empty if there is no such index.
+    """
+    return tuple(row[2] for row in conn.execute("PRAGMA index_info({})".format(name)))
+
+
+def ensure_indexes(conn, indexes=INDEXES):
+    """
+    Creates the missing indexes, and rebuilds those whose columns differ from their definition.
+
+    Indexes on tables that do not exist yet are skipped; the next call creates them.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        indexes (dict): Index definitions as in INDEXES.
+
+    Returns:
+        list: The names of the indexes created by this call.
+    """
+    created = []
+    for name, (table, columns) in indexes.items():
+        if not table_exists(conn, table):
+            continue
+        current = index_columns(conn, name)
+        if current == tuple(columns):
+            continue
+        if current:
+            conn.execute("DROP INDEX {}".format(name))
+        conn.execute("CREATE INDEX {} ON {} ({})".format(name, table, ", ".join(columns)))
+        created.append(name)
+    if created:
+        log_info("Indexes created: %s", ", ".join(created))
+    return created
+
+
+def optimize(conn, analyze=False):
+    """
+    Refreshes the query planner's statistics.
+
+    A full ANALYZE runs when asked or when no statistics have been gathered yet; PRAGMA optimize
+    then re-analyzes whatever changed enough since.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        analyze (bool): Run a full ANALYZE, e.g. after new indexes were created.
+    """
+    if analyze or not table_exists(conn, "sqlite_stat1"):
+        conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+
+
+def query_plan(conn, query):
+    """
+    Returns the EXPLAIN QUERY PLAN steps of a query, with NULL for every parameter.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        query (str): The SQL query.
+
+    Returns:
+        list: The plan step details, in plan order.
+    """
+    # EXPLAIN statements are not re-prepared on schema changes, so a cached one would keep its old plan
+    version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    return [row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN {} -- schema {}".format(query, version), (None,) * query.count("?")
+    )]
+
+
+def known_queries():
+    """
+    Returns the known queries, with the folder lookups of the people and awards modules.
+
+    Those modules are imported here rather than at the top, so importing the optimizer does not load them.
+
+    Returns:
+        dict: A dictionary where keys are query names and values are SQL, as in KNOWN_QUERIES.
+    """
+    from classifier.db.people import FOLDER_PEOPLE_QUERY
+    from classifier.db.awards import FOLDER_AWARDS_QUERY
+    return dict(KNOWN_QUERIES, **{"people of a folder": FOLDER_PEOPLE_QUERY, "awards of a folder": FOLDER_AWARDS_QUERY})
+
+
+def check_plans(conn, queries=None):
+    """
+    Verifies that none of the known queries scans a whole table.
+
+    Queries on tables that do not exist yet are skipped.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        queries (dict): A dictionary where keys are query names and values are SQL, as in KNOWN_QUERIES;
+            None checks those of known_queries().
+
+    Returns:
+        dict: A dictionary where keys are query names and values are their plan steps, or None when skipped.
+
+    Raises:
+        QueryPlanError: If any query plan contains a full scan.
+    """
+    plans, scans = {}, {}
+    for name, query in (known_queries() if queries is None else queries).items():
+        try:
+            plans[name] = plan = query_plan(conn, query)
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            plans[name] = None
+            continue
+        full = [step for step in plan if FULL_SCAN.match(step)]
+        if full:
+            scans[name] = full
+    if scans:
+        raise QueryPlanError(scans)
+    return plans
+
+
+def prepare_database(conn, strict=OPTIMIZER_STRICT):
+    """
+    Creates the missing indexes, refreshes the planner statistics and verifies the known query plans.
+
+    A query that still scans a whole table is logged as a warning, and the run goes on unless `strict` is set.
+
+    Args:
+        conn (sqlite3.Connection): An open, writable database connection.
+        strict (bool): Raise QueryPlanError on a full scan instead of logging it.
+
+    Returns:
+        dict: The checked plans, as returned by check_plans, or None if a full scan was only logged.
+
+    Raises:
+        QueryPlanError: If `strict` is set and a known query still scans a whole table.
+    """
+    created = ensure_indexes(conn)
+    optimize(conn, analyze=bool(created))
+    try:
+        plans = check_plans(conn)
+    except QueryPlanError as e:
+        if strict:
+            raise
+        log_warning("%s", e)
+        return None
+    log_info("Query plans verified: %d known queries, %d skipped for missing tables",
+             sum(plan is not None for plan in plans.values()), sum(plan is None for plan in plans.values()))
+    return plans
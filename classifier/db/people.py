@@ -0,0 +1,256 @@
+"""
+Normalized people tables built from the filemetadata director, writer and actors strings.
+
+filemetadata stores people as comma-joined strings ("Name One, Name Two"). The people
+table interns every name once under an integer id, and file_people links each file to
+its people by role, so franchise cast, director and writer unions are indexed
+SELECT DISTINCT queries and "who appears across franchises" is a single grouped join.
+
+Triggers on filemetadata queue the file_id of every inserted, updated or deleted row in
+peoplepending, and ingest_people() rewrites the links of the queued files. The strings
+are split there rather than in the triggers, because SQLite does not allow the
+recursive CTE that splitting needs inside a trigger. OMDb's 'N/A' placeholder is not
+stored as a person.
+"""
+
+from classifier.db.connection import execute_script
+
+# filemetadata columns holding people, and the role their names are linked with
+ROLES = {"director": "director", "writer": "writer", "actors": "actor"}
+
+# Values that stand for a missing name
+MISSING_NAMES = ("", "N/A")
+
+# Files whose links are rewritten per batch
+INGEST_BATCH = 5000
+
+PEOPLE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS people (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+
+    CREATE TABLE IF NOT EXISTS file_people (
+        file_id INTEGER NOT NULL,
+        person_id INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        PRIMARY KEY (file_id, role, person_id),
+        FOREIGN KEY (person_id) REFERENCES people (id)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS peoplepending (
+        file_id INTEGER PRIMARY KEY
+    );
+
+    CREATE INDEX IF NOT EXISTS file_people_person ON file_people (person_id, role);
+    CREATE INDEX IF NOT EXISTS filesteps_parent ON filesteps (parent, filepath_id);
+    CREATE INDEX IF NOT EXISTS filesteps_filepath_id ON filesteps (filepath_id);
+    CREATE INDEX IF NOT EXISTS filemetadata_file_id ON filemetadata (file_id);
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_people_insert AFTER INSERT ON filemetadata
+    BEGIN
+        INSERT OR IGNORE INTO peoplepending (file_id) VALUES (NEW.file_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_people_update AFTER UPDATE OF file_id, director, writer, actors ON filemetadata
+    BEGIN
+        INSERT OR IGNORE INTO peoplepending (file_id) VALUES (OLD.file_id), (NEW.file_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS filemetadata_people_delete AFTER DELETE ON filemetadata
+    BEGIN
+        INSERT OR IGNORE INTO peoplepending (file_id) VALUES (OLD.file_id);
+    END;
+"""
+
+# The people of the files directly under one folder, for one role
+FOLDER_PEOPLE_QUERY = """
+    SELECT DISTINCT people.name
+    FROM filesteps
+    JOIN filepaths ON filepaths.id = filesteps.filepath_id
+    JOIN file_people ON file_people.file_id = filepaths.id
+    JOIN people ON people.id = file_people.person_id
+    WHERE filesteps.parent = ? AND file_people.role = ?
+    ORDER BY people.name
+"""
+
+
+def install_people(conn):
+    """
+    Creates the people tables and triggers, queueing every existing file on first install.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+
+    Returns:
+        bool: True if the tables were created by this call.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'people'").fetchone()
+    execute_script(conn, PEOPLE_SCHEMA)
+    if not exists:
+        conn.execute("INSERT OR IGNORE INTO peoplepending (file_id) SELECT file_id FROM filemetadata WHERE file_id IS NOT NULL")
+    return not exists
+
+
+def split_names(value):
+    """
+    Splits a comma-joined people string into names, as MetAssembly has always split them.
+
+    Args:
+        value (str): A value such as 'Name One, Name Two', or None.
+
+    Returns:
+        list: The names, without missing-value placeholders.
+    """
+    if value is None:
+        return []
+    return [name for name in value.split(', ') if name not in MISSING_NAMES]
+
+
+def ingest_people(conn, batch=INGEST_BATCH):
+    """
+    Rewrites the people links of every queued file and empties the queue.
+
+    Names are interned into people, and people no longer linked to any file are removed.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        batch (int): Files whose links are rewritten per statement batch.
+
+    Returns:
+        int: The number of files ingested.
+    """
+    cursor = conn.cursor()
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS peoplestage (file_id INTEGER, role TEXT, name TEXT)")
+    files = 0
+    while True:
+        pending = [row[0] for row in cursor.execute("SELECT file_id FROM peoplepending ORDER BY file_id LIMIT ?", (batch,))]
+        if not pending:
+            break
+        marks = ", ".join("?" * len(pending))
+        links = set()
+        cursor.execute("SELECT file_id, {} FROM filemetadata WHERE file_id IN ({})".format(", ".join(ROLES), marks), pending)
+        for row in cursor.fetchall():
+            for role, value in zip(ROLES.values(), row[1:]):
+                links.update((row[0], role, name) for name in split_names(value))
+
+        cursor.execute("DELETE FROM peoplestage")
+        cursor.executemany("INSERT INTO peoplestage (file_id, role, name) VALUES (?, ?, ?)", links)
+        cursor.execute("INSERT OR IGNORE INTO people (name) SELECT DISTINCT name FROM peoplestage")
+        cursor.execute("DELETE FROM file_people WHERE file_id IN ({})".format(marks), pending)
+        cursor.execute("""
+            INSERT OR IGNORE INTO file_people (file_id, person_id, role)
+            SELECT peoplestage.file_id, people.id, peoplestage.role
+            FROM peoplestage JOIN people ON people.name = peoplestage.name
+        """)
+        cursor.execute("DELETE FROM peoplepending WHERE file_id IN ({})".format(marks), pending)
+        files += len(pending)
+
+    cursor.execute("DELETE FROM peoplestage")
+    if files:
+        cursor.execute("DELETE FROM people WHERE NOT EXISTS (SELECT 1 FROM file_people WHERE file_people.person_id = people.id)")
+    return files
+
+
+def rebuild_people(conn):
+    """
+    Queues every file and rebuilds the people links from scratch.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+
+    Returns:
+        int: The number of files ingested.
+    """
+    conn.execute("DELETE FROM file_people")
+    conn.execute("INSERT OR IGNORE INTO peoplepending (file_id) SELECT file_id FROM filemetadata WHERE file_id IS NOT NULL")
+    return ingest_people(conn)
+
+
+def get_folder_people(conn, folder, role):
+    """
+    Returns the people of one role linked to the files directly under a folder.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        folder (str): The folder name, as stored in filesteps.parent.
+        role (str): "director", "writer" or "actor".
+
+    Returns:
+        list: The unique names, sorted.
+    """
+    return [row[0] for row in conn.execute(FOLDER_PEOPLE_QUERY, (folder, role))]
+
+
+def load_folder_people(conn, folders_table):
+    """
+    Returns the people of every role for each folder listed in a table, in one grouped join.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        folders_table (str): A table with a `folder` column, e.g. a temporary staging table.
+
+    Returns:
+        dict: A dictionary where keys are folder names and values map each role to its sorted unique names.
+    """
+    people = {}
+    cursor = conn.execute("""
+        SELECT DISTINCT filesteps.parent, file_people.role, people.name
+        FROM {} AS folders
+        JOIN filesteps ON filesteps.parent = folders.folder
+        JOIN filepaths ON filepaths.id = filesteps.filepath_id
+        JOIN file_people ON file_people.file_id = filepaths.id
+        JOIN people ON people.id = file_people.person_id
+        ORDER BY filesteps.parent, file_people.role, people.name
+    """.format(folders_table))
+    for folder, role, name in cursor:
+        people.setdefault(folder, {}).setdefault(role, []).append(name)
+    return people
+
+
+def people_across_franchises(conn, minimum=2, role=None):
+    """
+    Finds the people who appear in files of several franchises.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        minimum (int): The fewest franchises a person must appear in.
+        role (str): Only count links of this role, or None for any role.
+
+    Returns:
+        list: (name, franchise count) tuples, most franchises first.
+    """
+    return conn.execute("""
+        SELECT people.name, COUNT(DISTINCT filesteps.parent) AS franchises
+        FROM classifications
+        JOIN filesteps ON filesteps.parent = classifications.folder
+        JOIN file_people ON file_people.file_id = filesteps.filepath_id
+        JOIN people ON people.id = file_people.person_id
+        WHERE classifications.type = 'Franchise' AND (:role IS NULL OR file_people.role = :role)
+        GROUP BY people.id
+        HAVING franchises >= :minimum
+        ORDER BY franchises DESC, people.name
+    """, {"role": role, "minimum": minimum}).fetchall()
+
+
+def franchises_of(conn, name, role=None):
+    """
+    Lists the franchises whose files a person is linked to.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        name (str): The person's name.
+        role (str): Only follow links of this role, or None for any role.
+
+    Returns:
+        list: The franchise folder names, sorted.
+    """
+    return [row[0] for row in conn.execute("""
+        SELECT DISTINCT filesteps.parent
+        FROM people
+        JOIN file_people ON file_people.person_id = people.id
+        JOIN filesteps ON filesteps.filepath_id = file_people.file_id
+        JOIN classifications ON classifications.folder = filesteps.parent
+        WHERE people.name = :name AND classifications.type = 'Franchise' AND (:role IS NULL OR file_people.role = :role)
+        ORDER BY filesteps.parent
+    """, {"name": name, "role": role})]
@@ -0,0 +1,110 @@
+"""
+Run history for the pipelines.
+
+Every instrumented run is stored as one pipeline_runs row with its per-stage
+measurements in pipeline_stages, so regressions show up over time.
+"""
+
+from classifier.utils.config import PIPELINE_RUN_HISTORY
+from classifier.db.connection import writer, execute_script
+from classifier.utils.logger import log_info, log_debug
+
+RUNS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS pipeline_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        pipeline TEXT,
+        started TEXT,
+        wall REAL,
+        cpu REAL
+    );
+
+    CREATE TABLE IF NOT EXISTS pipeline_stages (
+        run_id INTEGER,
+        stage TEXT,
+        parent TEXT,
+        calls INTEGER,
+        wall REAL,
+        cpu REAL,
+        rows INTEGER,
+        peak_memory INTEGER,
+        FOREIGN KEY (run_id) REFERENCES pipeline_runs(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS pipeline_stages_run_id ON pipeline_stages (run_id);
+"""
+
+
+def save_run(conn, run):
+    """
+    Stores an instrumented run and its stages.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        run (PipelineRun): The run to store.
+
+    Returns:
+        int: The id of the new pipeline_runs row.
+    """
+    execute_script(conn, RUNS_SCHEMA)
+    cursor = conn.execute(
+        "INSERT INTO pipeline_runs (pipeline, started, wall, cpu) VALUES (?, ?, ?, ?)",
+        (run.pipeline, run.started, run.wall(), run.cpu()),
+    )
+    run_id = cursor.lastrowid
+    conn.executemany(
+        "INSERT INTO pipeline_stages (run_id, stage, parent, calls, wall, cpu, rows, peak_memory) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (run_id, stats.name, stats.parent, stats.calls, stats.wall, stats.cpu, stats.rows, stats.peak_memory)
+            for stats in run.stages.values()
+        ],
+    )
+    return run_id
+
+
+def load_runs(conn, pipeline=None, limit=20):
+    """
+    Reads the most recent runs with their stages.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        pipeline (str): Only return runs of this pipeline.
+        limit (int): The maximum number of runs.
+
+    Returns:
+        list: Run dictionaries, newest first, each with a list of stage dictionaries under "stages".
+    """
+    execute_script(conn, RUNS_SCHEMA)
+    query = "SELECT id, pipeline, started, wall, cpu FROM pipeline_runs"
+    params = []
+    if pipeline is not None:
+        query += " WHERE pipeline = ?"
+        params.append(pipeline)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+
+    runs = []
+    for run_id, name, started, wall, cpu in conn.execute(query, params).fetchall():
+        stages = [
+            {"stage": stage, "parent": parent, "calls": calls, "wall": stage_wall, "cpu": stage_cpu, "rows": rows, "peak_memory": peak}
+            for stage, parent, calls, stage_wall, stage_cpu, rows, peak in conn.execute(
+                "SELECT stage, parent, calls, wall, cpu, rows, peak_memory FROM pipeline_stages WHERE run_id = ? ORDER BY rowid",
+                (run_id,),
+            )
+        ]
+        runs.append({"id": run_id, "pipeline": name, "started": started, "wall": wall, "cpu": cpu, "stages": stages})
+    return runs
+
+
+def record_run(dbpath, run):
+    """
+    Logs a finished run and stores it in the run history when PIPELINE_RUN_HISTORY is on.
+
+    Args:
+        dbpath (str): Path to the SQLite database.
+        run (PipelineRun): The finished run.
+    """
+    log_info("Pipeline run %s", run)
+    if PIPELINE_RUN_HISTORY:
+        with writer(dbpath) as conn:
+            run_id = save_run(conn, run)
+        log_debug("Pipeline run stored as pipeline_runs row %d", run_id)
@@ -0,0 +1,312 @@
+"""
+Trigger-maintained folder statistics for franchise assembly.
+
+The franchisestats table holds mergeable partial aggregates (sums, counts and
+minimums) of the files under every parent folder, as MetAssembly joins them:
+filemetadata/filedetails -> filepaths -> filesteps.parent. Triggers on those four
+tables turn every inserted, deleted or updated row into signed contributions in
+franchisestatsdelta, and a trigger on that table folds each contribution into
+franchisestats, so reading a franchise's stats is a single-row lookup that is
+always current.
+
+OMDb strings are parsed once, in SQL, when a contribution is recorded, with the
+expressions of classifier.db.normalize. Ratings and Rotten Tomatoes scores are
+summed in hundredths so that removals stay exact. Minimums are recomputed from the base tables when the current minimum is removed.
+"""
+
+from datetime import datetime
+from classifier.db.connection import execute_script
+from classifier.db.normalize import PARSE
+
+# Rating sums are stored in hundredths
+SCALE = 100
+
+# Parsed values of a filemetadata row aliased as m, NULL where the original aggregates skip them
+PARSED = dict(
+    PARSE,
+    rating="CAST(round(({}) * {}) AS INTEGER)".format(PARSE["rating"], SCALE),
+    tomatoes="CAST(round(({}) * {}) AS INTEGER)".format(PARSE["tomatoes"], SCALE),
+)
+
+METADATA_COLUMNS = ("file_id", "runtime", "imdbVotes", "imdbRating", "rottenTomatoes", "boxOffice", "released")
+DETAILS_COLUMNS = ("file_id", "year")
+STEPS_COLUMNS = ("filepath_id", "parent")
+PATHS_COLUMNS = ("id",)
+
+# The join every franchise aggregate runs, with each table replaceable by a NEW/OLD row
+JOIN = "{m} JOIN {p} ON m.file_id = filepaths.id JOIN {s} ON filepaths.id = filesteps.filepath_id"
+
+DELTA_INSERT = "INSERT INTO franchisestatsdelta (folder, sign, files, runtime, votes, rating, tomatoes, boxoffice, released, details, year)"
+
+FRANCHISE_STATS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS franchisestats (
+        folder TEXT PRIMARY KEY,
+        files INTEGER DEFAULT 0,
+        runtime_sum INTEGER DEFAULT 0,
+        runtime_count INTEGER DEFAULT 0,
+        votes_sum INTEGER DEFAULT 0,
+        votes_count INTEGER DEFAULT 0,
+        rating_sum INTEGER DEFAULT 0,
+        rating_count INTEGER DEFAULT 0,
+        tomatoes_sum INTEGER DEFAULT 0,
+        tomatoes_count INTEGER DEFAULT 0,
+        boxoffice_sum INTEGER DEFAULT 0,
+        boxoffice_count INTEGER DEFAULT 0,
+        release_min TEXT,
+        release_count INTEGER DEFAULT 0,
+        details INTEGER DEFAULT 0,
+        year_min INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS franchisestatsdelta (
+        folder TEXT,
+        sign INTEGER,
+        files INTEGER,
+        runtime INTEGER,
+        votes INTEGER,
+        rating INTEGER,
+        tomatoes INTEGER,
+        boxoffice INTEGER,
+        released TEXT,
+        details INTEGER,
+        year INTEGER
+    );
+
+    CREATE INDEX IF NOT EXISTS filesteps_filepath_id ON filesteps (filepath_id);
+    CREATE INDEX IF NOT EXISTS filesteps_parent ON filesteps (parent, filepath_id);
+    CREATE INDEX IF NOT EXISTS filemetadata_file_id ON filemetadata (file_id);
+    CREATE INDEX IF NOT EXISTS filedetails_file_id ON filedetails (file_id);
+
+    CREATE TRIGGER IF NOT EXISTS franchisestats_apply AFTER INSERT ON franchisestatsdelta
+    BEGIN
+        INSERT OR IGNORE INTO franchisestats (folder) VALUES (NEW.folder);
+        UPDATE franchisestats SET
+            files = files + NEW.sign * NEW.files,
+            runtime_sum = runtime_sum + NEW.sign * coalesce(NEW.runtime, 0),
+            runtime_count = runtime_count + NEW.sign * (NEW.runtime IS NOT NULL),
+            votes_sum = votes_sum + NEW.sign * coalesce(NEW.votes, 0),
+            votes_count = votes_count + NEW.sign * (NEW.votes IS NOT NULL),
+            rating_sum = rating_sum + NEW.sign * coalesce(NEW.rating, 0),
+            rating_count = rating_count + NEW.sign * (NEW.rating IS NOT NULL),
+            tomatoes_sum = tomatoes_sum + NEW.sign * coalesce(NEW.tomatoes, 0),
+            tomatoes_count = tomatoes_count + NEW.sign * (NEW.tomatoes IS NOT NULL),
+            boxoffice_sum = boxoffice_sum + NEW.sign * coalesce(NEW.boxoffice, 0),
+            boxoffice_count = boxoffice_count + NEW.sign * (NEW.boxoffice IS NOT NULL),
+            release_count = release_count + NEW.sign * (NEW.released IS NOT NULL),
+            release_min = CASE
+                WHEN NEW.sign > 0 AND NEW.released IS NOT NULL AND (release_min IS NULL OR NEW.released < release_min) THEN NEW.released
+                ELSE release_min END,
+            details = details + NEW.sign * NEW.details,
+            year_min = CASE
+                WHEN NEW.sign > 0 AND NEW.year IS NOT NULL AND (year_min IS NULL OR NEW.year < year_min) THEN NEW.year
+                ELSE year_min END
+        WHERE folder = NEW.folder;
+
+        -- A removed minimum is recomputed from the base tables, which no longer hold the removed row
+        UPDATE franchisestats SET release_min = (
+            SELECT min({released}) FROM {join} WHERE filesteps.parent = NEW.folder
+        ) WHERE folder = NEW.folder AND NEW.sign < 0 AND NEW.released = release_min;
+        UPDATE franchisestats SET year_min = (
+            SELECT min(m.year) FROM {details_join} WHERE filesteps.parent = NEW.folder
+        ) WHERE folder = NEW.folder AND NEW.sign < 0 AND NEW.year = year_min;
+
+        DELETE FROM franchisestats WHERE folder = NEW.folder AND files = 0 AND details = 0;
+        DELETE FROM franchisestatsdelta WHERE rowid = NEW.rowid;
+    END;
+""".format(
+    released=PARSED["released"],
+    join=JOIN.format(m="filemetadata AS m", p="filepaths", s="filesteps"),
+    details_join=JOIN.format(m="filedetails AS m", p="filepaths", s="filesteps"),
+)
+
+
+def row_source(table, columns, row, alias):
+    """
+    Returns a FROM clause item for a table, or for a trigger's NEW/OLD row standing in for it.
+
+    Args:
+        table (str): The base table.
+        columns (tuple): The columns the join reads.
+        row (str): "NEW" or "OLD" to use the trigger row, or None for the table itself.
+        alias (str): The alias the join refers to.
+
+    Returns:
+        str: The FROM clause item.
+    """
+    if row is None:
+        return "{} AS {}".format(table, alias)
+    return "(SELECT {}) AS {}".format(", ".join("{}.{} AS {}".format(row, column, column) for column in columns), alias)
+
+
+def contributions(table, row, sign):
+    """
+    Builds the statements recording the contributions of one trigger row.
+
+    Args:
+        table (str): The table the trigger is on.
+        row (str): "NEW" or "OLD".
+        sign (int): 1 to add the contributions, -1 to remove them.
+
+    Returns:
+        list: INSERT ... SELECT statements into franchisestatsdelta.
+    """
+    def source(name, columns, alias):
+        return row_source(name, columns, row if name == table else None, alias)
+
+    paths = source("filepaths", PATHS_COLUMNS, "filepaths")
+    steps = source("filesteps", STEPS_COLUMNS, "filesteps")
+    statements = []
+    if table != "filedetails":
+        statements.append("{} SELECT filesteps.parent, {}, 1, {}, 0, NULL FROM {}".format(
+            DELTA_INSERT, sign,
+            ", ".join(PARSED[name] for name in ("runtime", "votes", "rating", "tomatoes", "boxoffice", "released")),
+            JOIN.format(m=source("filemetadata", METADATA_COLUMNS, "m"), p=paths, s=steps),
+        ))
+    if table != "filemetadata":
+        statements.append("{} SELECT filesteps.parent, {}, 0, NULL, NULL, NULL, NULL, NULL, NULL, 1, m.year FROM {}".format(
+            DELTA_INSERT, sign,
+            JOIN.format(m=source("filedetails", DETAILS_COLUMNS, "m"), p=paths, s=steps),
+        ))
+    return statements
+
+
+def trigger_schema():
+    """
+    Builds the insert, delete and update triggers of every table the statistics depend on.
+
+    Returns:
+        str: The CREATE TRIGGER statements.
+    """
+    triggers = []
+    for table in ("filemetadata", "filedetails", "filesteps", "filepaths"):
+        for event, rows in (("INSERT", [("NEW", 1)]), ("DELETE", [("OLD", -1)]), ("UPDATE", [("OLD", -1), ("NEW", 1)])):
+            body = [statement for row, sign in rows for statement in contributions(table, row, sign)]
+            triggers.append("CREATE TRIGGER IF NOT EXISTS {}_franchisestats_{} AFTER {} ON {}\nBEGIN\n    {};\nEND;".format(
+                table, event.lower(), event, table, ";\n    ".join(body)))
+    return "\n\n".join(triggers)
+
+
+def install_franchise_stats(conn):
+    """
+    Creates the statistics tables and triggers, filling the table from the existing rows on first install.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+
+    Returns:
+        bool: True if the table was created and filled by this call.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'franchisestats'").fetchone()
+    execute_script(conn, FRANCHISE_STATS_SCHEMA)
+    execute_script(conn, trigger_schema())
+    if not exists:
+        rebuild_franchise_stats(conn)
+    return not exists
+
+
+def rebuild_franchise_stats(conn):
+    """
+    Recomputes every folder's statistics from the base tables with two grouped joins.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+    """
+    conn.execute("DELETE FROM franchisestats")
+    conn.execute("""
+        INSERT INTO franchisestats (
+            folder, files, runtime_sum, runtime_count, votes_sum, votes_count, rating_sum, rating_count,
+            tomatoes_sum, tomatoes_count, boxoffice_sum, boxoffice_count, release_min, release_count
+        )
+        SELECT folder, COUNT(*), total(runtime), COUNT(runtime), total(votes), COUNT(votes), total(rating), COUNT(rating),
+            total(tomatoes), COUNT(tomatoes), total(boxoffice), COUNT(boxoffice), min(released), COUNT(released)
+        FROM (
+            SELECT filesteps.parent AS folder, {} FROM {}
+        )
+        GROUP BY folder
+    """.format(
+        ", ".join("{} AS {}".format(PARSED[name], name) for name in ("runtime", "votes", "rating", "tomatoes", "boxoffice", "released")),
+        JOIN.format(m="filemetadata AS m", p="filepaths", s="filesteps"),
+    ))
+    conn.execute("""
+        INSERT INTO franchisestats (folder, details, year_min)
+        SELECT filesteps.parent, COUNT(*), min(m.year) FROM {}
+        GROUP BY filesteps.parent
+        ON CONFLICT (folder) DO UPDATE SET details = excluded.details, year_min = excluded.year_min
+    """.format(JOIN.format(m="filedetails AS m", p="filepaths", s="filesteps")))
+    # total() returns REAL; the sums are whole numbers
+    conn.execute("""
+        UPDATE franchisestats SET runtime_sum = CAST(runtime_sum AS INTEGER), votes_sum = CAST(votes_sum AS INTEGER),
+            rating_sum = CAST(rating_sum AS INTEGER), tomatoes_sum = CAST(tomatoes_sum AS INTEGER),
+            boxoffice_sum = CAST(boxoffice_sum AS INTEGER)
+    """)
+
+
+# Columns read back by get_franchise_stats and load_franchise_stats
+STATS_COLUMNS = """
+    files, runtime_sum, runtime_count, votes_sum, votes_count, rating_sum, rating_count,
+    tomatoes_sum, tomatoes_count, boxoffice_sum, boxoffice_count, release_min, release_count, details, year_min
+"""
+
+
+def stats_from_row(row):
+    """
+    Converts a row of STATS_COLUMNS into the statistics MetAssembly reports.
+
+    Args:
+        row (tuple): The franchisestats values.
+
+    Returns:
+        dict: The statistics, see get_franchise_stats.
+    """
+    (files, runtime_sum, runtime_count, votes_sum, votes_count, rating_sum, rating_count, tomatoes_sum, tomatoes_count,
+     boxoffice_sum, boxoffice_count, release_min, release_count, details, year_min) = row
+    return {
+        "files": files,
+        "details": details,
+        "runtime": runtime_sum,
+        "runtime_count": runtime_count,
+        "votes": votes_sum,
+        "votes_count": votes_count,
+        "rating": rating_sum / SCALE / rating_count if rating_count else 0.0,
+        "rating_count": rating_count,
+        "tomatoes": tomatoes_sum / SCALE / tomatoes_count if tomatoes_count else 0.0,
+        "tomatoes_count": tomatoes_count,
+        "boxoffice": boxoffice_sum,
+        "boxoffice_count": boxoffice_count,
+        "year": year_min,
+        "release": datetime.strptime(release_min, "%Y-%m-%d").strftime("%d %b %Y") if release_min else None,
+        "release_count": release_count,
+    }
+
+
+def get_franchise_stats(conn, folder):
+    """
+    Reads a folder's statistics in the form MetAssembly reports them.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        folder (str): The franchise folder.
+
+    Returns:
+        dict: The folder's file count, total runtime, IMDb votes and box office, mean IMDb and Rotten Tomatoes
+        ratings, earliest year and earliest release, plus the number of values behind each. None if no file lies under the folder.
+    """
+    row = conn.execute("SELECT {} FROM franchisestats WHERE folder = ?".format(STATS_COLUMNS), (folder,)).fetchone()
+    return stats_from_row(row) if row is not None else None
+
+
+def load_franchise_stats(conn, folders_table):
+    """
+    Reads the statistics of every folder listed in a table with one query.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+        folders_table (str): A table with a `folder` column, such as a temp staging table.
+
+    Returns:
+        dict: A dictionary where keys are folders and values are their statistics, see get_franchise_stats.
+        Folders with no files are left out.
+    """
+    cursor = conn.execute("SELECT folder, {} FROM franchisestats WHERE folder IN (SELECT folder FROM {})".format(
+        STATS_COLUMNS, folders_table))
+    return {row[0]: stats_from_row(row[1:]) for row in cursor}
@@ -1,8 +1,8 @@
-import sqlite3
 from classifier.utils.config import DB_PATH
+from classifier.db.connection import get_connection
 
 def find_missing_files(DB_PATH):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH, readonly=True)
     cursor = conn.cursor()
 
     # Query to get file details
@@ -24,35 +24,19 @@ def find_missing_files(DB_PATH):
         for file in missing_files:
             f.write(f"{file[1]}, {file[2]}\n")
 
-    conn.close()
-
 def find_missing_people(DB_PATH):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH, readonly=True)
     cursor = conn.cursor()
 
     missing_people = []
 
-    # Check actors table
-    cursor.execute("SELECT name FROM actors WHERE name IS NULL OR name = 'N/A' OR avatar IS NULL OR avatar = 'N/A' OR bio IS NULL OR bio = 'N/A'")
-    missing_actors = cursor.fetchall()
-    for actor in missing_actors:
-        missing_people.append((actor[0], 'actor'))
-
-    # Check writers table
-    cursor.execute("SELECT name FROM writers WHERE name IS NULL OR name = 'N/A' OR avatar IS NULL OR avatar = 'N/A' OR bio IS NULL OR bio = 'N/A'")
-    missing_writers = cursor.fetchall()
-    for writer in missing_writers:
-        missing_people.append((writer[0], 'writer'))
-
-    # Check directors table
-    cursor.execute("SELECT name FROM directors WHERE name IS NULL OR name = 'N/A' OR avatar IS NULL OR avatar = 'N/A' OR bio IS NULL OR bio = 'N/A'")
-    missing_directors = cursor.fetchall()
-    for director in missing_directors:
-        missing_people.append((director[0], 'director'))
+    # Rows of the actors, writers and directors tables with a missing name, avatar or bio
+    for table, person_type in (("actors", "actor"), ("writers", "writer"), ("directors", "director")):
+        cursor.execute("SELECT name FROM {} WHERE name IS NULL OR name = 'N/A' OR avatar IS NULL OR avatar = 'N/A' OR bio IS NULL OR bio = 'N/A'".format(table))
+        for person in cursor.fetchall():
+            missing_people.append((person[0], person_type))
 
     # Write missing people to ../missing_people.txt
     with open('../missing_people.txt', 'w') as f:
         for name, person_type in missing_people:
             f.write(f"{name}, {person_type}\n")
-
-    conn.close()
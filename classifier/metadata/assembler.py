@@ -1,26 +1,304 @@
-import sqlite3
-from datetime import datetime
-from classifier.utils.config import DB_PATH, RATING_ORDER
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import groupby
+from classifier.utils.config import DB_PATH, RATING_ORDER, BULK_ASSEMBLY, ASSEMBLY_WORKERS, ASSEMBLY_POOL, ASSEMBLY_COMMIT_EVERY, ASSEMBLY_QUEUE, OPTIMIZE_BEFORE_RUN, GENERATION_BATCH
 from classifier.utils.logger import log_info, log_error, log_debug, log_warning
-from .gpt4all import generate_plot, generate_awards
+from classifier.utils.instrument import PipelineRun, instrumented
+from classifier.db.connection import get_connection, writer
+from classifier.db.runs import record_run
+from classifier.db.optimizer import prepare_database
+from classifier.db.normalize import install_typed_metadata
+from classifier.db.stats import install_franchise_stats, get_franchise_stats, load_franchise_stats
+from classifier.db.people import install_people, ingest_people, get_folder_people, load_folder_people
+from classifier.db.awards import install_awards, ingest_awards
+from .gpt4all import GenerationService, summarize_plots, summarize_awards
+
+FRANCHISE_ASSEMBLE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS franchiseassemble (
+        id INTEGER PRIMARY KEY,
+        path TEXT,
+        folder TEXT,
+        title TEXT,
+        year INTEGER,
+        level TEXT,
+        class TEXT,
+        type TEXT,
+        genres TEXT,
+        rated TEXT,
+        released TEXT,
+        runtime INTEGER,
+        director TEXT,
+        writers TEXT,
+        cast TEXT,
+        plot TEXT,
+        languages TEXT,
+        countries TEXT,
+        awards TEXT,
+        poster TEXT,
+        imdbRating REAL,
+        imdbVotes INTEGER,
+        rottenTomatoes REAL,
+        boxOffice TEXT,
+        file_id INTEGER,
+        plot_tier TEXT,
+        FOREIGN KEY (file_id) REFERENCES classifications (file_id) ON DELETE CASCADE
+    )
+"""
+
+FRANCHISE_ASSEMBLE_INSERT = """
+    INSERT OR REPLACE INTO franchiseassemble (
+        id, path, folder, title, year, level, class, type, genres, rated, released,
+        runtime, director, writers, cast, plot, plot_tier, languages, countries, awards, poster,
+        imdbRating, imdbVotes, rottenTomatoes, boxOffice, file_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Columns added to franchiseassemble after its first release, with their types
+FRANCHISE_ASSEMBLE_ADDED = {"plot_tier": "TEXT"}
+
+# Child metadata of every staged franchise, in the order the per-franchise queries read it
+BULK_CHILDREN_QUERY = """
+    SELECT filesteps.parent, filemetadata.rated, filemetadatatyped.released, filemetadata.language, filemetadata.country,
+        filemetadata.poster
+    FROM assemblefolders
+    JOIN filesteps ON filesteps.parent = assemblefolders.folder
+    JOIN filepaths ON filepaths.id = filesteps.filepath_id
+    JOIN filemetadata ON filemetadata.file_id = filepaths.id
+    LEFT JOIN filemetadatatyped ON filemetadatatyped.metadata_id = filemetadata.rowid
+    ORDER BY filesteps.parent, filesteps.rowid, filemetadata.rowid
+"""
+
+
+def install_franchise_assemble(conn):
+    """
+    Creates the franchiseassemble table, and adds the columns that tables created by earlier versions lack.
+
+    Args:
+        conn (sqlite3.Connection): An open database connection.
+    """
+    conn.execute(FRANCHISE_ASSEMBLE_SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(franchiseassemble)")}
+    for name, kind in FRANCHISE_ASSEMBLE_ADDED.items():
+        if name not in columns:
+            conn.execute("ALTER TABLE franchiseassemble ADD COLUMN {} {}".format(name, kind))
+            log_info("Column %s added to franchiseassemble", name)
+
+
+def highest_restriction(ratings):
+    """
+    Picks the most restrictive rating following RATING_ORDER; unknown ratings rank lowest.
+
+    Args:
+        ratings (list): Rating strings such as 'PG-13'.
+
+    Returns:
+        str: The highest rating.
+    """
+    return max(ratings, key=lambda r: RATING_ORDER.index(r) if r in RATING_ORDER else -1)
+
+
+def unique_names(values):
+    """
+    Collects the unique names from comma-separated metadata values.
+
+    Args:
+        values (iterable): Values such as 'Name One, Name Two'.
+
+    Returns:
+        set: The unique names.
+    """
+    names = set()
+    for value in values:
+        names.update(value.split(', '))
+    return names
+
+
+def latest_poster_of(posters):
+    """
+    Returns the poster of the most recent release, the first one listed when several share the date.
+
+    Args:
+        posters (list): (poster, ISO release date) tuples.
+
+    Returns:
+        str: The poster URL.
+    """
+    return max(posters, key=lambda x: x[1])[0]
+
+
+class FranchiseWriter(threading.Thread):
+    """
+    The one thread that writes concurrently assembled franchise rows to franchiseassemble.
+
+    Workers hand over numbered chunks in any order; the writer buffers them and writes them in
+    chunk order, committing every `commit_every` rows, so ids are assigned as the serial path
+    assigns them. Progress and throughput are logged after each commit.
+    """
+
+    def __init__(self, dbpath, total, commit_every=ASSEMBLY_COMMIT_EVERY):
+        """
+        Initializes the FranchiseWriter instance.
 
-class MetAssembly:
-    def __init__(self):
-        self.db = sqlite3.connect(DB_PATH)
-        self.cursor = self.db.cursor()
+        Args:
+            dbpath (str): Path to the SQLite database.
+            total (int): The number of franchises expected, for progress reports.
+            commit_every (int): Rows written per transaction.
+        """
+        super().__init__(name="franchise-writer", daemon=True)
+        self.dbpath = dbpath
+        self.total = total
+        self.commit_every = commit_every
+        self.queue = queue.Queue()
+        self.written = 0
+        self.error = None
+
+    def put(self, index, rows):
+        """
+        Hands over the rows of one chunk.
+
+        Args:
+            index (int): The chunk's position, starting at 0.
+            rows (list): Row tuples from MetAssembly.franchiseRow, without `id`.
+        """
+        self.queue.put((index, rows))
+
+    def close(self):
+        """
+        Writes the remaining rows in order and waits for the thread to finish, if it was started.
+
+        Raises:
+            Exception: The error that stopped the writer, if any.
+        """
+        if self.ident is not None:
+            self.queue.put(None)
+            self.join()
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        try:
+            with writer(self.dbpath) as conn:
+                install_franchise_assemble(conn)
+                # Franchises already in the table are refreshed in place
+                existing = {
+                    (folder, file_id): row_id
+                    for row_id, folder, file_id in conn.execute("SELECT id, folder, file_id FROM franchiseassemble")
+                }
 
-    def fetchType(self):
+            started = time.perf_counter()
+            pending, batch, next_index = {}, [], 0
+            for item in iter(self.queue.get, None):
+                pending[item[0]] = item[1]
+                while next_index in pending:
+                    batch.extend(pending.pop(next_index))
+                    next_index += 1
+                    if len(batch) >= self.commit_every:
+                        self.flush(batch, existing, started)
+                        batch = []
+            if batch:
+                self.flush(batch, existing, started)
+        except Exception as e:
+            log_error("Franchise writer stopped: %s", e)
+            self.error = e
+
+    def flush(self, batch, existing, started):
+        """
+        Writes a batch of rows in one transaction and logs progress.
+
+        Args:
+            batch (list): Row tuples without `id`, in write order.
+            existing (dict): A dictionary where keys are (folder, file_id) and values are existing row ids.
+            started (float): perf_counter() when writing started.
+        """
+        with writer(self.dbpath) as conn:
+            conn.executemany(FRANCHISE_ASSEMBLE_INSERT, [(existing.get((row[1], row[-1])),) + row for row in batch])
+        self.written += len(batch)
+        elapsed = time.perf_counter() - started
+        log_info("Assembled %d/%d franchises (%.1f per second)", self.written, self.total,
+                 self.written / elapsed if elapsed else 0.0)
+
+
+class MetAssembly:
+    def __init__(self, DBPATH=DB_PATH):
+        self.dbpath = DBPATH
+        self.instrument = PipelineRun('metassembly')
+        self.last_run = None
+        self.generation = GenerationService(DBPATH)
+        self.last_generation = None
+
+    def fetchType(self, bulk=BULK_ASSEMBLY, workers=ASSEMBLY_WORKERS, pool=ASSEMBLY_POOL, optimize=OPTIMIZE_BEFORE_RUN):
         """
         Fetches and processes types from the classifications table.
+
+        The stage measurements of the run are stored in the pipeline_runs table and kept in `last_run`;
+        the generation cache hits and misses of the run are kept in `last_generation`.
+
+        Args:
+            bulk (bool): Assemble all franchises in one pass with assembleAll instead of one at a time.
+            workers (int): Workers assembling franchises concurrently with assembleConcurrent; more than 1 takes precedence over `bulk`.
+            pool (str): The kind of worker pool, "thread" or "process"; "async" assembles with assembleAsync, whatever `bulk` and `workers`.
+            optimize (bool): Create missing indexes and verify the known query plans first, see classifier.db.optimizer.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            
+        with self.instrument.stage('fetchType') as stats:
+            with writer(self.dbpath) as conn:
+                if install_typed_metadata(conn):
+                    log_info("Typed metadata table created from the existing filemetadata rows")
+                if install_franchise_stats(conn):
+                    log_info("Franchise statistics table created from the existing files")
+                if install_people(conn):
+                    log_info("People tables created, queueing the existing files")
+                ingested = ingest_people(conn)
+                if ingested:
+                    log_info("People links rewritten for %d files", ingested)
+                if install_awards(conn):
+                    log_info("Award tables created, queueing the existing files")
+                parsed = ingest_awards(conn)
+                if parsed:
+                    log_info("Awards parsed for %d files", parsed)
+                if optimize:
+                    install_franchise_assemble(conn)
+                    with self.instrument.stage('prepareDatabase'):
+                        prepare_database(conn)
+
             # Process franchises from classifications
-            cursor.execute("SELECT * FROM classifications WHERE type = 'Franchise'")
-            for record in cursor.fetchall():
+            if pool == "async":
+                stats.rows += self.assembleAsync(workers)
+            else:
+                records = list(self.streamFranchises())
+                if workers > 1:
+                    self.assembleConcurrent(records, workers, pool)
+                elif bulk:
+                    self.assembleAll(records)
+                else:
+                    for record_dict in records:
+                        self.assembleFranchises(record_dict)
+                stats.rows += len(records)
+        self.last_run, self.instrument = self.instrument, PipelineRun('metassembly')
+        self.last_generation, self.generation = self.generation.stats, GenerationService(self.dbpath)
+        if any(self.last_generation.values()):
+            log_info("Generation cache: %(hits)d hits, %(misses)d misses, %(generated)d generated, %(expired)d expired",
+                     self.last_generation)
+        record_run(self.dbpath, self.last_run)
+
+    def streamFranchises(self, batch=1000):
+        """
+        Reads the franchise records of the classifications table, a batch of rows at a time.
+
+        Args:
+            batch (int): Rows fetched per read.
+
+        Yields:
+            dict: A franchise record with its file_id and classifications.
+        """
+        cursor = get_connection(self.dbpath, readonly=True).cursor()
+        cursor.execute("SELECT * FROM classifications WHERE type = 'Franchise'")
+        for rows in iter(lambda: cursor.fetchmany(batch), []):
+            for record in rows:
                 # Convert record to dictionary
-                record_dict = {
+                yield {
                     'file_id': record[0],
                     'classifications': {
                         'folder': record[1],
@@ -30,8 +308,244 @@ class MetAssembly:
                         'genre': record[5]
                     }
                 }
-                self.assembleFranchises(record_dict)
 
+    @instrumented('assembleAll', rows=lambda self, written: written)
+    def assembleAll(self, franchiseRecords):
+        """
+        Assembles every franchise in one pass and writes them in a single transaction.
+
+        One join grouped by filesteps.parent streams the child metadata of all franchises, the numeric
+        fields come from the franchisestats table and the people from file_people, one query each. The
+        rows match those assembleFranchises writes for each record.
+
+        Args:
+            franchiseRecords (list): Franchise records as built by fetchType.
+
+        Returns:
+            int: The number of franchises written.
+        """
+        texts = self.generateTexts(franchiseRecords)
+
+        with writer(self.dbpath) as conn:
+            cursor = conn.cursor()
+            install_franchise_assemble(conn)
+
+            # Stage the franchise folders so every lookup below is a join
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS assemblefolders (folder TEXT PRIMARY KEY, file_id INTEGER)")
+            cursor.execute("DELETE FROM assemblefolders")
+            cursor.executemany("INSERT OR IGNORE INTO assemblefolders (folder, file_id) VALUES (?, ?)", [
+                (record['classifications']['folder'], record['file_id']) for record in franchiseRecords
+            ])
+
+            existing = {
+                (folder, file_id): row_id for row_id, folder, file_id in cursor.execute("""
+                    SELECT franchiseassemble.id, franchiseassemble.folder, franchiseassemble.file_id
+                    FROM franchiseassemble JOIN assemblefolders ON franchiseassemble.folder = assemblefolders.folder
+                """)
+            }
+            paths = dict(cursor.execute("""
+                SELECT filepaths.id, filepaths.filepath
+                FROM filepaths JOIN assemblefolders ON filepaths.id = assemblefolders.file_id
+            """))
+            folder_stats = load_franchise_stats(conn, "assemblefolders")
+            folder_people = load_folder_people(conn, "assemblefolders")
+
+            # Reduce each franchise's children as its group streams past
+            children = {}
+            cursor.execute(BULK_CHILDREN_QUERY)
+            stream = (row for batch in iter(lambda: cursor.fetchmany(1000), []) for row in batch)
+            for folder, group in groupby(stream, key=lambda row: row[0]):
+                group = list(group)
+                posters = [(row[5], row[2]) for row in group if row[2] is not None]
+                children[folder] = (
+                    highest_restriction([row[1] for row in group]),
+                    ", ".join(unique_names(row[3] for row in group)),
+                    ", ".join(unique_names(row[4] for row in group)),
+                    latest_poster_of(posters) if posters else "",
+                )
+
+            rows = []
+            for franchiseRecord, (augmented_plot, plot_tier, augmented_awards) in zip(franchiseRecords, texts):
+                folder = franchiseRecord['classifications']['folder']
+                file_path = paths.get(franchiseRecord['file_id'])
+                if file_path is None:
+                    log_error("Failed to extract path for franchise: %s", folder)
+                    continue
+                # Remove the last two parts of the path (filename and file folder)
+                franchise_path = "\\".join(file_path.split("\\")[:-2])
+
+                rated, babel_tower, fran_continent, latest_poster = children.get(folder, (None, "", "", ""))
+                people = folder_people.get(folder, {})
+                directors_club = ", ".join(people.get('director', ()))
+                writers_club = ", ".join(people.get('writer', ()))
+                fran_cast = ", ".join(people.get('actor', ()))
+                stats = folder_stats.get(folder)
+                if stats:
+                    numbers = (stats['year'], stats['release'], stats['runtime'], stats['rating'], stats['votes'],
+                               stats['tomatoes'], stats['boxoffice'])
+                else:
+                    numbers = (None, None, 0, 0.0, 0, 0.0, 0)
+                earliest_year, earliest_release, total_runtime, mean_imdb, total_imdb, rotten_mean, gross_boxoffice = numbers
+
+                rows.append((
+                    existing.get((folder, franchiseRecord['file_id'])),
+                    franchise_path,
+                    folder,
+                    folder,
+                    earliest_year,
+                    franchiseRecord['classifications']['levels'],
+                    franchiseRecord['classifications']['classes'],
+                    franchiseRecord['classifications']['type'],
+                    franchiseRecord['classifications']['genre'],
+                    rated,
+                    earliest_release,
+                    total_runtime,
+                    directors_club,
+                    writers_club,
+                    fran_cast,
+                    augmented_plot if augmented_plot else None,
+                    plot_tier,
+                    babel_tower,
+                    fran_continent,
+                    augmented_awards if augmented_awards else None,
+                    latest_poster,
+                    mean_imdb,
+                    total_imdb,
+                    rotten_mean,
+                    gross_boxoffice,
+                    franchiseRecord['file_id']
+                ))
+
+            cursor.executemany(FRANCHISE_ASSEMBLE_INSERT, rows)
+        log_info("Assembled %d franchises in one pass", len(rows))
+        return len(rows)
+
+    @instrumented('assembleConcurrent', rows=lambda self, written: written)
+    def assembleConcurrent(self, franchiseRecords, workers=ASSEMBLY_WORKERS, pool=ASSEMBLY_POOL):
+        """
+        Assembles franchises in a worker pool and writes them through a single FranchiseWriter.
+
+        Records are split into chunks that workers turn into rows with franchiseRow, generating each
+        chunk's texts as one batch. Each worker measures its chunk in its own PipelineRun and
+        GenerationService, which are merged into this assembly's.
+
+        Args:
+            franchiseRecords (list): Franchise records as built by fetchType.
+            workers (int): Number of pool workers.
+            pool (str): "thread" for a thread pool, "process" for a process pool.
+
+        Returns:
+            int: The number of franchises written.
+        """
+        size = max(1, min(ASSEMBLY_COMMIT_EVERY, -(-len(franchiseRecords) // (workers * 4))))
+        chunks = [franchiseRecords[start:start + size] for start in range(0, len(franchiseRecords), size)]
+        executor_class = ProcessPoolExecutor if pool == "process" else ThreadPoolExecutor
+
+        franchise_writer = FranchiseWriter(self.dbpath, len(franchiseRecords))
+        try:
+            with executor_class(max_workers=workers) as executor:
+                futures = {executor.submit(_assembleChunk, self.dbpath, chunk): index for index, chunk in enumerate(chunks)}
+                # Submitting has started every worker process, so none is forked while the writer holds a SQLite mutex
+                franchise_writer.start()
+                for future in as_completed(futures):
+                    rows, run, generation = future.result()
+                    self.instrument.merge(run)
+                    self.generation.merge(generation)
+                    franchise_writer.put(futures[future], rows)
+        finally:
+            franchise_writer.close()
+        log_info("Assembled %d franchises with %d %s workers", franchise_writer.written, workers, pool)
+        return franchise_writer.written
+
+    @instrumented('assembleAsync', rows=lambda self, written: written)
+    def assembleAsync(self, workers=ASSEMBLY_WORKERS, depth=ASSEMBLY_QUEUE):
+        """
+        Assembles every franchise with an asyncio pipeline that overlaps aggregation with text generation.
+
+        Records stream from classifications into a bounded queue, each with its franchiseAggregates
+        running in a pool of `workers` threads. Text generation takes the queued records in batches of
+        up to GENERATION_BATCH on a thread of its own, and a FranchiseWriter writes the finished rows in
+        order. While the model works on one batch, later franchises are aggregated, until `depth` of
+        them wait for generation.
+
+        Args:
+            workers (int): Threads computing franchise aggregates.
+            depth (int): Franchises aggregated ahead of text generation at most.
+
+        Returns:
+            int: The number of franchises written.
+        """
+        return asyncio.run(self.assemblePipeline(max(1, workers), depth))
+
+    async def assemblePipeline(self, workers, depth):
+        """
+        Runs the stages of assembleAsync in the running event loop.
+
+        Each aggregation thread measures its stages in a MetAssembly of its own, merged into this one
+        at the end; generation is measured in this assembly's run.
+
+        Args:
+            workers (int): Threads computing franchise aggregates.
+            depth (int): Franchises aggregated ahead of text generation at most.
+
+        Returns:
+            int: The number of franchises written.
+        """
+        loop = asyncio.get_running_loop()
+        with get_connection(self.dbpath, readonly=True) as conn:
+            total = conn.execute("SELECT COUNT(*) FROM classifications WHERE type = 'Franchise'").fetchone()[0]
+        local, assemblies = threading.local(), []
+
+        def aggregate(franchiseRecord):
+            assembly = getattr(local, "assembly", None)
+            if assembly is None:
+                assembly = local.assembly = MetAssembly(self.dbpath)
+                assemblies.append(assembly)
+            return assembly.franchiseAggregates(franchiseRecord)
+
+        aggregated = asyncio.Queue(depth)
+        franchise_writer = FranchiseWriter(self.dbpath, total)
+        franchise_writer.start()
+        try:
+            with ThreadPoolExecutor(workers, thread_name_prefix="assembly-aggregate") as aggregate_executor, \
+                    ThreadPoolExecutor(1, thread_name_prefix="assembly-generate") as generate_executor:
+
+                async def stream():
+                    for franchiseRecord in self.streamFranchises():
+                        future = loop.run_in_executor(aggregate_executor, aggregate, franchiseRecord)
+                        await aggregated.put((franchiseRecord, future))
+                    await aggregated.put(None)
+
+                async def generate():
+                    index, done = 0, False
+                    while not done:
+                        # Take whatever is aggregated or in flight, up to one generation batch
+                        batch = [await aggregated.get()]
+                        while batch[-1] is not None and len(batch) < GENERATION_BATCH and not aggregated.empty():
+                            batch.append(aggregated.get_nowait())
+                        if batch[-1] is None:
+                            done = True
+                            batch.pop()
+                        if not batch:
+                            continue
+                        texts = await loop.run_in_executor(generate_executor, self.generateTexts, [record for record, _ in batch])
+                        rows = []
+                        for (franchiseRecord, future), text in zip(batch, texts):
+                            aggregates = await future
+                            if aggregates is not None:
+                                rows.append(self.franchiseRow(franchiseRecord, text, aggregates))
+                        franchise_writer.put(index, rows)
+                        index += 1
+
+                await asyncio.gather(stream(), generate())
+        finally:
+            franchise_writer.close()
+        for assembly in assemblies:
+            self.instrument.merge(assembly.instrument)
+        log_info("Assembled %d franchises with %d aggregation threads overlapping generation", franchise_writer.written, workers)
+        return franchise_writer.written
+
+    @instrumented('assembleFranchises')
     def assembleFranchises(self, franchiseRecord):
         """
         Processes a franchise record and inserts it into the franchiseassemble table.
@@ -39,107 +553,129 @@ class MetAssembly:
         Args:
             franchiseRecord (dict): A dictionary containing franchise metadata.
         """
-        with sqlite3.connect(DB_PATH) as conn:
+        row = self.franchiseRow(franchiseRecord)
+        if row is None:
+            return
+
+        with writer(self.dbpath) as conn:
             cursor = conn.cursor()
             
             # Create franchiseassemble table if it does not exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS franchiseassemble (
-                    id INTEGER PRIMARY KEY,
-                    path TEXT,
-                    folder TEXT,
-                    title TEXT,
-                    year INTEGER,
-                    level TEXT,
-                    class TEXT,
-                    type TEXT,
-                    genres TEXT,
-                    rated TEXT,
-                    released TEXT,
-                    runtime INTEGER,
-                    director TEXT,
-                    writers TEXT,
-                    cast TEXT,
-                    plot TEXT,
-                    languages TEXT,
-                    countries TEXT,
-                    awards TEXT,
-                    poster TEXT,
-                    imdbRating REAL,
-                    imdbVotes INTEGER,
-                    rottenTomatoes REAL,
-                    boxOffice TEXT,
-                    file_id INTEGER,
-                    FOREIGN KEY (file_id) REFERENCES classifications (file_id) ON DELETE CASCADE
-                )
-            """)
+            install_franchise_assemble(conn)
             
-            # Check if the franchise already exists in the table
+            # Franchises already in the table are refreshed in place
             cursor.execute("""
                 SELECT id FROM franchiseassemble WHERE folder = ? AND file_id = ?
             """, (franchiseRecord['classifications']['folder'], franchiseRecord['file_id']))
-            if cursor.fetchone():
-                log_info("Franchise {} already exists in the table. Skipping...".format(franchiseRecord['classifications']['folder']))
-                return
-            
-            # Extract and process franchise information
-            franchise_path = self.genePathExtract(franchiseRecord)
-            if franchise_path is None:
-                log_error("Failed to extract path for franchise: {}".format(franchiseRecord['classifications']['folder']))
-                return
-            
-            earliest_year = self.earliestYear(franchiseRecord)
-            highest_restriction = self.highestRestriction(franchiseRecord)
-            earliest_release = self.earliestRelease(franchiseRecord)
-            total_runtime = self.totalRunTime(franchiseRecord)
-            directors_club = self.joinChildDirectors(franchiseRecord)
-            writers_club = self.joinChildWriters(franchiseRecord)
-            fran_cast = self.joinChildCast(franchiseRecord)
-            augmented_plot = generate_plot(franchiseRecord)
-            babel_tower = self.joinChildLanguages(franchiseRecord)
-            fran_continent = self.joinChildCountries(franchiseRecord)
-            augmented_awards = generate_awards(franchiseRecord)
-            latest_poster = self.latestPoster(franchiseRecord)
-            mean_imdb = self.meanChildIMDBRating(franchiseRecord)
-            total_imdb = self.sumChildIMDBVotes(franchiseRecord)
-            rotten_mean = self.meanChildRottenTomatoes(franchiseRecord)
-            gross_boxoffice = self.sumChildBoxOffice(franchiseRecord)
+            existing = cursor.fetchone()
+            if existing:
+                log_debug("Franchise %s already exists in the table. Updating...", franchiseRecord['classifications']['folder'])
             
             # Insert or update franchise record in franchiseassemble table
-            cursor.execute("""
-                INSERT OR REPLACE INTO franchiseassemble (
-                    path, folder, title, year, level, class, type, genres, rated, released,
-                    runtime, director, writers, cast, plot, languages, countries, awards, poster,
-                    imdbRating, imdbVotes, rottenTomatoes, boxOffice, file_id
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                franchise_path,
-                franchiseRecord['classifications']['folder'],
-                franchiseRecord['classifications']['folder'],
-                earliest_year,
-                franchiseRecord['classifications']['levels'],
-                franchiseRecord['classifications']['classes'],
-                franchiseRecord['classifications']['type'],
-                franchiseRecord['classifications']['genre'],
-                highest_restriction,
-                earliest_release,
-                total_runtime,
-                directors_club,
-                writers_club,
-                fran_cast,
-                augmented_plot if augmented_plot else None,
-                babel_tower,
-                fran_continent,
-                augmented_awards if augmented_awards else None,
-                latest_poster,
-                mean_imdb,
-                total_imdb,
-                rotten_mean,
-                gross_boxoffice,
-                franchiseRecord['file_id']
-            ))
-            conn.commit()
+            cursor.execute(FRANCHISE_ASSEMBLE_INSERT, (existing[0] if existing else None,) + row)
+
+    def generateTexts(self, franchiseRecords):
+        """
+        Summarizes the plots and totals the awards of franchise records, one batch of prompts per kind.
+
+        Plots come from the first tier of summarize_plots that answers within the plot budget. Awards
+        are summed from their parsed counts; only franchises with awards the parser does not recognize
+        are generated.
+
+        Args:
+            franchiseRecords (list): Franchise records as built by fetchType.
+
+        Returns:
+            list: (plot, plot tier, awards) tuples in record order.
+        """
+        with self.instrument.stage('generate_plot'):
+            plots = summarize_plots(franchiseRecords, self.dbpath, self.generation)
+        with self.instrument.stage('generate_awards'):
+            awards = summarize_awards(franchiseRecords, self.dbpath, self.generation)
+        return [(plot, tier, award) for (plot, tier), award in zip(plots, awards)]
+
+    def franchiseAggregates(self, franchiseRecord):
+        """
+        Computes the values a franchise record aggregates from its children, everything but its generated texts.
+
+        Args:
+            franchiseRecord (dict): A dictionary containing franchise metadata.
+
+        Returns:
+            dict: A dictionary where keys are franchiseassemble column names and values are their values,
+                or None if the franchise path is unknown.
+        """
+        # Extract and process franchise information
+        franchise_path = self.genePathExtract(franchiseRecord)
+        if franchise_path is None:
+            log_error("Failed to extract path for franchise: %s", franchiseRecord['classifications']['folder'])
+            return None
+
+        return {
+            'path': franchise_path,
+            'year': self.earliestYear(franchiseRecord),
+            'rated': self.highestRestriction(franchiseRecord),
+            'released': self.earliestRelease(franchiseRecord),
+            'runtime': self.totalRunTime(franchiseRecord),
+            'director': self.joinChildDirectors(franchiseRecord),
+            'writers': self.joinChildWriters(franchiseRecord),
+            'cast': self.joinChildCast(franchiseRecord),
+            'languages': self.joinChildLanguages(franchiseRecord),
+            'countries': self.joinChildCountries(franchiseRecord),
+            'poster': self.latestPoster(franchiseRecord),
+            'imdbRating': self.meanChildIMDBRating(franchiseRecord),
+            'imdbVotes': self.sumChildIMDBVotes(franchiseRecord),
+            'rottenTomatoes': self.meanChildRottenTomatoes(franchiseRecord),
+            'boxOffice': self.sumChildBoxOffice(franchiseRecord),
+        }
+
+    def franchiseRow(self, franchiseRecord, texts=None, aggregates=None):
+        """
+        Computes the franchiseassemble values of a franchise record, without touching the table.
+
+        Args:
+            franchiseRecord (dict): A dictionary containing franchise metadata.
+            texts (tuple): The record's (plot, plot tier, awards) from generateTexts; generated for this record alone if None.
+            aggregates (dict): The record's franchiseAggregates; computed here if None.
 
+        Returns:
+            tuple: The column values after `id`, in FRANCHISE_ASSEMBLE_INSERT order, or None if the franchise path is unknown.
+        """
+        if aggregates is None:
+            aggregates = self.franchiseAggregates(franchiseRecord)
+            if aggregates is None:
+                return None
+        augmented_plot, plot_tier, augmented_awards = texts if texts is not None else self.generateTexts([franchiseRecord])[0]
+
+        return (
+            aggregates['path'],
+            franchiseRecord['classifications']['folder'],
+            franchiseRecord['classifications']['folder'],
+            aggregates['year'],
+            franchiseRecord['classifications']['levels'],
+            franchiseRecord['classifications']['classes'],
+            franchiseRecord['classifications']['type'],
+            franchiseRecord['classifications']['genre'],
+            aggregates['rated'],
+            aggregates['released'],
+            aggregates['runtime'],
+            aggregates['director'],
+            aggregates['writers'],
+            aggregates['cast'],
+            augmented_plot if augmented_plot else None,
+            plot_tier,
+            aggregates['languages'],
+            aggregates['countries'],
+            augmented_awards if augmented_awards else None,
+            aggregates['poster'],
+            aggregates['imdbRating'],
+            aggregates['imdbVotes'],
+            aggregates['rottenTomatoes'],
+            aggregates['boxOffice'],
+            franchiseRecord['file_id']
+        )
+
+    @instrumented('genePathExtract')
     def genePathExtract(self, franchiseRecord):
         """
         Extracts the franchise path from the filepaths table.
@@ -150,7 +686,7 @@ class MetAssembly:
         Returns:
             str: The franchise path.
         """
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection(self.dbpath, readonly=True) as conn:
             cursor = conn.cursor()
             
             # Fetch the file path using file_id from classifications
@@ -165,11 +701,25 @@ class MetAssembly:
                 franchise_path = None
             
             if franchise_path is None:
-                log_warning("Franchise path could not be determined for franchise: {}".format(franchiseRecord['classifications']['folder']))
+                log_warning("Franchise path could not be determined for franchise: %s", franchiseRecord['classifications']['folder'])
             
-            log_info("Franchise path for franchise {}: {}".format(franchiseRecord['classifications']['folder'], franchise_path))
+            log_debug("Franchise path for franchise %s: %s", franchiseRecord['classifications']['folder'], franchise_path)
             return franchise_path
 
+    def franchiseStats(self, franchiseRecord):
+        """
+        Reads the maintained statistics of the given franchise's folder.
+
+        Args:
+            franchiseRecord (dict): A dictionary containing franchise metadata.
+
+        Returns:
+            dict: The folder's statistics from the franchisestats table, or None if no file lies under it.
+        """
+        with get_connection(self.dbpath, readonly=True) as conn:
+            return get_franchise_stats(conn, franchiseRecord['classifications']['folder'])
+
+    @instrumented('earliestYear')
     def earliestYear(self, franchiseRecord):
         """
         Finds the earliest year from the filedetails table for the given franchise.
@@ -180,27 +730,16 @@ class MetAssembly:
         Returns:
             int: The earliest year.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
+        stats = self.franchiseStats(franchiseRecord)
 
-            # Find all movies linked to franchiseRecord in filesteps
-            cursor.execute("""
-                SELECT filedetails.year
-                FROM filedetails
-                JOIN filepaths ON filedetails.file_id = filepaths.id
-                JOIN filesteps ON filepaths.id = filesteps.filepath_id
-                WHERE filesteps.parent = ?
-            """, (franchiseRecord['classifications']['folder'],))
+        if not stats or not stats['details']:
+            log_info("No years found for franchise: %s", franchiseRecord['classifications']['folder'])
+            return None
 
-            years = [row[0] for row in cursor.fetchall()]
-
-            if not years:
-                log_info("No years found for franchise: {}".format(franchiseRecord['classifications']['folder']))
-                return None
-            
-            # Return the earliest year
-            return min(years)
+        # Return the earliest year
+        return stats['year']
 
+    @instrumented('highestRestriction')
     def highestRestriction(self, franchiseRecord):
         """
         Finds the highest rating restriction for the given franchise.
@@ -211,7 +750,7 @@ class MetAssembly:
         Returns:
             str: The highest rating restriction.
         """
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection(self.dbpath, readonly=True) as conn:
             cursor = conn.cursor()
 
             # Find all movies linked to franchiseRecord in filemetadata
@@ -221,20 +760,22 @@ class MetAssembly:
                 JOIN filepaths ON filemetadata.file_id = filepaths.id
                 JOIN filesteps ON filepaths.id = filesteps.filepath_id
                 WHERE filesteps.parent = ?
+                ORDER BY filesteps.rowid, filemetadata.rowid
             """, (franchiseRecord['classifications']['folder'],))
 
             ratings = [row[0] for row in cursor.fetchall()]
 
             if not ratings:
-                log_info("No ratings found for franchise: {}".format(franchiseRecord['classifications']['folder']))
+                log_info("No ratings found for franchise: %s", franchiseRecord['classifications']['folder'])
                 return None
             
             # Find the highest rating based on the specified order
-            highest_rating = max(ratings, key=lambda r: RATING_ORDER.index(r) if r in RATING_ORDER else -1)
+            highest_rating = highest_restriction(ratings)
 
-            log_info("Highest rating for franchise {}: {}".format(franchiseRecord['classifications']['folder'], highest_rating))
+            log_debug("Highest rating for franchise %s: %s", franchiseRecord['classifications']['folder'], highest_rating)
             return highest_rating
 
+    @instrumented('earliestRelease')
     def earliestRelease(self, franchiseRecord):
         """
         Finds the earliest release date from the filemetadata table for the given franchise.
@@ -245,38 +786,22 @@ class MetAssembly:
         Returns:
             str: The earliest release date.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-
-            # Find all movies linked to franchiseRecord in filesteps
-            cursor.execute("""
-                SELECT filemetadata.released
-                FROM filemetadata
-                JOIN filepaths ON filemetadata.file_id = filepaths.id
-                JOIN filesteps ON filepaths.id = filesteps.filepath_id
-                WHERE filesteps.parent = ? 
-            """, (franchiseRecord['classifications']['folder'],))
+        stats = self.franchiseStats(franchiseRecord)
 
-            release_dates = [row[0] for row in cursor.fetchall()]
+        if not stats or not stats['files']:
+            log_info("No release dates found for franchise: %s", franchiseRecord['classifications']['folder'])
+            return None
 
-            if not release_dates:
-                log_info("No release dates found for franchise: {}".format(franchiseRecord['classifications']['folder']))
-                return None
-            
-            # Filter out invalid dates
-            valid_release_dates = [date for date in release_dates if date != 'N/A']
-            
-            if not valid_release_dates:
-                log_info("No valid release dates found for franchise: {}".format(franchiseRecord['classifications']['folder']))
-                return None
+        if not stats['release_count']:
+            log_info("No valid release dates found for franchise: %s", franchiseRecord['classifications']['folder'])
+            return None
 
-            # Convert release dates to datetime objects and find the earliest date
-            release_dates = [datetime.strptime(date, "%d %b %Y") for date in valid_release_dates]
-            earliest_release = min(release_dates).strftime("%d %b %Y")
+        earliest_release = stats['release']
 
-            log_info("Earliest release for franchise {} are: {}".format(franchiseRecord['classifications']['folder'], earliest_release))
-            return earliest_release
+        log_debug("Earliest release for franchise %s are: %s", franchiseRecord['classifications']['folder'], earliest_release)
+        return earliest_release
 
+    @instrumented('totalRunTime')
     def totalRunTime(self, franchiseRecord):
         """
         Sums the total runtime from the filemetadata table for the given franchise.
@@ -287,30 +812,18 @@ class MetAssembly:
         Returns:
             int: The total runtime.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-
-            # Find all movies linked to franchiseRecord in filesteps
-            cursor.execute("""
-                SELECT filemetadata.runtime
-                FROM filemetadata
-                JOIN filepaths ON filemetadata.file_id = filepaths.id
-                JOIN filesteps on filepaths.id = filesteps.filepath_id
-                WHERE filesteps.parent = ?
-            """, (franchiseRecord['classifications']['folder'],))
+        stats = self.franchiseStats(franchiseRecord)
 
-            runtimes = [int(row[0].split()[0]) for row in cursor.fetchall() if row[0] and row[0] != 'N/A']
+        if not stats or not stats['runtime_count']:
+            log_info("No runtimes found for franchise: %s", franchiseRecord['classifications']['folder'])
+            return 0
 
-            if not runtimes:
-                log_info("No runtimes found for franchise: {}".format(franchiseRecord['classifications']['folder']))
-                return 0
-            
-            # Sum all runtimes
-            total_runtime = sum(runtimes)
+        total_runtime = stats['runtime']
 
-            log_info("Total runtime for franchise {}: {}".format(franchiseRecord['classifications']['folder'], total_runtime))
-            return total_runtime
+        log_debug("Total runtime for franchise %s: %s", franchiseRecord['classifications']['folder'], total_runtime)
+        return total_runtime
 
+    @instrumented('joinChildDirectors')
     def joinChildDirectors(self, franchiseRecord):
         """
         Joins the unique list of directors for the given franchise.
@@ -319,35 +832,23 @@ class MetAssembly:
             franchiseRecord (dict): A dictionary containing franchise metadata.
 
         Returns:
-            str: A comma-separated list of unique directors.
+            str: A comma-separated list of unique directors, sorted by name.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-
-            # Find all movies linked to franchiseRecord in filesteps
-            cursor.execute("""
-                SELECT filemetadata.director
-                FROM filemetadata
-                JOIN filepaths ON filemetadata.file_id = filepaths.id
-                JOIN filesteps ON filepaths.id = filesteps.filepath_id
-                WHERE filesteps.parent = ?
-            """, (franchiseRecord['classifications']['folder'],))
-
-            directors = set()
-            for row in cursor.fetchall():
-                director_list = row[0].split(', ')
-                directors.update(director_list)
+        with get_connection(self.dbpath, readonly=True) as conn:
+            # Find the people linked to the movies under franchiseRecord in filesteps
+            directors = get_folder_people(conn, franchiseRecord['classifications']['folder'], 'director')
 
             if not directors:
-                log_info("No directors found for franchise: {}".format(franchiseRecord['classifications']['folder']))
+                log_info("No directors found for franchise: %s", franchiseRecord['classifications']['folder'])
                 return ""
             
             # Join unique directors into a comma-separated list
             unique_directors = ", ".join(directors)
 
-            log_info("Directors for franchise {}: {}".format(franchiseRecord['classifications']['folder'], unique_directors))
+            log_debug("Directors for franchise %s: %s", franchiseRecord['classifications']['folder'], unique_directors)
             return unique_directors
 
+    @instrumented('joinChildWriters')
     def joinChildWriters(self, franchiseRecord):
         """
         Joins the unique list of writers for the given franchise.
@@ -356,35 +857,23 @@ class MetAssembly:
             franchiseRecord (dict): A dictionary containing franchise metadata.
 
         Returns:
-            str: A comma-separated list of unique writers.
+            str: A comma-separated list of unique writers, sorted by name.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-
-            # Find all movies linked to franchiseRecord in filesteps
-            cursor.execute("""
-                SELECT filemetadata.writer
-                FROM filemetadata
-                JOIN filepaths ON filemetadata.file_id = filepaths.id
-                JOIN filesteps ON filepaths.id = filesteps.filepath_id
-                WHERE filesteps.parent = ?
-            """, (franchiseRecord['classifications']['folder'],))
-
-            writers = set()
-            for row in cursor.fetchall():
-                writer_list = row[0].split(', ')
-                writers.update(writer_list)
+        with get_connection(self.dbpath, readonly=True) as conn:
+            # Find the people linked to the movies under franchiseRecord in filesteps
+            writers = get_folder_people(conn, franchiseRecord['classifications']['folder'], 'writer')
 
             if not writers:
-                log_info("No writers found for franchise: {}".format(franchiseRecord['classifications']['folder']))
+                log_info("No writers found for franchise: %s", franchiseRecord['classifications']['folder'])
                 return ""
             
             # Join unique writers into a comma-separated list
             unique_writers = ", ".join(writers)
 
-            log_info("Writers for franchise {}: {}".format(franchiseRecord['classifications']['folder'], unique_writers))
+            log_debug("Writers for franchise %s: %s", franchiseRecord['classifications']['folder'], unique_writers)
             return unique_writers
 
+    @instrumented('joinChildCast')
     def joinChildCast(self, franchiseRecord):
         """
         Joins the unique list of actors for the given franchise.
@@ -393,35 +882,23 @@ class MetAssembly:
             franchiseRecord (dict): A dictionary containing franchise metadata.
 
         Returns:
-            str: A comma-separated list of unique actors.
+            str: A comma-separated list of unique actors, sorted by name.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-
-            # Find all movies linked to franchiseRecord in filesteps
-            cursor.execute("""
-                SELECT filemetadata.actors
-                FROM filemetadata
-                JOIN filepaths ON filemetadata.file_id = filepaths.id
-                JOIN filesteps ON filepaths.id = filesteps.filepath_id
-                WHERE filesteps.parent = ?
-            """, (franchiseRecord['classifications']['folder'],))
-
-            actors = set()
-            for row in cursor.fetchall():
-                actor_list = row[0].split(', ')
-                actors.update(actor_list)
+        with get_connection(self.dbpath, readonly=True) as conn:
+            # Find the people linked to the movies under franchiseRecord in filesteps
+            actors = get_folder_people(conn, franchiseRecord['classifications']['folder'], 'actor')
 
             if not actors:
-                log_info("No actors found for franchise: {}".format(franchiseRecord['classifications']['folder']))
+                log_info("No actors found for franchise: %s", franchiseRecord['classifications']['folder'])
                 return ""
             
             # Join unique actors into a comma-separated list
             unique_actors = ", ".join(actors)
 
-            log_info("Actors for franchise {}: {}".format(franchiseRecord['classifications']['folder'], unique_actors))
+            log_debug("Actors for franchise %s: %s", franchiseRecord['classifications']['folder'], unique_actors)
             return unique_actors
 
+    @instrumented('joinChildLanguages')
     def joinChildLanguages(self, franchiseRecord):
         """
         Joins the unique list of languages for the given franchise.
@@ -432,7 +909,7 @@ class MetAssembly:
         Returns:
             str: A comma-separated list of unique languages.
         """
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection(self.dbpath, readonly=True) as conn:
             cursor = conn.cursor()
 
             # Find all movies linked to franchiseRecord in filesteps
@@ -444,21 +921,19 @@ class MetAssembly:
                 WHERE filesteps.parent = ?
             """, (franchiseRecord['classifications']['folder'],))
 
-            languages = set()
-            for row in cursor.fetchall():
-                language_list = row[0].split(', ')
-                languages.update(language_list)
+            languages = unique_names(row[0] for row in cursor.fetchall())
 
             if not languages:
-                log_info("No languages found for franchise: {}".format(franchiseRecord['classifications']['folder']))
+                log_info("No languages found for franchise: %s", franchiseRecord['classifications']['folder'])
                 return ""
             
             # Join unique languages into a comma-separated list
             unique_languages = ", ".join(languages)
 
-            log_info("Languages for franchise {}: {}".format(franchiseRecord['classifications']['folder'], unique_languages))
+            log_debug("Languages for franchise %s: %s", franchiseRecord['classifications']['folder'], unique_languages)
             return unique_languages
 
+    @instrumented('joinChildCountries')
     def joinChildCountries(self, franchiseRecord):
         """
         Joins the unique list of countries for the given franchise.
@@ -469,7 +944,7 @@ class MetAssembly:
         Returns:
             str: A comma-separated list of unique countries.
         """
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection(self.dbpath, readonly=True) as conn:
             cursor = conn.cursor()
 
             # Find all movies linked to franchiseRecord in filesteps
@@ -481,21 +956,19 @@ class MetAssembly:
                 WHERE filesteps.parent = ?
             """, (franchiseRecord['classifications']['folder'],))
 
-            countries = set()
-            for row in cursor.fetchall():
-                country_list = row[0].split(', ')
-                countries.update(country_list)
+            countries = unique_names(row[0] for row in cursor.fetchall())
 
             if not countries:
-                log_info("No countries found for franchise: {}".format(franchiseRecord['classifications']['folder']))
+                log_info("No countries found for franchise: %s", franchiseRecord['classifications']['folder'])
                 return ""
             
             # Join unique countries into a comma-separated list
             unique_countries = ", ".join(countries)
 
-            log_info("Countries for franchise {}: {}".format(franchiseRecord['classifications']['folder'], unique_countries))
+            log_debug("Countries for franchise %s: %s", franchiseRecord['classifications']['folder'], unique_countries)
             return unique_countries
 
+    @instrumented('latestPoster')
     def latestPoster(self, franchiseRecord):
         """
         Finds the most recent movie release within the franchise and returns its poster.
@@ -506,30 +979,32 @@ class MetAssembly:
         Returns:
             str: The poster URL of the most recent movie release.
         """
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection(self.dbpath, readonly=True) as conn:
             cursor = conn.cursor()
 
-            # Find the most recent movie linked to franchiseRecord in filesteps
+            # Find the most recent movie linked to franchiseRecord in filesteps, sorting on the typed release date
             cursor.execute("""
-                SELECT filemetadata.poster, filemetadata.released
+                SELECT filemetadata.poster
                 FROM filemetadata
+                JOIN filemetadatatyped ON filemetadatatyped.metadata_id = filemetadata.rowid
                 JOIN filepaths ON filemetadata.file_id = filepaths.id
                 JOIN filesteps ON filepaths.id = filesteps.filepath_id
-                WHERE filesteps.parent = ?
+                WHERE filesteps.parent = ? AND filemetadatatyped.released IS NOT NULL
+                ORDER BY filemetadatatyped.released DESC, filesteps.rowid, filemetadata.rowid
+                LIMIT 1
             """, (franchiseRecord['classifications']['folder'],))
+            row = cursor.fetchone()
 
-            posters = [(row[0], datetime.strptime(row[1], "%d %b %Y")) for row in cursor.fetchall() if row[1] and row[1] != 'N/A']
-
-            if not posters:
-                log_info("No poster found for franchise: {}".format(franchiseRecord['classifications']['folder']))
+            if row is None:
+                log_info("No poster found for franchise: %s", franchiseRecord['classifications']['folder'])
                 return ""
             
-            # Find the poster of the most recent release
-            latest_poster = max(posters, key=lambda x: x[1])[0]
+            latest_poster = row[0]
 
-            log_info("Latest poster for franchise {}: {}".format(franchiseRecord['classifications']['folder'], latest_poster))
+            log_debug("Latest poster for franchise %s: %s", franchiseRecord['classifications']['folder'], latest_poster)
             return latest_poster
 
+    @instrumented('meanChildIMDBRating')
     def meanChildIMDBRating(self, franchiseRecord):
         """
         Calculates the average IMDb rating for the given franchise.
@@ -540,32 +1015,17 @@ class MetAssembly:
         Returns:
             float: The average IMDb rating.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-
-            # Find all movies linked to franchiseRecord in filemetadata
-            cursor.execute("""
-                SELECT filemetadata.imdbRating
-                FROM filemetadata
-                JOIN filepaths ON filemetadata.file_id = filepaths.id
-                JOIN filesteps ON filepaths.id = filesteps.filepath_id
-                WHERE filesteps.parent = ?
-            """, (franchiseRecord['classifications']['folder'],))
-
-            imdb_ratings = [row[0] for row in cursor.fetchall() if row[0] not in ('N/A', None)]
+        stats = self.franchiseStats(franchiseRecord)
 
-            if not imdb_ratings:
-                log_info("No IMDb ratings found for franchise: {}".format(franchiseRecord['classifications']['folder']))
-                return 0.0
+        if not stats or not stats['rating_count']:
+            log_info("No IMDb ratings found for franchise: %s", franchiseRecord['classifications']['folder'])
+            return 0.0
 
-            # Convert ratings to float
-            imdb_ratings = [float(rating.split('/')[0]) for rating in imdb_ratings]
-
-            # Calculate the average IMDb rating
-            mean_imdb_rating = sum(imdb_ratings) / len(imdb_ratings)
-            log_info("Mean IMDb rating for franchise {}: {}".format(franchiseRecord['classifications']['folder'], mean_imdb_rating))
-            return mean_imdb_rating
+        mean_imdb_rating = stats['rating']
+        log_debug("Mean IMDb rating for franchise %s: %s", franchiseRecord['classifications']['folder'], mean_imdb_rating)
+        return mean_imdb_rating
 
+    @instrumented('sumChildIMDBVotes')
     def sumChildIMDBVotes(self, franchiseRecord):
         """
         Sums the total IMDb votes for the given franchise.
@@ -576,32 +1036,17 @@ class MetAssembly:
         Returns:
             int: The total IMDb votes.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-
-            # Find all movies linked to franchiseRecord in filesteps
-            cursor.execute("""
-                SELECT filemetadata.imdbVotes
-                FROM filemetadata
-                JOIN filepaths ON filemetadata.file_id = filepaths.id
-                JOIN filesteps ON filepaths.id = filesteps.filepath_id
-                WHERE filesteps.parent = ?
-            """, (franchiseRecord['classifications']['folder'],))
+        stats = self.franchiseStats(franchiseRecord)
 
-            imdb_votes = [row[0] for row in cursor.fetchall() if row[0] not in ('N/A', None)]
+        if not stats or not stats['votes_count']:
+            log_info("No IMDb votes found for franchise: %s", franchiseRecord['classifications']['folder'])
+            return 0
 
-            if not imdb_votes:
-                log_info("No IMDb votes found for franchise: {}".format(franchiseRecord['classifications']['folder']))
-                return 0
-
-            # Convert votes to int
-            imdb_votes = [int(vote.replace(',', '')) for vote in imdb_votes]
-
-            # Return the total IMDb votes
-            total_imdb_votes = sum(imdb_votes)
-            log_info("Total IMDb votes for franchise {}: {}".format(franchiseRecord['classifications']['folder'], total_imdb_votes))
-            return total_imdb_votes
+        total_imdb_votes = stats['votes']
+        log_debug("Total IMDb votes for franchise %s: %s", franchiseRecord['classifications']['folder'], total_imdb_votes)
+        return total_imdb_votes
 
+    @instrumented('meanChildRottenTomatoes')
     def meanChildRottenTomatoes(self, franchiseRecord):
         """
         Calculates the average Rotten Tomatoes rating for the given franchise.
@@ -612,32 +1057,17 @@ class MetAssembly:
         Returns:
             float: The average Rotten Tomatoes rating.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-
-            # Find all movies linked to franchiseRecord in filesteps
-            cursor.execute("""
-                SELECT filemetadata.rottenTomatoes
-                FROM filemetadata
-                JOIN filepaths ON filemetadata.file_id = filepaths.id
-                JOIN filesteps ON filepaths.id = filesteps.filepath_id
-                WHERE filesteps.parent = ?
-            """, (franchiseRecord['classifications']['folder'],))
-
-            rotten_ratings = [row[0] for row in cursor.fetchall() if row[0] not in ('N/A', None)]
-
-            if not rotten_ratings:
-                log_info("No Rotten Tomatoes ratings found for franchise: {}".format(franchiseRecord['classifications']['folder']))
-                return 0.0
+        stats = self.franchiseStats(franchiseRecord)
 
-            # Convert ratings to float
-            rotten_ratings = [float(rating.replace('%', '')) for rating in rotten_ratings]
+        if not stats or not stats['tomatoes_count']:
+            log_info("No Rotten Tomatoes ratings found for franchise: %s", franchiseRecord['classifications']['folder'])
+            return 0.0
 
-            # Return the average Rotten Tomatoes rating
-            average_rotten_rating = sum(rotten_ratings) / len(rotten_ratings)
-            log_info("Average Rotten Tomatoes rating for franchise {}: {}".format(franchiseRecord['classifications']['folder'], average_rotten_rating))
-            return average_rotten_rating
+        average_rotten_rating = stats['tomatoes']
+        log_debug("Average Rotten Tomatoes rating for franchise %s: %s", franchiseRecord['classifications']['folder'], average_rotten_rating)
+        return average_rotten_rating
 
+    @instrumented('sumChildBoxOffice')
     def sumChildBoxOffice(self, franchiseRecord):
         """
         Sums the total box office earnings for the given franchise.
@@ -648,28 +1078,29 @@ class MetAssembly:
         Returns:
             int: The total box office earnings.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
+        stats = self.franchiseStats(franchiseRecord)
 
-            # Find all movies linked to franchiseRecord in filesteps
-            cursor.execute("""
-                SELECT filemetadata.boxOffice
-                FROM filemetadata
-                JOIN filepaths ON filemetadata.file_id = filepaths.id
-                JOIN filesteps ON filepaths.id = filesteps.filepath_id
-                WHERE filesteps.parent = ?
-            """, (franchiseRecord['classifications']['folder'],))
+        if not stats or not stats['boxoffice_count']:
+            log_info("No box office earnings found for franchise: %s", franchiseRecord['classifications']['folder'])
+            return 0
+
+        total_earnings = stats['boxoffice']
+        log_debug("Total box office earnings for franchise %s: %s", franchiseRecord['classifications']['folder'], total_earnings)
+        return total_earnings
 
-            earnings = [row[0] for row in cursor.fetchall() if row[0] not in ('N/A', None)]
 
-            if not earnings:
-                log_info("No box office earnings found for franchise: {}".format(franchiseRecord['classifications']['folder']))
-                return 0
+def _assembleChunk(dbpath, franchiseRecords):
+    """
+    Computes the franchiseassemble rows of a chunk of franchise records in a pool worker.
 
-            # Convert earnings to int
-            earnings = [int(earning.replace('$', '').replace(',', '')) for earning in earnings]
+    Args:
+        dbpath (str): Path to the SQLite database.
+        franchiseRecords (list): Franchise records as built by fetchType.
 
-            # Return the total box office earnings
-            total_earnings = sum(earnings)
-            log_info("Total box office earnings for franchise {}: {}".format(franchiseRecord['classifications']['folder'], total_earnings))
-            return total_earnings
\ No newline at end of file
+    Returns:
+        tuple: The row tuples (franchises without a path are skipped), the chunk's PipelineRun and its generation cache stats.
+    """
+    assembly = MetAssembly(dbpath)
+    texts = assembly.generateTexts(franchiseRecords)
+    rows = [row for row in map(assembly.franchiseRow, franchiseRecords, texts) if row is not None]
+    return rows, assembly.instrument, assembly.generation.stats
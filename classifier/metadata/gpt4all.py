@@ -1,73 +1,686 @@
-import sqlite3
-from gpt4all import GPT4All
-from classifier.utils.config import DB_PATH
-
-model_path = r"C:\Users\DELL\AppData\Local\nomic.ai\GPT4All\Meta-Llama-3-8B-Instruct.Q4_0.gguf"
-
-gpt4all_model = GPT4All(model_path)
-
-def generate_plot(franchiseRecord):
-    # """
-    # Generates a plot summary for the given franchise using GPT-4.
-
-    # Args:
-    #     franchiseRecord (dict): A dictionary containing franchise metadata.
-
-    # Returns:
-    #     str: The generated plot summary.
-    # """
-    # plots = []
-    # with sqlite3.connect(DB_PATH) as conn:
-    #     cursor = conn.cursor()
-    #     cursor.execute("""
-    #         SELECT filemetadata.plot
-    #         FROM filemetadata
-    #         JOIN filepaths ON filemetadata.file_id = filepaths.id
-    #         JOIN filesteps ON filepaths.id = filesteps.filepath_id
-    #         WHERE filesteps.parent = ?
-    #     """, (franchiseRecord['classifications']['folder'],))
-    #     plots = [row[0] for row in cursor.fetchall() if row[0]]
-
-    # if not plots:
-    #     return "No plots found for this franchise."
-
-    # prompt = f"Generate a concise plot summary for the following franchise based on these plots: {plots}. Respond only with the summary, without explanations or commentary."
-
-    # with GPT4All(model_path) as gpt4all_model:
-    #     response = gpt4all_model.generate(prompt, max_tokens=150, temp=0.3, top_k=40, top_p=0.9)
-    
-    # return response.strip()
-    pass
-
-def generate_awards(franchiseRecord):
-    # """
-    # Generates awards information for the given franchise using GPT-4.
-
-    # Args:
-    #     franchiseRecord (dict): A dictionary containing franchise metadata.
-
-    # Returns:
-    #     str: The generated awards information.
-    # """
-    # awards = []
-    # with sqlite3.connect(DB_PATH) as conn:
-    #     cursor = conn.cursor()
-    #     cursor.execute("""
-    #         SELECT filemetadata.awards
-    #         FROM filemetadata
-    #         JOIN filepaths ON filemetadata.file_id = filepaths.id
-    #         JOIN filesteps ON filepaths.id = filesteps.filepath_id
-    #         WHERE filesteps.parent = ?
-    #     """, (franchiseRecord['classifications']['folder'],))
-    #     awards = [row[0] for row in cursor.fetchall() if row[0]]
-
-    # if not awards:
-    #     return "No awards data available for this franchise."
-
-    # prompt = f"Provide only the total number of wins and nominations from the following awards data: {awards}. Format the response as 'Total: X wins & Y nominations' or 'Total Oscars: X Wins: Y Nominations: Z' with no extra text."
-
-    # with GPT4All(model_path) as gpt4all_model:
-    #     response = gpt4all_model.generate(prompt, max_tokens=50, temp=0.1, top_k=10, top_p=0.5)
-
-    # return response.strip()
-    pass
+"""
+Franchise plots and awards generated with a local GPT4All model.
+
+The model is only loaded when text is first generated, never at import. With
+GPT4ALL_SERVER set, generation goes to a long-lived model server instead, so several
+assembly runs and pool workers share one loaded model:
+
+    python -m classifier.metadata.gpt4all --new-key
+    python -m classifier.metadata.gpt4all --port 6011
+
+Clients and the server authenticate with a secret key read from the GPT4ALL_AUTHKEY_ENV
+environment variable or the per-install GPT4ALL_AUTHKEY_FILE, and the server refuses to
+start without one. Requests are pickled, so only share the key with trusted processes
+and keep the server on localhost.
+
+Responses are kept in the generationcache table (classifier.db.generations) under a
+hash of the model, prompt and settings. GenerationService answers a batch of prompts
+from the cache and only sends the misses to the model, so re-assembling a library only
+generates text for franchises whose child plots or awards changed.
+
+Plots are summarized in tiers by summarize_plots(): a cached generation, then the model
+within a per-franchise time budget, then an extractive summary of the movies' own plots,
+so a slow or stalled model cannot hold up assembly for longer than PLOT_BUDGET seconds
+per franchise.
+
+Awards are not generated unless they have to be: summarize_awards() totals the counts
+parsed from the OMDb awards strings (classifier.db.awards) and only asks the model about
+franchises with a string the parser does not recognize.
+
+When the gpt4all package, the model file or the server is unavailable, a warning is
+logged once and the generators return None, which leaves the columns empty; plots
+still get their extractive summaries.
+"""
+
+import argparse
+import os
+import queue
+import re
+import secrets
+import threading
+from concurrent.futures import Future, TimeoutError
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from classifier.utils.config import DB_PATH, LLM_GENERATION, GPT4ALL_MODEL_PATH, GPT4ALL_SERVER, GPT4ALL_AUTHKEY_ENV, GPT4ALL_AUTHKEY_FILE, GENERATION_BATCH, PLOT_BUDGET
+from classifier.utils.logger import log_info, log_warning, log_error, log_debug
+from classifier.db.connection import get_connection, writer
+from classifier.db.generations import generation_key, install_generation_cache, load_generations, store_generations
+from classifier.db.awards import install_awards, ingest_awards, load_folder_awards, format_awards
+from classifier.db.optimizer import table_exists
+
+# Generation settings of each prompt kind
+PLOT_OPTIONS = {"max_tokens": 150, "temp": 0.3, "top_k": 40, "top_p": 0.9}
+AWARDS_OPTIONS = {"max_tokens": 50, "temp": 0.1, "top_k": 10, "top_p": 0.5}
+
+# Prompt kinds: the filemetadata column they summarize, the text used when it is empty, the prompt and its settings
+PROMPTS = {
+    "plot": (
+        "plot",
+        "No plots found for this franchise.",
+        "Generate a concise plot summary for the following franchise based on these plots: {values}. Respond only with the summary, without explanations or commentary.",
+        PLOT_OPTIONS,
+    ),
+    "awards": (
+        "awards",
+        "No awards data available for this franchise.",
+        "Provide only the total number of wins and nominations from the following awards data: {values}. Format the response as 'Total: X wins & Y nominations' or 'Total Oscars: X Wins: Y Nominations: Z' with no extra text.",
+        AWARDS_OPTIONS,
+    ),
+}
+
+# Longest extractive plot summary in characters, about the length of a generated one
+EXTRACTIVE_LENGTH = 600
+
+# Sentence boundaries of OMDb plots
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+_model = None
+_model_missing = False
+_model_lock = threading.Lock()
+_client = threading.local()
+_server_missing = False
+_jobs = None
+_jobs_pid = None
+_jobs_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # A model left mid-generation by a thread that did not survive the fork cannot be used again
+    global _model, _model_lock, _jobs_lock
+    if _model_lock.locked():
+        _model = None
+    _model_lock = threading.Lock()
+    _jobs_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def load_model(model_path=GPT4ALL_MODEL_PATH):
+    """
+    Returns the GPT4All model, loading it on first use.
+
+    Args:
+        model_path (str): Path to the model file.
+
+    Returns:
+        GPT4All: The model, or None if the gpt4all package or the model file is missing.
+    """
+    global _model, _model_missing
+    with _model_lock:
+        if _model is None and not _model_missing:
+            if not os.path.isfile(model_path):
+                log_warning("GPT4All model not found at %s; text generation is skipped", model_path)
+                _model_missing = True
+                return None
+            try:
+                from gpt4all import GPT4All
+            except ImportError:
+                log_warning("The gpt4all package is not installed; text generation is skipped")
+                _model_missing = True
+                return None
+            log_info("Loading GPT4All model %s", model_path)
+            _model = GPT4All(model_path)
+        return _model
+
+
+def generate_local(prompts, options):
+    """
+    Generates text for a batch of prompts with the model loaded in this process.
+
+    Generation is serialized, since one model instance cannot serve concurrent calls.
+
+    Args:
+        prompts (list): The prompts.
+        options (dict): Keyword arguments of GPT4All.generate.
+
+    Returns:
+        list: The stripped responses in prompt order, or None if the model is unavailable.
+    """
+    model = load_model()
+    if model is None:
+        return None
+    with _model_lock:
+        return [model.generate(prompt, **options).strip() for prompt in prompts]
+
+
+def load_authkey(path=GPT4ALL_AUTHKEY_FILE):
+    """
+    Reads the model server's secret key from GPT4ALL_AUTHKEY_ENV, or else from the key file.
+
+    Args:
+        path (str): The key file.
+
+    Returns:
+        bytes: The key, or None if neither the environment variable nor the file holds one.
+    """
+    key = os.environ.get(GPT4ALL_AUTHKEY_ENV, "").strip()
+    if not key:
+        try:
+            with open(path, encoding="utf-8") as f:
+                key = f.read().strip()
+        except OSError:
+            return None
+    return key.encode("utf-8") if key else None
+
+
+def create_authkey(path=GPT4ALL_AUTHKEY_FILE):
+    """
+    Writes a new random secret key to the key file, readable only by its owner.
+
+    Args:
+        path (str): The key file.
+
+    Returns:
+        str: The key file's path.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(secrets.token_hex(32))
+    return path
+
+
+def generate_remote(prompts, options, address=GPT4ALL_SERVER, authkey=None):
+    """
+    Generates text for a batch of prompts on the shared model server, in one round trip over this thread's connection.
+
+    Args:
+        prompts (list): The prompts.
+        options (dict): Keyword arguments of GPT4All.generate.
+        address: The server address, as given to multiprocessing.connection.Client.
+        authkey (bytes): The server's authentication key, defaults to load_authkey().
+
+    Returns:
+        list: The responses in prompt order, or None if the server is unreachable, has no model or no key is configured.
+    """
+    global _server_missing
+    if _server_missing:
+        return None
+    conn = getattr(_client, "conn", None)
+    for attempt in range(2):
+        try:
+            if conn is None or getattr(_client, "pid", None) != os.getpid():
+                authkey = authkey or load_authkey()
+                if authkey is None:
+                    log_warning("No GPT4All server key in $%s or %s; text generation is skipped", GPT4ALL_AUTHKEY_ENV, GPT4ALL_AUTHKEY_FILE)
+                    _server_missing = True
+                    return None
+                conn = _client.conn = Client(address, authkey=authkey)
+                _client.pid = os.getpid()
+            conn.send(("generate", list(prompts), options))
+            status, result = conn.recv()
+            break
+        except (OSError, EOFError, AuthenticationError) as e:
+            # A dropped connection is retried once on a new one
+            conn = _client.conn = None
+            if attempt:
+                log_warning("GPT4All server at %s is unreachable (%s); text generation is skipped", address, e)
+                _server_missing = True
+                return None
+    if status != "ok":
+        log_error("GPT4All server failed to generate: %s", result)
+        return None
+    return result
+
+
+def generate(prompts, options):
+    """
+    Generates text for a batch of prompts with the shared model server if one is configured, otherwise in this process.
+
+    Args:
+        prompts (list): The prompts.
+        options (dict): Keyword arguments of GPT4All.generate.
+
+    Returns:
+        list: The responses in prompt order, or None if no model is available.
+    """
+    if GPT4ALL_SERVER is not None:
+        return generate_remote(prompts, options, GPT4ALL_SERVER)
+    return generate_local(prompts, options)
+
+
+def submit(prompts, options):
+    """
+    Queues a batch of prompts for this process's background generation thread, starting it on first use.
+
+    The caller can wait for the responses with a timeout and leave a slow batch to finish on its own.
+
+    Args:
+        prompts (list): The prompts.
+        options (dict): Keyword arguments of GPT4All.generate.
+
+    Returns:
+        concurrent.futures.Future: The future of the responses, as returned by generate.
+    """
+    global _jobs, _jobs_pid
+    with _jobs_lock:
+        if _jobs is None or _jobs_pid != os.getpid():
+            _jobs, _jobs_pid = queue.Queue(), os.getpid()
+            threading.Thread(target=_generate_jobs, args=(_jobs,), name="gpt4all-generation", daemon=True).start()
+    future = Future()
+    _jobs.put((prompts, options, future))
+    return future
+
+
+def _generate_jobs(jobs):
+    # Body of the background generation thread
+    while True:
+        prompts, options, future = jobs.get()
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            future.set_result(generate(prompts, options))
+        except Exception as e:
+            future.set_exception(e)
+
+
+class GenerationService:
+    """
+    Answers generation requests from the persistent generation cache, sending only the misses to the model.
+
+    Misses are generated GENERATION_BATCH prompts at a time, and each batch is cached in one
+    transaction. Responses are not cached when no model is available.
+
+    Given a time budget, batches are generated on the background generation thread instead, and a
+    batch that is not done in time is abandoned: the call returns without it and generates nothing
+    more. An abandoned batch that the model already started is still cached when it finishes, and
+    until then later calls with a budget skip generation rather than queue behind it.
+
+    Attributes:
+        dbpath (str): Path to the SQLite database holding the cache.
+        batch_size (int): Prompts sent to the model per batch.
+        model (str): The model file name, part of every cache key.
+        stats (dict): Prompts served from the cache ("hits"), not found in it ("misses"), generated ("generated")
+            and left ungenerated when the time budget ran out ("expired").
+    """
+
+    def __init__(self, dbpath=DB_PATH, batch_size=GENERATION_BATCH, model_path=GPT4ALL_MODEL_PATH):
+        """
+        Initializes the GenerationService instance.
+
+        Args:
+            dbpath (str): Path to the SQLite database holding the cache.
+            batch_size (int): Prompts sent to the model per batch.
+            model_path (str): Path to the model file.
+        """
+        self.dbpath = dbpath
+        self.batch_size = batch_size
+        self.model = re.split(r"[\\/]", model_path)[-1]
+        self.stats = {"hits": 0, "misses": 0, "generated": 0, "expired": 0}
+        self.installed = False
+        self.abandoned = None
+
+    def generate(self, kind, prompts, options):
+        """
+        Returns the responses to a batch of prompts, generating those that are not cached.
+
+        Args:
+            kind (str): The prompt kind, e.g. "plot".
+            prompts (list): The prompts.
+            options (dict): Keyword arguments of GPT4All.generate.
+
+        Returns:
+            list: The responses in prompt order, None where no model was available.
+        """
+        return [response for response, _ in self.answer(kind, prompts, options)]
+
+    def answer(self, kind, prompts, options, budget=None):
+        """
+        Returns the responses to a batch of prompts with where each came from, generating those that are not cached.
+
+        Args:
+            kind (str): The prompt kind, e.g. "plot".
+            prompts (list): The prompts.
+            options (dict): Keyword arguments of GPT4All.generate.
+            budget (float): Seconds each uncached prompt may take to generate, or None to wait indefinitely.
+
+        Returns:
+            list: (response, tier) tuples in prompt order, where tier is "cache" or "model";
+                (None, None) where no model was available or the budget ran out.
+        """
+        if not self.installed:
+            with writer(self.dbpath) as conn:
+                install_generation_cache(conn)
+            self.installed = True
+
+        keys = [generation_key(self.model, prompt, options) for prompt in prompts]
+        with get_connection(self.dbpath, readonly=True) as conn:
+            cached = load_generations(conn, set(keys))
+        hits = [key for key in keys if key in cached]
+        missing = {key: prompt for key, prompt in zip(keys, prompts) if key not in cached}
+        self.stats["hits"] += len(hits)
+        self.stats["misses"] += len(keys) - len(hits)
+
+        fresh = {}
+        items = list(missing.items())
+        if items and budget is not None and self.abandoned is not None and not self.abandoned.done():
+            log_debug("The model is still busy with an abandoned batch; %d %s prompts are left ungenerated", len(items), kind)
+            self.stats["expired"] += len(items)
+            items = []
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            if budget is None:
+                responses = generate([prompt for _, prompt in batch], options)
+            else:
+                future = submit([prompt for _, prompt in batch], options)
+                try:
+                    responses = future.result(timeout=budget * len(batch))
+                except TimeoutError:
+                    if not future.cancel():
+                        self.abandoned = future
+                        future.add_done_callback(lambda done, batch=batch: self.storeLate(kind, batch, done))
+                    self.stats["expired"] += len(items) - start
+                    log_warning("Generation exceeded its %.1fs budget per prompt; %d %s prompts are left ungenerated",
+                                budget, len(items) - start, kind)
+                    break
+            if responses is None:
+                break
+            fresh.update(self.store(kind, batch, responses))
+        if hits:
+            with writer(self.dbpath) as conn:
+                store_generations(conn, kind, (), hits)
+        self.stats["generated"] += len(fresh)
+        return [
+            (cached[key], "cache") if key in cached else (fresh[key], "model") if key in fresh else (None, None)
+            for key in keys
+        ]
+
+    def store(self, kind, batch, responses):
+        """
+        Caches the responses to a batch of prompts in one transaction.
+
+        Args:
+            kind (str): The prompt kind, e.g. "plot".
+            batch (list): The (key, prompt) tuples of the batch.
+            responses (list): The responses in batch order.
+
+        Returns:
+            list: The (key, response) tuples cached; missing responses are left out.
+        """
+        generated = [(key, response) for (key, _), response in zip(batch, responses) if response is not None]
+        with writer(self.dbpath) as conn:
+            store_generations(conn, kind, generated)
+        return generated
+
+    def storeLate(self, kind, batch, future):
+        # Done callback of an abandoned batch: its responses are cached for later runs
+        if not future.cancelled() and future.exception() is None and future.result() is not None:
+            self.store(kind, batch, future.result())
+
+    def merge(self, stats):
+        """
+        Adds the counts of another service, such as one used by a pool worker.
+
+        Args:
+            stats (dict): The other service's `stats`.
+        """
+        for name, count in stats.items():
+            self.stats[name] += count
+
+
+def child_values(column, folder, dbpath=DB_PATH):
+    """
+    Returns the non-empty values of a filemetadata column for the files directly under a folder.
+
+    Args:
+        column (str): The filemetadata column, e.g. "plot".
+        folder (str): The folder name, as stored in filesteps.parent.
+        dbpath (str): Path to the SQLite database.
+
+    Returns:
+        list: The values, in file order.
+    """
+    with get_connection(dbpath, readonly=True) as conn:
+        cursor = conn.execute("""
+            SELECT filemetadata.{}
+            FROM filemetadata
+            JOIN filepaths ON filemetadata.file_id = filepaths.id
+            JOIN filesteps ON filepaths.id = filesteps.filepath_id
+            WHERE filesteps.parent = ?
+            ORDER BY filesteps.rowid, filemetadata.rowid
+        """.format(column), (folder,))
+        return [row[0] for row in cursor.fetchall() if row[0]]
+
+
+def generate_texts(kind, franchiseRecords, dbpath=DB_PATH, service=None):
+    """
+    Generates one kind of text for several franchises, as one batch of prompts.
+
+    Args:
+        kind (str): A key of PROMPTS, "plot" or "awards".
+        franchiseRecords (list): Franchise records as built by MetAssembly.fetchType.
+        dbpath (str): Path to the SQLite database.
+        service (GenerationService): The service answering the prompts; a new one is used if None.
+
+    Returns:
+        list: The texts in record order, None where generation is disabled or no model is available.
+    """
+    texts = [None] * len(franchiseRecords)
+    if not LLM_GENERATION:
+        return texts
+
+    column, empty, template, options = PROMPTS[kind]
+    prompts = {}
+    for index, franchiseRecord in enumerate(franchiseRecords):
+        values = child_values(column, franchiseRecord['classifications']['folder'], dbpath)
+        if values:
+            prompts[index] = template.format(values=values)
+        else:
+            texts[index] = empty
+
+    if prompts:
+        service = service or GenerationService(dbpath)
+        for index, text in zip(prompts, service.generate(kind, list(prompts.values()), options)):
+            texts[index] = text
+    return texts
+
+
+def extractive_plot(plots, length=EXTRACTIVE_LENGTH):
+    """
+    Summarizes a franchise from its movies' plots without the model.
+
+    Sentences are taken by rank: the first sentence of every plot in order, then the second ones,
+    and so on, skipping repeats, until the summary would exceed `length` characters.
+
+    Args:
+        plots (list): The movies' plots, in file order.
+        length (int): The longest summary in characters; the first sentence is always kept.
+
+    Returns:
+        str: The summary.
+    """
+    sentences = [SENTENCE_END.split(plot.strip()) for plot in plots]
+    chosen, seen, size = [], set(), 0
+    for rank in range(max(map(len, sentences))):
+        for plot in sentences:
+            if rank >= len(plot) or plot[rank] in seen:
+                continue
+            if chosen and size + 1 + len(plot[rank]) > length:
+                return " ".join(chosen)
+            seen.add(plot[rank])
+            chosen.append(plot[rank])
+            size += len(plot[rank]) + (1 if size else 0)
+    return " ".join(chosen)
+
+
+def summarize_plots(franchiseRecords, dbpath=DB_PATH, service=None, budget=PLOT_BUDGET):
+    """
+    Summarizes the plots of several franchises, each with the first tier that answers in time.
+
+    The tiers are "cache" (a generation cached by an earlier run), "model" (generated as one batch of
+    prompts, within `budget` seconds per franchise) and "extractive" (extractive_plot of the movies'
+    plots, when generation is disabled, unavailable or too slow). Franchises without plots get the
+    "empty" tier.
+
+    Args:
+        franchiseRecords (list): Franchise records as built by MetAssembly.fetchType.
+        dbpath (str): Path to the SQLite database.
+        service (GenerationService): The service answering the prompts; a new one is used if None.
+        budget (float): Seconds of generation allowed per franchise, or None to wait indefinitely.
+
+    Returns:
+        list: (plot, tier) tuples in record order.
+    """
+    column, empty, template, options = PROMPTS["plot"]
+    summaries = [(empty, "empty")] * len(franchiseRecords)
+    plots = {}
+    for index, franchiseRecord in enumerate(franchiseRecords):
+        values = child_values(column, franchiseRecord['classifications']['folder'], dbpath)
+        if values:
+            plots[index] = values
+
+    answers = [(None, None)] * len(plots)
+    if plots and LLM_GENERATION:
+        service = service or GenerationService(dbpath)
+        answers = service.answer("plot", [template.format(values=values) for values in plots.values()], options, budget)
+    for (index, values), (text, tier) in zip(plots.items(), answers):
+        if text:
+            summaries[index] = (text, tier)
+            continue
+        values = [value for value in values if value != "N/A"]
+        if values:
+            summaries[index] = (extractive_plot(values), "extractive")
+    return summaries
+
+
+def generate_plot(franchiseRecord, dbpath=DB_PATH, service=None, budget=PLOT_BUDGET):
+    """
+    Summarizes the plot of the given franchise from its movies' plots, see summarize_plots.
+
+    Args:
+        franchiseRecord (dict): A dictionary containing franchise metadata.
+        dbpath (str): Path to the SQLite database.
+        service (GenerationService): The service answering the prompt; a new one is used if None.
+        budget (float): Seconds of generation allowed, or None to wait indefinitely.
+
+    Returns:
+        str: The plot summary.
+    """
+    return summarize_plots([franchiseRecord], dbpath, service, budget)[0][0]
+
+
+def summarize_awards(franchiseRecords, dbpath=DB_PATH, service=None):
+    """
+    Totals the awards of several franchises from the parsed counts of their movies' awards.
+
+    Franchises with an awards string the parser does not recognize fall back to generate_texts,
+    as one batch of prompts.
+
+    Args:
+        franchiseRecords (list): Franchise records as built by MetAssembly.fetchType.
+        dbpath (str): Path to the SQLite database.
+        service (GenerationService): The service answering fallback prompts; a new one is used if None.
+
+    Returns:
+        list: The awards texts in record order, None where a fallback was needed but generation is disabled or no model is available.
+    """
+    with get_connection(dbpath, readonly=True) as conn:
+        installed = table_exists(conn, "fileawards")
+    if not installed:
+        with writer(dbpath) as conn:
+            install_awards(conn)
+            ingest_awards(conn)
+
+    folders = [franchiseRecord['classifications']['folder'] for franchiseRecord in franchiseRecords]
+    with get_connection(dbpath, readonly=True) as conn:
+        awards = load_folder_awards(conn, set(folders))
+
+    texts, fallback = [], []
+    for index, folder in enumerate(folders):
+        counts = awards.get(folder, {})
+        if counts is None:
+            fallback.append(index)
+            texts.append(None)
+        else:
+            texts.append(format_awards(counts) if counts else PROMPTS["awards"][1])
+
+    if fallback:
+        generated = generate_texts("awards", [franchiseRecords[index] for index in fallback], dbpath, service)
+        for index, text in zip(fallback, generated):
+            texts[index] = text
+    return texts
+
+
+def generate_awards(franchiseRecord, dbpath=DB_PATH, service=None):
+    """
+    Totals the awards of the given franchise from its movies' awards, generating them only when they cannot be parsed.
+
+    Args:
+        franchiseRecord (dict): A dictionary containing franchise metadata.
+        dbpath (str): Path to the SQLite database.
+        service (GenerationService): The service answering a fallback prompt; a new one is used if None.
+
+    Returns:
+        str: The awards information, or None if it needed generating but generation is disabled or no model is available.
+    """
+    return summarize_awards([franchiseRecord], dbpath, service)[0]
+
+
+def serve_client(conn):
+    """
+    Answers one client's generation requests until it disconnects.
+
+    Args:
+        conn (multiprocessing.connection.Connection): The client connection.
+    """
+    try:
+        while True:
+            request = conn.recv()
+            try:
+                kind, prompts, options = request
+                if kind != "generate":
+                    raise ValueError("Unknown request: {}".format(kind))
+                result = generate_local(prompts, options)
+                conn.send(("ok", result) if result is not None else ("error", "no model available"))
+            except Exception as e:
+                conn.send(("error", str(e)))
+    except (EOFError, OSError):
+        pass
+    finally:
+        conn.close()
+
+
+def serve(address=GPT4ALL_SERVER, authkey=None, model_path=GPT4ALL_MODEL_PATH):
+    """
+    Runs the shared model server, with one thread per client connection.
+
+    The server does not start without a secret key. The model is loaded before the first
+    client is accepted.
+
+    Args:
+        address: The address to listen on, as given to multiprocessing.connection.Listener.
+        authkey (bytes): The key clients must authenticate with, defaults to load_authkey().
+        model_path (str): Path to the model file.
+    """
+    authkey = authkey or load_authkey()
+    if authkey is None:
+        log_error("GPT4All server not started: set $%s or create %s with --new-key", GPT4ALL_AUTHKEY_ENV, GPT4ALL_AUTHKEY_FILE)
+        return
+    if load_model(model_path) is None:
+        log_error("GPT4All server not started: no model available")
+        return
+    with Listener(address, authkey=authkey) as listener:
+        log_info("GPT4All server listening on %s", listener.address)
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                # Failed handshakes (e.g. a wrong key) do not stop the server
+                log_warning("GPT4All server rejected a connection: %s", e)
+                continue
+            threading.Thread(target=serve_client, args=(conn,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the local GPT4All model to assembly runs and workers")
+    parser.add_argument("--host", default=GPT4ALL_SERVER[0] if GPT4ALL_SERVER else "localhost")
+    parser.add_argument("--port", type=int, default=GPT4ALL_SERVER[1] if GPT4ALL_SERVER else 6011)
+    parser.add_argument("--model", default=GPT4ALL_MODEL_PATH)
+    parser.add_argument("--new-key", action="store_true", help="write a new secret key to GPT4ALL_AUTHKEY_FILE and exit")
+    args = parser.parse_args()
+    if args.new_key:
+        log_info("GPT4All server key written to %s", create_authkey())
+    else:
+        serve((args.host, args.port), model_path=args.model)
@@ -0,0 +1,382 @@
+"""
+This module contains the ColumnarEngine class, which runs the SortingHat's full
+classification as column operations on pandas and numpy arrays instead of
+per-folder Python loops.
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from classifier.utils.config import EXCLUDED_FOLDERS
+from classifier.utils.logger import log_info, log_warning, summarize
+from classifier.db.connection import get_connection
+from classifier.utils.instrument import instrumented
+from .rules import DEFAULT_RULES, SCOPE_SEPARATOR
+
+# Types that group other releases, as in the sorter
+COLLECTIONS = ('Franchise', 'Series', 'Season')
+
+# Types whose genres come from their own file
+RELEASES = ('Movie', 'Episode')
+
+# Top-level type folders filterDAG always removes
+TYPES = {"E:", "Films", "Media", "Series", "Movies"}
+
+# Ancestry walks longer than this are treated as cycles and handed to the sorter's index
+MAX_ANCESTRY_DEPTH = 64
+
+
+class ColumnarEngine:
+    """
+    Classifies a SortingHat's folders with grouped reductions and joins over columnar frames.
+
+    filesteps is loaded into a frame once and every folder name is interned to an integer
+    code, so the DAG's edges, the "all children are movies" / "all children are seasons or
+    episodes" reductions, the first-parent ancestry walk and the genre joins all run on
+    integer columns. Folder names are labelled with vectorized regular expression matches,
+    and genres are propagated with joins instead of recursive lookups. The results are
+    written into the hat's `classifications` and `folder_genres`, so they match
+    `SortingHat.analyzeStructure()` and are saved by the same methods.
+
+    Attributes:
+        hat (SortingHat): The hat whose rules, database and results are used.
+        instrument (PipelineRun): The hat's current run, so the engine's stages are measured with it.
+        names (ndarray): Folder names, indexed by their code.
+        labels (ndarray): The name label (or None) of each folder, indexed by code.
+        steps (DataFrame): The filesteps rows in rowid order, with parent and child codes and the filepath_id.
+        edges (DataFrame): Unique (parent, child) code pairs in DAG order.
+        types (ndarray): The classification (or None) of each folder, indexed by code.
+    """
+
+    def __init__(self, hat):
+        """
+        Initializes the ColumnarEngine instance.
+
+        Args:
+            hat (SortingHat): The hat to classify for.
+        """
+        self.hat = hat
+        self.instrument = hat.instrument
+        self.names = None
+        self.labels = None
+        self.steps = None
+        self.edges = None
+        self.types = None
+
+    def analyze(self, genres, studios):
+        """
+        Classifies every folder and assembles their genres into the hat.
+
+        Args:
+            genres (set): A set of unique genres.
+            studios (set): A set of studios to filter out.
+
+        Returns:
+            dict: The hat's classifications.
+        """
+        self.loadFrames()
+        filtered, new_genres = self.classifyFolders()
+        self.hat.saveGenres(new_genres, genres, studios)
+        self.assembleGenres(filtered)
+        return self.hat.classifications
+
+    @instrumented('columnar.loadFrames', rows=lambda engine, steps: len(steps))
+    def loadFrames(self):
+        """
+        Loads filesteps, interns its folder names and labels them.
+
+        Season folders are keyed by their show with the hat's RuleEngine.scopeSteps, as
+        buildDAG does. Rows with a NULL parent or child are left out of the edges.
+
+        Returns:
+            DataFrame: The filesteps rows, with folder codes.
+        """
+        start = time.perf_counter()
+        with get_connection(self.hat.dbpath, readonly=True) as conn:
+            cursor = conn.execute("SELECT filepath_id, parent, child FROM filesteps ORDER BY rowid")
+            steps = pd.DataFrame(list(self.hat.rules.scopeSteps(cursor)), columns=['filepath_id', 'parent', 'child'])
+        codes, names = pd.factorize(pd.concat([steps['parent'], steps['child']], ignore_index=True))
+        self.names = np.asarray(names, dtype=object)
+        self.steps = pd.DataFrame({
+            'parent': codes[:len(steps)],
+            'child': codes[len(steps):],
+            'filepath_id': steps['filepath_id'].to_numpy(),
+        })
+        # Unique edges keep their first row's position, which is the DAG's parent and child order
+        edges = self.steps[(self.steps['parent'] >= 0) & (self.steps['child'] >= 0)]
+        self.edges = edges.drop_duplicates(['parent', 'child'])[['parent', 'child']].reset_index(drop=True)
+        self.labels = self.labelNames(self.names)
+        log_info("Loaded %d filesteps rows (%d edges, %d names) in %.3fs",
+                 len(self.steps), len(self.edges), len(self.names), time.perf_counter() - start)
+        return self.steps
+
+    def labelNames(self, names):
+        """
+        Labels folder names with the hat's class rules, reading scoped names by their last folder name.
+
+        With the default class rules every rule is matched over all names at once, lowest
+        priority first so higher-priority labels overwrite it. Their patterns cannot overlap
+        in a way that changes RuleEngine's choice, so the labels are the same as classifyName.
+        Other rule sets go through classifyName.
+
+        Args:
+            names (ndarray): Unique folder names.
+
+        Returns:
+            ndarray: The class label (or None) of each name.
+        """
+        rules = self.hat.rules
+        class_rules = [rule for rule in rules.rules if rule.kind == 'class']
+        if class_rules != [rule for rule in DEFAULT_RULES if rule.kind == 'class']:
+            return np.array(rules.classifyAll(names), dtype=object)
+
+        values = pd.Series(names, dtype=object).str.rpartition(SCOPE_SEPARATOR)[2]
+        labels = np.full(len(names), None, dtype=object)
+        for rule in reversed(class_rules):
+            labels[values.str.contains(rule.pattern, regex=True, na=False).to_numpy()] = rule.label
+        return labels
+
+    @instrumented('columnar.classifyFolders', rows=lambda engine, result: len(engine.hat.classifications))
+    def classifyFolders(self):
+        """
+        Classifies the parents and children of the filtered DAG.
+
+        Returns:
+            tuple: The filtered edges (DataFrame) in DAG order and the set of parents to store as genres.
+        """
+        start = time.perf_counter()
+        count = len(self.names)
+        parent = self.edges['parent'].to_numpy()
+        child = self.edges['child'].to_numpy()
+        child_labels = self.labels[child]
+
+        # "All children are ..." is a grouped count of matching children against all children
+        children = np.bincount(parent, minlength=count)
+        all_movies = np.bincount(parent, weights=_matches(child_labels, ('Movie',)), minlength=count) == children
+        all_seasonal = np.bincount(parent, weights=_matches(child_labels, ('Season', 'Episode')), minlength=count) == children
+
+        to_remove = set(TYPES)
+        with get_connection(self.hat.dbpath, readonly=True) as conn:
+            to_remove.update(row[0] for row in conn.execute("SELECT name FROM genre"))
+        names = pd.Series(self.names, dtype=object)
+        removed = names.isin(to_remove).to_numpy()
+        typed = names.isin(TYPES).to_numpy()
+        labelled = pd.notna(self.labels)
+
+        # Folders stored as genres by earlier runs are kept when the rules now recognise them
+        parents = pd.unique(parent)
+        parents = parents[~removed[parents] | (~typed[parents] & (labelled[parents] | all_seasonal[parents]))]
+        parent_labels = self.labels[parents]
+        parent_labels[_matches(parent_labels, ('Movie',)) & all_seasonal[parents]] = 'Series'
+        parent_labels[~labelled[parents] & all_movies[parents]] = 'Franchise'
+        parent_labels[pd.isna(parent_labels) & all_seasonal[parents]] = 'Series'
+        unlabelled = pd.isna(parent_labels)
+        new_genres = set(self.names[parents[unlabelled]])
+
+        # Children are visited parent by parent, in the filtered DAG's order
+        position = np.full(count, -1)
+        position[parents] = np.arange(len(parents))
+        filtered = self.edges[position[parent] >= 0]
+        filtered = filtered.iloc[np.argsort(position[filtered['parent'].to_numpy()], kind='stable')].reset_index(drop=True)
+
+        self.types = np.full(count, None, dtype=object)
+        self.types[parents] = parent_labels
+        members = pd.unique(filtered['child'].to_numpy())
+        members = members[pd.isna(self.types[members]) & labelled[members]]
+        self.types[members] = self.labels[members]
+
+        classifications = dict(zip(self.names[parents[~unlabelled]], parent_labels[~unlabelled]))
+        classifications.update(zip(self.names[members], self.labels[members]))
+        self.hat.classifications = classifications
+        log_info("Classified %d folders (%d parents, %d new genres) in %.3fs",
+                 len(classifications), len(parents), len(new_genres), time.perf_counter() - start)
+        return filtered, new_genres
+
+    def firstSteps(self):
+        """
+        Returns the first filesteps row of every child, as a `WHERE child = ?` lookup returns.
+
+        Returns:
+            DataFrame: One row per child code.
+        """
+        first = self.steps.drop_duplicates('child')
+        return first[first['child'] >= 0]
+
+    def fileGenres(self):
+        """
+        Joins every folder's first filesteps row to its file and the first metadata row of the file's title.
+
+        Returns:
+            ndarray: The file genre (or None) of each folder, indexed by code.
+        """
+        with get_connection(self.hat.dbpath, readonly=True) as conn:
+            paths = pd.read_sql_query("SELECT id, filetitle FROM filepaths WHERE filetitle IS NOT NULL", conn)
+            metadata = pd.read_sql_query("SELECT title, genre FROM filemetadata WHERE title IS NOT NULL ORDER BY rowid", conn)
+        files = self.firstSteps().merge(paths, left_on='filepath_id', right_on='id').merge(
+            metadata.drop_duplicates('title'), left_on='filetitle', right_on='title')
+        files = files[files['genre'].notna()]
+        genres = np.full(len(self.names), None, dtype=object)
+        genres[files['child'].to_numpy()] = files['genre'].to_numpy(dtype=object)
+        return genres
+
+    def ancestryPairs(self, folders):
+        """
+        Finds the ancestry genres of folders by walking their first parents one level per step.
+
+        Args:
+            folders (ndarray): Codes of the folders whose ancestry to find.
+
+        Returns:
+            DataFrame: (folder, source) code rows, where the source is an ancestor whose name is a genre.
+        """
+        first = self.firstSteps()
+        first_parents = np.full(len(self.names), -1)
+        first_parents[first['child'].to_numpy()] = first['parent'].to_numpy()
+        excluded = pd.Series(self.names, dtype=object).isin(EXCLUDED_FOLDERS).to_numpy()
+        collections = _matches(self.types, COLLECTIONS)
+
+        pairs = [pd.DataFrame({'folder': np.array([], dtype=np.int64), 'source': np.array([], dtype=np.int64)})]
+        folder, node = folders, first_parents[folders]
+        for _ in range(MAX_ANCESTRY_DEPTH):
+            walking = node >= 0
+            walking[walking] = ~excluded[node[walking]]
+            folder, node = folder[walking], node[walking]
+            if not len(folder):
+                return pd.concat(pairs, ignore_index=True)
+            # Franchise, Series and Season ancestors are passed through without being added
+            inherited = ~collections[node]
+            pairs.append(pd.DataFrame({'folder': folder[inherited], 'source': node[inherited]}))
+            node = first_parents[node]
+
+        # Only a cycle in the folder names walks this far, so fall back to the sorter's handling of it
+        log_warning("Folder names form a cycle, using the sorter's ancestry index")
+        index = self.hat.buildAncestryIndex()
+        rows = [(code, genre) for code in folders for genre in index.get(self.names[code], ())]
+        return pd.DataFrame({
+            'folder': np.array([code for code, _ in rows], dtype=np.int64),
+            'source': pd.Index(self.names).get_indexer([genre for _, genre in rows]),
+        })
+
+    @staticmethod
+    def splitTokens(*sources):
+        """
+        Splits strings into the stripped comma-separated parts folderGenre reads back.
+
+        The parts of all sources share one vocabulary ranked in string order, so sorting
+        parts by token sorts them the way folderGenre does.
+
+        Args:
+            *sources (tuple): (keys, strings) pairs of integer keys and the strings to split.
+
+        Returns:
+            tuple: A (key, token) DataFrame per source, and the vocabulary (ndarray) indexed by token.
+        """
+        keys, parts, bounds = [], [], []
+        for source_keys, strings in sources:
+            for key, string in zip(source_keys, strings):
+                for part in string.split(','):
+                    keys.append(key)
+                    parts.append(part.strip())
+            bounds.append(len(parts))
+        ids, vocabulary = pd.factorize(np.array(parts, dtype=object))
+        vocabulary = np.asarray(vocabulary, dtype=object)
+        order = np.argsort(vocabulary, kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        tokens = rank[ids]
+        keys = np.array(keys, dtype=np.int64)
+
+        frames, start = [], 0
+        for end in bounds:
+            frames.append(pd.DataFrame({'key': keys[start:end], 'token': tokens[start:end]}))
+            start = end
+        return frames, vocabulary[order]
+
+    @instrumented('columnar.assembleGenres', rows=lambda engine, folder_genres: len(folder_genres))
+    def assembleGenres(self, filtered):
+        """
+        Propagates genres to every classified folder with joins.
+
+        Movies and episodes combine their ancestry genres with their file genres. Franchises
+        and seasons take their release members' file genres, and series take the genres of
+        their seasons, so each season's members are gathered once.
+
+        Args:
+            filtered (DataFrame): The filtered DAG's (parent, child) code edges.
+
+        Returns:
+            dict: The hat's folder_genres.
+        """
+        start = time.perf_counter()
+        hat = self.hat
+        file_genres = self.fileGenres()
+        has_genre = pd.notna(file_genres)
+        releases = np.flatnonzero(_matches(self.types, RELEASES) & has_genre)
+        ancestry = self.ancestryPairs(releases)
+
+        # Each distinct genre string and ancestor name is split once
+        genre_of = np.full(len(self.names), -1)
+        genre_of[has_genre], genre_strings = pd.factorize(pd.Series(file_genres[has_genre], dtype=object))
+        ancestors = pd.unique(ancestry['source'].to_numpy())
+        (genre_tokens, name_tokens), vocabulary = self.splitTokens(
+            (np.arange(len(genre_strings)), genre_strings), (ancestors, self.names[ancestors]))
+
+        def tokens(folders, sources, source_tokens):
+            return pd.DataFrame({'folder': folders, 'key': sources}).merge(source_tokens, on='key')[['folder', 'token']]
+
+        # Franchises and seasons gather release members, series gather their seasons' genres
+        parent = filtered['parent'].to_numpy()
+        child = filtered['child'].to_numpy()
+        parent_types, child_types = self.types[parent], self.types[child]
+        member = _matches(parent_types, ('Franchise', 'Season')) & _matches(child_types, RELEASES) & has_genre[child]
+        member_tokens = tokens(parent[member], genre_of[child[member]], genre_tokens).drop_duplicates()
+        season = _matches(parent_types, ('Series',)) & _matches(child_types, ('Season',))
+        series_tokens = tokens(parent[season], child[season], member_tokens.rename(columns={'folder': 'key'}))
+
+        pairs = pd.concat([
+            tokens(releases, genre_of[releases], genre_tokens),
+            tokens(ancestry['folder'].to_numpy(), ancestry['source'].to_numpy(), name_tokens),
+            member_tokens,
+            series_tokens,
+        ], ignore_index=True)
+
+        # Sorting the unique (folder, token) keys groups each folder's parts in string order
+        width = max(len(vocabulary), 1)
+        keys = np.unique(pairs['folder'].to_numpy(dtype=np.int64) * width + pairs['token'].to_numpy(dtype=np.int64))
+        folders, parts = keys // width, vocabulary[keys % width].tolist()
+        bounds = (np.flatnonzero(folders[1:] != folders[:-1]) + 1).tolist()
+        starts, ends = [0] + bounds, bounds + [len(keys)]
+
+        # Collections without member genres are stored with an empty genre string
+        hat.folder_genres = dict.fromkeys(self.names[_matches(self.types, COLLECTIONS)], '')
+        if len(keys):
+            hat.folder_genres.update(zip(self.names[folders[starts]], (', '.join(parts[start:end]) for start, end in zip(starts, ends))))
+        hat.file_genres = dict(zip(self.names[releases], file_genres[releases]))
+        hat.ancestry = None
+        log_info("Genres assembled for %d folders in %.3fs", len(hat.folder_genres), time.perf_counter() - start)
+        return hat.folder_genres
+
+
+def _matches(values, labels):
+    """
+    Compares an object array of labels against a few values.
+
+    Args:
+        values (ndarray): Labels, or None where a folder has none.
+        labels (tuple): The labels to look for.
+
+    Returns:
+        ndarray: True where the value is one of the labels.
+    """
+    found = np.zeros(len(values), dtype=bool)
+    for label in labels:
+        found |= values == label
+    return found
+
+
+if __name__ == "__main__":
+    from .sorter import SortingHat
+
+    hat = SortingHat()
+    classifications = hat.classify(engine='columnar')
+    log_info("Classification results: %s", summarize(classifications))
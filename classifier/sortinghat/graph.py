@@ -0,0 +1,177 @@
+"""
+This module contains the InternedDAG class, a compact graph backend for the
+SortingHat that interns folder names to integer IDs and keeps adjacency in
+CSR form (an offsets array plus a flat array of child IDs).
+"""
+
+from array import array
+from collections.abc import Mapping
+
+
+class InternedDAG(Mapping):
+    """
+    A read-only, dict-like view of the filesteps graph backed by flat integer arrays.
+
+    Node IDs are assigned in order of first appearance. The children of node `i` are
+    `children[offsets[i]:offsets[i + 1]]`, kept in the order they were first seen, so the
+    view behaves like the `{parent: [children]}` dictionary built by the dict backend.
+
+    Attributes:
+        names (list): Folder names indexed by their interned ID.
+        ids (dict): A dictionary where keys are folder names and values are their interned IDs.
+        offsets (array): Start offset of each node's children in `children`, plus a final end offset.
+        children (array): Child IDs of every node, grouped by parent.
+        parents (array): The first parent ID seen for each node, or -1 for roots.
+        order (array): IDs of the nodes that have children, in order of first appearance as a parent.
+    """
+
+    def __init__(self, names, ids, offsets, children, parents, order):
+        self.names = names
+        self.ids = ids
+        self.offsets = offsets
+        self.children = children
+        self.parents = parents
+        self.order = order
+
+    @classmethod
+    def fromEdges(cls, edges):
+        """
+        Builds the graph from (parent, child) pairs in a single linear pass.
+
+        Args:
+            edges (iterable): An iterable of (parent, child) folder name pairs, e.g. a cursor.
+
+        Returns:
+            InternedDAG: The interned graph with duplicate edges removed.
+        """
+        names = []
+        ids = {}
+        parents = array('i')
+        sources = array('i')
+        targets = array('i')
+
+        def intern(name):
+            node = ids.get(name)
+            if node is None:
+                node = ids[name] = len(names)
+                names.append(name)
+                parents.append(-1)
+            return node
+
+        for parent, child in edges:
+            p = intern(parent)
+            c = intern(child)
+            if parents[c] == -1:
+                parents[c] = p
+            sources.append(p)
+            targets.append(c)
+
+        # Stable counting sort of the edges by parent into CSR form
+        size = len(names)
+        offsets = array('i', bytes(4 * (size + 1)))
+        for p in sources:
+            offsets[p + 1] += 1
+        for node in range(size):
+            offsets[node + 1] += offsets[node]
+        cursor = array('i', offsets[:size])
+        children = array('i', bytes(4 * len(targets)))
+        for p, c in zip(sources, targets):
+            children[cursor[p]] = c
+            cursor[p] += 1
+        del cursor, targets
+
+        # Drop duplicate edges in place, one parent at a time, keeping each child's first occurrence
+        seen = set()
+        start = write = 0
+        for node in range(size):
+            end = offsets[node + 1]
+            for c in children[start:end]:
+                if c not in seen:
+                    seen.add(c)
+                    children[write] = c
+                    write += 1
+            seen.clear()
+            offsets[node + 1] = write
+            start = end
+        del children[write:]
+
+        # Keep key order identical to the dict backend: parents by first appearance
+        order = array('i', dict.fromkeys(sources))
+
+        return cls(names, ids, offsets, children, parents, order)
+
+    @classmethod
+    def fromMapping(cls, dag):
+        """
+        Builds the graph from a `{parent: [children]}` dictionary.
+
+        Args:
+            dag (dict): A dictionary where keys are parent nodes and values are lists of child nodes.
+
+        Returns:
+            InternedDAG: The interned graph.
+        """
+        return cls.fromEdges((parent, child) for parent, children in dag.items() for child in children)
+
+    def childIds(self, node):
+        """
+        Returns the child IDs of the node with the given ID.
+
+        Args:
+            node (int): The interned ID of the parent node.
+
+        Returns:
+            array: The child IDs in order of first appearance.
+        """
+        return self.children[self.offsets[node]:self.offsets[node + 1]]
+
+    def parentView(self):
+        """
+        Returns a dict-like view of each node's first parent.
+
+        Returns:
+            ParentView: A mapping where keys are folder names and values are their first parent's name.
+        """
+        return ParentView(self)
+
+    def __getitem__(self, name):
+        node = self.ids.get(name)
+        if node is None or self.offsets[node] == self.offsets[node + 1]:
+            raise KeyError(name)
+        return [self.names[child] for child in self.childIds(node)]
+
+    def __contains__(self, name):
+        node = self.ids.get(name)
+        return node is not None and self.offsets[node] != self.offsets[node + 1]
+
+    def __iter__(self):
+        names = self.names
+        return (names[node] for node in self.order)
+
+    def __len__(self):
+        return len(self.order)
+
+
+class ParentView(Mapping):
+    """
+    A read-only mapping from folder name to the first parent seen for it in filesteps.
+
+    Attributes:
+        graph (InternedDAG): The graph the view reads from.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        node = self.graph.ids.get(name)
+        if node is None or self.graph.parents[node] == -1:
+            raise KeyError(name)
+        return self.graph.names[self.graph.parents[node]]
+
+    def __iter__(self):
+        names = self.graph.names
+        return (names[node] for node, parent in enumerate(self.graph.parents) if parent != -1)
+
+    def __len__(self):
+        return sum(1 for parent in self.graph.parents if parent != -1)
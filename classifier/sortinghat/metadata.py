@@ -0,0 +1,115 @@
+"""
+This module contains the FileMetadataStore class, a lazy, size-bounded view of
+the filemetadata table used by the SortingHat.
+"""
+
+from collections import OrderedDict
+from collections.abc import Mapping
+from classifier.db.connection import get_connection
+
+
+class FileMetadataStore(Mapping):
+    """
+    A read-only mapping from file ID to file metadata that loads records on demand.
+
+    Point lookups go through an LRU cache holding at most `capacity` records, and iteration
+    streams rows with `fetchmany`, so memory stays flat regardless of library size.
+
+    Attributes:
+        dbpath (str): Path to the SQLite database.
+        capacity (int): The maximum number of records kept in the cache.
+        batch (int): Rows fetched per round trip while streaming.
+        cache (OrderedDict): Recently used records, least recently used first.
+    """
+
+    COLUMNS = "file_id, title, year, genre, type"
+
+    def __init__(self, dbpath, capacity=10000, batch=1000):
+        """
+        Initializes the FileMetadataStore instance.
+
+        Args:
+            dbpath (str): Path to the SQLite database.
+            capacity (int): The maximum number of records kept in the cache.
+            batch (int): Rows fetched per round trip while streaming.
+        """
+        self.dbpath = dbpath
+        self.capacity = capacity
+        self.batch = batch
+        self.cache = OrderedDict()
+        self.conn = None
+
+    def connection(self):
+        """
+        Returns the store's connection, the thread's shared read-only connection.
+
+        Returns:
+            sqlite3.Connection: The database connection.
+        """
+        if self.conn is None:
+            self.conn = get_connection(self.dbpath, readonly=True)
+        return self.conn
+
+    @staticmethod
+    def record(row):
+        """
+        Converts a filemetadata row into a metadata dictionary.
+
+        Args:
+            row (tuple): A (file_id, title, year, genre, type) row.
+
+        Returns:
+            dict: The file metadata.
+        """
+        file_id, title, year, genre, media_type = row
+        return {"title": title, "year": year, "genre": genre, "type": media_type}
+
+    def stream(self):
+        """
+        Streams every filemetadata row without filling the cache.
+
+        Yields:
+            tuple: (file_id, metadata dictionary) pairs.
+        """
+        cursor = self.connection().execute("SELECT {} FROM filemetadata".format(self.COLUMNS))
+        while True:
+            rows = cursor.fetchmany(self.batch)
+            if not rows:
+                break
+            for row in rows:
+                yield row[0], self.record(row)
+
+    def items(self):
+        return self.stream()
+
+    def __getitem__(self, file_id):
+        try:
+            self.cache.move_to_end(file_id)
+            return self.cache[file_id]
+        except KeyError:
+            pass
+        row = self.connection().execute(
+            "SELECT {} FROM filemetadata WHERE file_id = ?".format(self.COLUMNS), (file_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(file_id)
+        record = self.cache[file_id] = self.record(row)
+        if len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+        return record
+
+    def __iter__(self):
+        return (file_id for file_id, _ in self.stream())
+
+    def __len__(self):
+        return self.connection().execute("SELECT COUNT(*) FROM filemetadata").fetchone()[0]
+
+    def close(self):
+        """
+        Releases the store's connection and drops the cache.
+
+        The shared connection itself stays open for other users; see close_connections().
+        """
+        if self.conn is not None:
+            self.conn = None
+        self.cache.clear()
@@ -0,0 +1,189 @@
+"""
+This module contains the RuleEngine class, which classifies folder names with a
+set of pluggable regular-expression rules compiled into one combined matcher.
+"""
+
+import re
+from collections import namedtuple
+
+# A folder-name rule. Class rules decide a folder's classification, with earlier rules
+# taking priority; tag rules only describe the name (edition, resolution, ...).
+FolderRule = namedtuple('FolderRule', ['name', 'pattern', 'label', 'kind'])
+
+DEFAULT_RULES = [
+    FolderRule('episode', r'(?i:\bS\d{1,2}\s?E\d{1,3}\b)', 'Episode', 'class'),
+    FolderRule('season', r'(?i:^(?:Season|Series)\s*\d{1,2}$|^S\d{1,2}$)', 'Season', 'class'),
+    FolderRule('year', r'\(\d{4}\)', 'Movie', 'class'),
+    FolderRule('edition', r"(?i:\b(?:Director'?s Cut|Extended(?: Edition)?|Unrated|Theatrical|Remastered|Special Edition|IMAX)\b)", 'Edition', 'tag'),
+    FolderRule('resolution', r'(?i:\b(?:480p|720p|1080p|2160p|4K|UHD)\b)', 'Resolution', 'tag'),
+]
+
+# Labels of generic folder names, such as "Season 1", that only identify a folder together with their parent
+SCOPED_LABELS = ('Season',)
+
+# Joins a scoped folder's parent and name into its node name, e.g. "Show\\Season 1"; never part of a folder name
+SCOPE_SEPARATOR = '\\'
+
+
+class RuleEngine:
+    """
+    Classifies folder names with a combined matcher built from FolderRules.
+
+    Class rules are compiled into one alternation of named groups so each name is scanned once.
+    Results are memoized per name, so repeated lookups (e.g. when isFranchise re-checks the
+    same children) are dictionary hits. Scoped node names (see scopeSteps) are classified by
+    their last folder name.
+
+    Attributes:
+        rules (list): The registered FolderRules, in priority order.
+        cache (dict): A dictionary where keys are folder names and values are their class label or None.
+    """
+
+    def __init__(self, rules=None):
+        """
+        Initializes the RuleEngine instance.
+
+        Args:
+            rules (list): FolderRules to register, defaults to DEFAULT_RULES.
+        """
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self.cache = {}
+        self.compile()
+
+    def __getstate__(self):
+        # Workers rebuild the memo themselves, so keep pickled engines small
+        state = self.__dict__.copy()
+        state['cache'] = {}
+        return state
+
+    def register(self, rule):
+        """
+        Adds a rule and recompiles the matcher.
+
+        Args:
+            rule (FolderRule): The rule to add. Class rules added later have lower priority.
+        """
+        self.rules.append(rule)
+        self.compile()
+
+    def compile(self):
+        """
+        Compiles the class and tag rules into their combined matchers and clears the cache.
+        """
+        class_rules = [rule for rule in self.rules if rule.kind == 'class']
+        tag_rules = [rule for rule in self.rules if rule.kind == 'tag']
+        self.classes = self.combine(class_rules)
+        self.tags = self.combine(tag_rules)
+        self.priority = {rule.name: index for index, rule in enumerate(class_rules)}
+        self.ranked = [rule.label for rule in class_rules]
+        self.labels = {rule.name: rule.label for rule in self.rules}
+        self.cache = {}
+
+    @staticmethod
+    def combine(rules):
+        """
+        Combines rules into a single pattern with one named group per rule.
+
+        Args:
+            rules (list): FolderRules to combine.
+
+        Returns:
+            re.Pattern: The compiled pattern, or None when there are no rules.
+        """
+        if not rules:
+            return None
+        return re.compile('|'.join('(?P<{}>{})'.format(rule.name, rule.pattern) for rule in rules))
+
+    def classifyName(self, name):
+        """
+        Classifies a folder name.
+
+        Args:
+            name (str): The folder name.
+
+        Returns:
+            str: The label of the highest-priority matching class rule, or None.
+        """
+        try:
+            return self.cache[name]
+        except KeyError:
+            pass
+        label = None
+        if self.classes is not None:
+            best = None
+            for match in self.classes.finditer(name.rpartition(SCOPE_SEPARATOR)[2]):
+                rank = self.priority[match.lastgroup]
+                if best is None or rank < best:
+                    best = rank
+                    if rank == 0:
+                        break
+            if best is not None:
+                label = self.ranked[best]
+        self.cache[name] = label
+        return label
+
+    def classifyAll(self, names):
+        """
+        Classifies many folder names, e.g. every interned name of an InternedDAG.
+
+        Args:
+            names (iterable): Folder names.
+
+        Returns:
+            list: The class label (or None) of each name, in order.
+        """
+        classify = self.classifyName
+        return [classify(name) for name in names]
+
+    def scopeSteps(self, steps):
+        """
+        Names the folders with a scoped label after their parent, so every show keeps its own seasons.
+
+        filesteps identifies folders by name, which merges the "Season 1" folders of all shows
+        into one node. Here a folder whose name has one of the SCOPED_LABELS becomes
+        "<parent>\\<name>" in the steps of its own file, both where it is the child and where it
+        is the parent. Steps are written top-down per file, so a scoped folder is normally named
+        before its children are read; steps read before their parent's are yielded last.
+
+        Args:
+            steps (iterable): (filepath_id, parent, child) rows in rowid order, e.g. a cursor.
+
+        Yields:
+            tuple: The (filepath_id, parent, child) rows with scoped folders renamed.
+        """
+        owners = {}
+        deferred = []
+
+        def scope(file_id, parent, child, final):
+            if parent is not None and self.classifyName(parent) in SCOPED_LABELS:
+                scoped = owners.get((file_id, parent))
+                if scoped is None and not final:
+                    return None
+                parent = scoped or parent
+            if parent is not None and child is not None and self.classifyName(child) in SCOPED_LABELS:
+                owners[(file_id, child)] = parent + SCOPE_SEPARATOR + child
+                child = owners[(file_id, child)]
+            return file_id, parent, child
+
+        for file_id, parent, child in steps:
+            step = scope(file_id, parent, child, False)
+            if step is None:
+                deferred.append((file_id, parent, child))
+            else:
+                yield step
+        for file_id, parent, child in deferred:
+            yield scope(file_id, parent, child, True)
+
+    def tagName(self, name):
+        """
+        Returns the descriptive tags found in a folder name.
+
+        Args:
+            name (str): The folder name.
+
+        Returns:
+            tuple: The labels of the matching tag rules, in order of appearance.
+        """
+        if self.tags is None:
+            return ()
+        return tuple(self.labels[match.lastgroup] for match in self.tags.finditer(name))
@@ -0,0 +1,247 @@
+"""
+This module contains the Snapshot class, a compact binary image of SortingHat
+state (the interned DAG, the genre set and the classifications) that can be
+memory-mapped for fast warm starts.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+from array import array
+
+from classifier.db.connection import execute_script
+from .graph import InternedDAG
+
+# File layout: a fixed header, then sections padded to 8 bytes. All integers are little-endian.
+MAGIC = b"SHSNAP\x00"
+VERSION = 3
+SECTIONS = ("names", "offsets", "children", "parents", "order", "genres", "classifications")
+STAMP_TABLES = ("filesteps", "filemetadata", "genre")
+
+# Row count, highest rowid and change count of each stamped table, the journal sequence and the rules fingerprint
+STAMP_FIELDS = 3 * len(STAMP_TABLES) + 2
+HEADER = struct.Struct("<7sBI{}q".format(STAMP_FIELDS) + "2q" * len(SECTIONS))
+
+# Counts the updates and deletes of each stamped table, which leave its row count and highest rowid alone
+CHANGES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS snapshotchanges (
+        name TEXT PRIMARY KEY,
+        changes INTEGER NOT NULL
+    );
+"""
+
+CHANGES_TRIGGERS = """
+    INSERT OR IGNORE INTO snapshotchanges (name, changes) VALUES ('{table}', 0);
+
+    CREATE TRIGGER IF NOT EXISTS {table}_snapshot_update AFTER UPDATE ON {table}
+    BEGIN
+        UPDATE snapshotchanges SET changes = changes + 1 WHERE name = '{table}';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS {table}_snapshot_delete AFTER DELETE ON {table}
+    BEGIN
+        UPDATE snapshotchanges SET changes = changes + 1 WHERE name = '{table}';
+    END;
+"""
+
+
+class Snapshot:
+    """
+    SortingHat state saved with the database stamp it was built from.
+
+    The stamp records the row count, highest rowid and change count of filesteps, filemetadata
+    and the genre table, the change journal's sequence and a fingerprint of the folder rules.
+    Inserts move the row count or highest rowid; updates and deletes, including a delete that
+    frees a rowid for reuse, are counted by triggers that installChangeCounters() adds before
+    a snapshot is stamped. The payload is CRC32-checked, so truncated or corrupted files are
+    rebuilt rather than trusted.
+
+    Attributes:
+        dag (InternedDAG): The interned graph.
+        genres (set): The unique genres extracted from the filemetadata table.
+        classifications (dict): A dictionary where keys are folder names and values are their classifications.
+        stamp (tuple): The database stamp the state was built from.
+    """
+
+    def __init__(self, dag, genres, classifications, stamp):
+        self.dag = dag
+        self.genres = genres
+        self.classifications = classifications
+        self.stamp = stamp
+
+    @staticmethod
+    def installChangeCounters(conn):
+        """
+        Creates the change counters and their triggers on the stamped tables that exist.
+
+        Args:
+            conn (sqlite3.Connection): An open database connection.
+        """
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        execute_script(conn, CHANGES_SCHEMA)
+        for table in STAMP_TABLES:
+            if table in existing:
+                execute_script(conn, CHANGES_TRIGGERS.format(table=table))
+
+    @staticmethod
+    def databaseStamp(conn, rules):
+        """
+        Computes the stamp of the tables the SortingHat state is derived from.
+
+        A table without change counters gets a change count of -1, so a snapshot stamped
+        with counters never matches a database that lost them.
+
+        Args:
+            conn (sqlite3.Connection): An open database connection.
+            rules (RuleEngine): The folder-name rule engine the classifications were made with.
+
+        Returns:
+            tuple: STAMP_FIELDS integers identifying the database contents and rules.
+        """
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        changes = {}
+        if "snapshotchanges" in existing:
+            changes = dict(conn.execute("SELECT name, changes FROM snapshotchanges"))
+        stamp = []
+        for table in STAMP_TABLES:
+            if table in existing:
+                stamp.extend(conn.execute("SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM {}".format(table)).fetchone())
+            else:
+                stamp.extend((0, 0))
+            stamp.append(changes.get(table, -1))
+        sequence = 0
+        if "sqlite_sequence" in existing:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changejournal'").fetchone()
+            sequence = row[0] if row else 0
+        stamp.append(sequence)
+        stamp.append(zlib.crc32(repr(rules.rules).encode("utf-8")))
+        return tuple(stamp)
+
+    @staticmethod
+    def packStrings(strings):
+        # Folder names never contain NUL, so it separates them
+        return "\0".join(strings).encode("utf-8")
+
+    @staticmethod
+    def unpackStrings(blob):
+        return bytes(blob).decode("utf-8").split("\0") if len(blob) else []
+
+    def save(self, path):
+        """
+        Writes the snapshot atomically, replacing any previous file.
+
+        Args:
+            path (str): The snapshot file path.
+        """
+        dag = self.dag
+        sections = [
+            self.packStrings(dag.names),
+            dag.offsets.tobytes(),
+            dag.children.tobytes(),
+            dag.parents.tobytes(),
+            dag.order.tobytes(),
+            self.packStrings(sorted(self.genres)),
+            self.packStrings([item for pair in self.classifications.items() for item in pair]),
+        ]
+
+        table = []
+        payload = bytearray()
+        position = HEADER.size + (-HEADER.size % 8)
+        for section in sections:
+            table.extend((position + len(payload), len(section)))
+            payload += section
+            payload += bytes(-len(payload) % 8)
+        checksum = zlib.crc32(payload)
+
+        header = HEADER.pack(MAGIC, VERSION, checksum, *self.stamp, *table)
+        temp = path + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(header)
+            f.write(bytes(position - HEADER.size))
+            f.write(payload)
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Maps a snapshot file and validates its header and checksum.
+
+        The sections are copied out of the mapping, which is closed before returning, so the
+        file can be replaced by the next save() (Windows cannot replace a mapped file).
+
+        Args:
+            path (str): The snapshot file path.
+
+        Returns:
+            Snapshot: The loaded snapshot, or None if the file is missing, from another version, or corrupted.
+        """
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            with memoryview(mapped) as view:
+                return cls.parse(view)
+        finally:
+            mapped.close()
+
+    @classmethod
+    def parse(cls, view):
+        """
+        Validates and decodes the contents of a snapshot file.
+
+        Args:
+            view (memoryview): The file's bytes.
+
+        Returns:
+            Snapshot: The snapshot, with no references into `view`, or None if it is from another version or corrupted.
+        """
+        if len(view) < HEADER.size:
+            return None
+        fields = HEADER.unpack_from(view)
+        magic, version, checksum = fields[:3]
+        stamp = tuple(fields[3:3 + STAMP_FIELDS])
+        table = fields[3 + STAMP_FIELDS:]
+        start = HEADER.size + (-HEADER.size % 8)
+        if magic != MAGIC or version != VERSION or zlib.crc32(view[start:]) != checksum:
+            return None
+
+        def section(name):
+            index = SECTIONS.index(name)
+            return view[table[2 * index]:table[2 * index] + table[2 * index + 1]]
+
+        def integers(name):
+            values = array("i")
+            values.frombytes(section(name))
+            return values
+
+        names = cls.unpackStrings(section("names"))
+        ids = {name: node for node, name in enumerate(names)}
+        dag = InternedDAG(names, ids, integers("offsets"), integers("children"), integers("parents"), integers("order"))
+        genres = set(cls.unpackStrings(section("genres")))
+        pairs = iter(cls.unpackStrings(section("classifications")))
+        classifications = dict(zip(pairs, pairs))
+        return cls(dag, genres, classifications, stamp)
+
+    @classmethod
+    def capture(cls, dag, parents, genres, classifications, stamp):
+        """
+        Creates a snapshot from either DAG backend.
+
+        Args:
+            dag (dict): The SortingHat DAG, a dictionary or an InternedDAG.
+            parents (dict): A dictionary where keys are folder names and values are their first parent.
+            genres (set): The unique genres extracted from the filemetadata table.
+            classifications (dict): A dictionary where keys are folder names and values are their classifications.
+            stamp (tuple): The database stamp the state was built from.
+
+        Returns:
+            Snapshot: The snapshot.
+        """
+        if not isinstance(dag, InternedDAG):
+            dag = InternedDAG.fromMapping(dag)
+            # First parents follow filesteps row order, which the DAG's key order does not preserve
+            dag.parents = array("i", (dag.ids[parents[name]] if name in parents else -1 for name in dag.names))
+        return cls(dag, set(genres), dict(classifications), stamp)
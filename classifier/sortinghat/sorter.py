@@ -1,9 +1,34 @@
-import sqlite3
 import json
 from collections import defaultdict
-import re
-from classifier.utils.logger import log_info, log_debug, log_warning, log_error
-from classifier.utils.config import DB_PATH, EXCLUDED_FOLDERS
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from classifier.utils.logger import log_info, log_debug, log_warning, log_error, log_sampled, summarize
+from classifier.utils.config import DB_PATH, EXCLUDED_FOLDERS, DAG_BACKEND, CLASSIFY_WORKERS, CLASSIFY_ENGINE, METADATA_CACHE_SIZE, SNAPSHOT_SUFFIX, OPTIMIZE_BEFORE_RUN
+from classifier.db.connection import get_connection, writer
+from classifier.db.journal import install_journal, get_watermark, read_journal, latest_journal_id, advance_watermark
+from classifier.db.runs import record_run
+from classifier.db.optimizer import prepare_database
+from classifier.utils.instrument import PipelineRun, instrumented
+from .graph import InternedDAG
+from .metadata import FileMetadataStore
+from .rules import RuleEngine, SCOPE_SEPARATOR
+from .snapshot import Snapshot
+
+# Classes and levels stored in the classifications table for each type
+CLASS_LEVELS = {
+    'Movie': ('Film', 'Release'),
+    'Franchise': ('Franchise', 'Playlist'),
+    'Series': ('Series', 'Playlist'),
+    'Season': ('Season', 'Playlist'),
+    'Episode': ('Episode', 'Release'),
+}
+
+# Types that group other releases; they are never inherited as ancestry genres
+COLLECTIONS = {'Franchise', 'Series', 'Season'}
+
+# Studios we want to filter out of the genres
+STUDIOS = {"DC", "Marvel"}
 
 class SortingHat:
     """
@@ -12,62 +37,154 @@ class SortingHat:
 
     Attributes:
         dbpath (str): Path to the SQLite database.
-        dag (dict): A dictionary representing the Directed Acyclic Graph (DAG) of the filesteps table.
-        filemetadata (dict): A dictionary where keys are file IDs and values are dictionaries containing file metadata.
+        backend (str): The DAG storage backend, "dict" or "csr".
+        dag (dict): A dictionary (or dict-like InternedDAG) representing the Directed Acyclic Graph (DAG) of the filesteps table.
+        parents (dict): A dictionary where keys are folder names and values are the first parent seen in filesteps.
+        ancestry (dict): A dictionary where keys are folder names and values are their inherited ancestry genres.
+        filemetadata (FileMetadataStore): A lazy mapping where keys are file IDs and values are dictionaries containing file metadata.
+        folder_genres (dict): A dictionary where keys are classified folder names and values are their genre strings.
+        file_genres (dict): A dictionary where keys are release folder names and values are the genre strings of their files.
+        genre_lookups (int): The number of file genre lookups served from file_genres.
         classifications (dict): A dictionary where keys are folder names and values are their classifications.
         genres (set): A set of unique genres extracted from the filemetadata table.
         studios (set): A set of studios to filter out.
+        rules (RuleEngine): The folder-name rule engine used to classify names.
+        snapshot (str): Path of the binary state snapshot, or None when snapshots are disabled.
+        instrument (PipelineRun): Stage measurements of the current run, from construction to the end of classify().
+        last_run (PipelineRun): Stage measurements of the last finished run, or None.
     """
 
-    def __init__(self, DBPATH=DB_PATH):
+    def __init__(self, DBPATH=DB_PATH, backend=DAG_BACKEND, rules=None, snapshot=None):
         """
         Initializes the SortingHat instance.
 
+        When a snapshot stamped with the current database state exists, the DAG, genres and
+        previous classifications are loaded from it instead of being rebuilt.
+
         Args:
             DBPATH (str): Path to the SQLite database.
+            backend (str): The DAG storage backend, "dict" or "csr".
+            rules (RuleEngine): The folder-name rule engine, defaults to one with DEFAULT_RULES.
+            snapshot (str): Path of the state snapshot, defaults to the DB path plus SNAPSHOT_SUFFIX.
         """
+        self.instrument = PipelineRun('sortinghat')
+        self.last_run = None
         self.dbpath = DBPATH
-        self.dag = self.buildDAG()
+        self.backend = backend
+        self.rules = rules if rules is not None else RuleEngine()
+        self.snapshot = snapshot if snapshot is not None else (DBPATH + SNAPSHOT_SUFFIX if SNAPSHOT_SUFFIX else None)
+        self.parents = {}
+        self.ancestry = None
         self.filemetadata = self.loadFileMetadata()
+        self.folder_genres = {}
+        self.file_genres = {}
+        self.genre_lookups = 0
         self.classifications = {}
-        self.genres, self.studios = self.extractGenres()  # Ensure genres are stored in the database
+        if not self.loadSnapshot():
+            self.dag = self.buildDAG()
+            self.genres, self.studios = self.extractGenres()  # Ensure genres are stored in the database
         log_info("Initialized SortingHat with DB path: %s", DBPATH)
 
+    @instrumented('loadSnapshot', rows=lambda hat, loaded: len(hat.dag) if loaded else 0)
+    def loadSnapshot(self):
+        """
+        Restores the DAG, genres and classifications from the snapshot if it matches the database.
+
+        Returns:
+            bool: True if the state was restored, False if it has to be rebuilt.
+        """
+        if not self.snapshot:
+            return False
+        start = time.perf_counter()
+        snapshot = Snapshot.load(self.snapshot)
+        if snapshot is None:
+            log_info("No valid snapshot at %s, rebuilding state", self.snapshot)
+            return False
+        with get_connection(self.dbpath, readonly=True) as conn:
+            stamp = Snapshot.databaseStamp(conn, self.rules)
+        if stamp != snapshot.stamp:
+            log_info("Snapshot %s is stale, rebuilding state", self.snapshot)
+            return False
+
+        if self.backend == 'csr':
+            self.dag = snapshot.dag
+            self.parents = snapshot.dag.parentView()
+        else:
+            self.dag = dict(snapshot.dag)
+            self.parents = dict(snapshot.dag.parentView())
+        self.genres, self.studios = snapshot.genres, set(STUDIOS)
+        self.classifications = snapshot.classifications
+        log_info("Loaded snapshot %s in %.3fs: %d parents, %d classifications",
+                 self.snapshot, time.perf_counter() - start, len(self.dag), len(self.classifications))
+        return True
+
+    @instrumented('saveSnapshot')
+    def saveSnapshot(self):
+        """
+        Writes the DAG, genres and classifications to the snapshot, stamped with the current database state.
+
+        The change counters are installed first, so later in-place edits make the snapshot stale.
+        """
+        if not self.snapshot:
+            return
+        start = time.perf_counter()
+        with writer(self.dbpath) as conn:
+            Snapshot.installChangeCounters(conn)
+            stamp = Snapshot.databaseStamp(conn, self.rules)
+        try:
+            Snapshot.capture(self.dag, self.parents, self.genres, self.classifications, stamp).save(self.snapshot)
+        except OSError as e:
+            log_warning("Could not write snapshot %s: %s", self.snapshot, e)
+            return
+        log_info("Snapshot saved to %s in %.3fs", self.snapshot, time.perf_counter() - start)
+
+    @instrumented('buildDAG', rows=lambda hat, dag: len(dag))
     def buildDAG(self):
         """
         Generates a Directed Acyclic Graph (DAG) JSON dynamically from the filesteps table.
 
+        The "csr" backend interns folder names to integer IDs and stores adjacency in flat arrays,
+        which keeps memory low on multi-million-row filesteps tables. Both backends record each
+        child's first parent in `self.parents`. Season folders are keyed by their show, as in
+        "Show\\Season 1", so shows do not share them (see RuleEngine.scopeSteps).
+
         Returns:
             dict: A dictionary representing the DAG where keys are parent nodes and values are lists of child nodes.
         """
-        log_info("Building DAG from filesteps table")
-        dag = defaultdict(list)
-        with sqlite3.connect(self.dbpath) as conn:
+        log_info("Building DAG from filesteps table using the %s backend", self.backend)
+        with get_connection(self.dbpath, readonly=True) as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT parent, child FROM filesteps")
-            for parent, child in cursor.fetchall():
-                if child not in dag[parent]:
-                    dag[parent].append(child)
-        log_info("DAG built: %s", dag)
-        return dict(dag)
+            cursor.execute("SELECT filepath_id, parent, child FROM filesteps")
+            edges = ((parent, child) for _, parent, child in self.rules.scopeSteps(cursor))
+            if self.backend == 'csr':
+                dag = InternedDAG.fromEdges(edges)
+                self.parents = dag.parentView()
+            else:
+                dag = defaultdict(list)
+                seen = set()
+                for parent, child in edges:
+                    if (parent, child) not in seen:
+                        seen.add((parent, child))
+                        dag[parent].append(child)
+                    self.parents.setdefault(child, parent)  # First parent, as a `WHERE child = ?` lookup returns
+                dag = dict(dag)
+        log_info("DAG built: %d parents, %d folders", len(dag), len(self.parents))
+        return dag
 
+    @instrumented('loadFileMetadata')
     def loadFileMetadata(self):
         """
-        Loads metadata from the database.
+        Opens a lazy view of the file metadata in the database.
+
+        Records are read on demand through a size-bounded LRU cache rather than loaded up front.
 
         Returns:
-            dict: A dictionary where keys are file IDs and values are dictionaries containing file metadata.
+            FileMetadataStore: A mapping where keys are file IDs and values are dictionaries containing file metadata.
         """
-        log_info("Loading file metadata from database")
-        filemetadata = {}
-        with sqlite3.connect(self.dbpath) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT file_id, title, year, genre, type FROM filemetadata")
-            for file_id, title, year, genre, media_type in cursor.fetchall():
-                filemetadata[file_id] = {"title": title, "year": year, "genre": genre, "type": media_type}
-        log_info("File metadata loaded: %s", filemetadata)
-        return filemetadata
+        log_info("Opening file metadata store with a %d record cache", METADATA_CACHE_SIZE)
+        return FileMetadataStore(self.dbpath, METADATA_CACHE_SIZE)
 
+    @instrumented('extractGenres', rows=lambda hat, result: len(result[0]))
     def extractGenres(self):
         """
         Extracts unique genres and studios from filemetadata and stores them in the genre table.
@@ -77,9 +194,9 @@ class SortingHat:
         """
         log_info("Extracting unique genres and studios from filemetadata")
         genres = set()
-        studios = {"DC", "Marvel"}  # Studios we want to filter out
+        studios = set(STUDIOS)
 
-        with sqlite3.connect(self.dbpath) as conn:
+        with writer(self.dbpath) as conn:
             cursor = conn.cursor()
             cursor.execute("CREATE TABLE IF NOT EXISTS genre (name TEXT PRIMARY KEY)")
             cursor.execute("SELECT DISTINCT genre FROM filemetadata")
@@ -92,11 +209,51 @@ class SortingHat:
             
             for genre in genres:
                 cursor.execute("INSERT OR IGNORE INTO genre (name) VALUES (?)", (genre,))
-            conn.commit()
         
-        log_info("Genres extracted: %s", genres)
+        log_info("Genres extracted: %s", summarize(genres))
         return genres, studios
 
+    @instrumented('buildAncestryIndex', rows=lambda hat, index: len(index))
+    def buildAncestryIndex(self):
+        """
+        Computes the ancestry genres of every node in a single top-down pass over the DAG.
+
+        Each node inherits from its first parent, so a node's genres are its parent's genres plus
+        the parent itself. The walk stops at EXCLUDED_FOLDERS, and Franchise, Series and Season
+        ancestors are passed through without being added as genres.
+
+        Returns:
+            dict: A dictionary where keys are folder names and values are frozensets of ancestry genres.
+        """
+        log_info("Building ancestry index for %d folders", len(self.parents))
+        to_remove = EXCLUDED_FOLDERS  # Types to exclude
+        empty = frozenset()
+        index = {}
+
+        for node in self.parents:
+            # Climb until we reach a node whose genres are known or the walk has to stop
+            chain = []
+            seen = set()
+            while node not in index:
+                parent = self.parents.get(node)
+                if parent is None or parent in to_remove or parent in seen:
+                    index[node] = empty
+                    break
+                chain.append(node)
+                seen.add(node)
+                node = parent
+
+            # Unwind back down, sharing the parent's set where nothing is added
+            for child in reversed(chain):
+                parent = self.parents[child]
+                inherited = index[parent]
+                if self.classifications.get(parent) not in COLLECTIONS:
+                    inherited = inherited | {parent}
+                index[child] = inherited
+
+        log_info("Ancestry index built for %d folders", len(index))
+        return index
+
     def extractAncestryGenres(self, folder):
         """
         Extracts genres from ancestor folders.
@@ -107,107 +264,389 @@ class SortingHat:
         Returns:
             set: A set of genres extracted from ancestor folders.
         """
-        log_info("Extracting genres from ancestor folders for: %s", folder)
-        genres = set()
-        to_remove = EXCLUDED_FOLDERS  # Types to exclude
-
-        def getAncestors(folder):
-            ancestors = []
-            with sqlite3.connect(self.dbpath) as conn:
-                cursor = conn.cursor()
-                while folder:
-                    cursor.execute("SELECT parent FROM filesteps WHERE child = ?", (folder,))
-                    result = cursor.fetchone()
-                    if result and result[0] not in to_remove:
-                        ancestors.append(result[0])
-                        folder = result[0]
-                    else:
-                        break
-            return ancestors
-
-        ancestors = getAncestors(folder)
-        for ancestor in ancestors:
-            if ancestor not in to_remove and self.classifications.get(ancestor) != 'Franchise':
-                genres.add(ancestor)
-        log_info("Ancestry genres extracted: %s", genres)
+        if self.ancestry is None:
+            self.ancestry = self.buildAncestryIndex()
+        genres = set(self.ancestry.get(folder, ()))
+        log_debug("Ancestry genres extracted for %s: %s", folder, genres)
         return genres
 
-    def analyzeStructure(self, genres, studios):
+    @instrumented('analyzeStructure', rows=lambda hat, result: len(hat.classifications))
+    def analyzeStructure(self, genres, studios, workers=1):
         """
         Analyzes DAG Structure after filtering unwanted categories and extracting genres to extract movies so that we remain with franchises.
 
+        With more than one worker, subtrees that share no folder are classified and have their
+        genres assembled in a process pool. Results are merged in DAG order, so the output matches
+        the serial path exactly.
+
         Args:
             genres (set): A set of unique genres.
             studios (set): A set of studios to filter out.
+            workers (int): Number of worker processes, 1 runs serially.
         """
         log_info("Analyzing DAG structure")
+        self.classifications = {}  # Classifications restored from a snapshot are recomputed
         filtered_dag = self.filterDAG()
-        log_info("Filtered DAG: %s", filtered_dag)  # Log statement
 
-        new_genres = set()
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            parent_labels = child_labels = partitions = None
+            if executor:
+                partitions = self.partitionDAG(filtered_dag, workers * 4)
+                parent_labels, child_labels = {}, {}
+                for parents, children in executor.map(_classifyPartition, repeat(self.dbpath), repeat(self.rules), partitions):
+                    parent_labels.update(parents)
+                    child_labels.update(children)
+                log_info("Classified %d partitions with %d workers", len(partitions), workers)
 
-        # Classify parents
-        for parent, children in filtered_dag.items():
-            if self.isMovie(parent, children):
-                self.classifications[parent] = 'Movie'
-                log_info("Classified %s as Movie", parent)  # Log statement
-            elif self.isFranchise(parent, children):
-                self.classifications[parent] = 'Franchise'
-                log_info("Classified %s as Franchise", parent)  # Log statement
+            new_genres = set()
+
+            # Classify parents
+            for parent, children in filtered_dag.items():
+                label = parent_labels[parent] if parent_labels is not None else self.classifyParent(parent, children)
+                if label:
+                    self.classifications[parent] = label
+                    log_sampled("Classified %s as %s", parent, label)  # Log statement
+                else:
+                    new_genres.add(parent)
+
+            # Classify children
+            for parent, children in filtered_dag.items():
+                for child in children:
+                    if child not in self.classifications:
+                        label = child_labels[child] if child_labels is not None else self.rules.classifyName(child)
+                        if label:
+                            self.classifications[child] = label
+                            log_sampled("Classified %s as %s", child, label)  # Log statement
+
+        # Add new genres to the genre table
+            self.saveGenres(new_genres, genres, studios)
+
+        # Extract and store genres for each classified folder
+            self.ancestry = self.buildAncestryIndex()  # Classifications are final, so the index can be shared
+            self.file_genres = self.buildFileGenres()
+            if executor:
+                self.assembleGenresParallel(executor, partitions, filtered_dag)
             else:
-                new_genres.add(parent)
+                for folder in self.classifications:
+                    self.assembleGenres(folder, filtered_dag)
+        finally:
+            if executor:
+                executor.shutdown()
+        log_info("Genres stored for classified folders: %d file genre lookups served from memory instead of up to %d point queries",
+                 self.genre_lookups, 3 * self.genre_lookups)
+
+    @instrumented('analyzeColumnar', rows=lambda hat, result: len(hat.classifications))
+    def analyzeColumnar(self, genres, studios):
+        """
+        Classifies the DAG and assembles genres with the columnar engine instead of per-folder loops.
+
+        The results are the same as analyzeStructure's. pandas is only imported when this engine is used.
+
+        Args:
+            genres (set): A set of unique genres.
+            studios (set): A set of studios to filter out.
+        """
+        from .columnar import ColumnarEngine
+
+        log_info("Analyzing DAG structure with the columnar engine")
+        ColumnarEngine(self).analyze(genres, studios)
+
+    def partitionDAG(self, filtered_dag, count):
+        """
+        Splits the filtered DAG into independent subtrees and packs them into balanced partitions.
+
+        A subtree is a connected component of the filtered DAG: folders are grouped with every
+        parent and child they share an edge with, so a folder name reached from several places
+        (such as a "Season 1" under different shows) keeps all of its children in one partition.
+
+        Args:
+            filtered_dag (dict): The filtered DAG dictionary.
+            count (int): The maximum number of partitions.
+
+        Returns:
+            list: Partitions, each a list of (parent, children) items in DAG order.
+        """
+        groups = {}
+
+        def find(node):
+            root = groups.setdefault(node, node)
+            while root != groups[root]:
+                root = groups[root]
+            while node != root:
+                groups[node], node = root, groups[node]
+            return root
 
-        # Classify children
         for parent, children in filtered_dag.items():
+            top = find(parent)
             for child in children:
-                if child not in self.classifications:
-                    if self.isMovie(child, []):
-                        self.classifications[child] = 'Movie'
-                        log_info("Classified %s as Movie", child)  # Log statement
+                other = find(child)
+                if other != top:
+                    groups[other] = top
+
+        subtrees = {}
+        for index, parent in enumerate(filtered_dag):
+            subtrees.setdefault(find(parent), []).append(index)
+
+        # Largest subtrees first, each into the lightest partition
+        bins = [[] for _ in range(max(1, min(count, len(subtrees))))]
+        loads = [0] * len(bins)
+        for members in sorted(subtrees.values(), key=len, reverse=True):
+            lightest = loads.index(min(loads))
+            bins[lightest].extend(members)
+            loads[lightest] += len(members)
 
-    # Add new genres to the genre table
-        with sqlite3.connect(self.dbpath) as conn:
+        items = list(filtered_dag.items())
+        return [[items[index] for index in sorted(members)] for members in bins if members]
+
+    def assembleGenresParallel(self, executor, partitions, filtered_dag):
+        """
+        Assembles the genres of every classified folder with one pool task per partition.
+
+        Args:
+            executor (concurrent.futures.Executor): The worker pool.
+            partitions (list): Partitions from partitionDAG.
+            filtered_dag (dict): The filtered DAG dictionary.
+        """
+        tasks = []
+        assigned = set()
+        for partition in partitions:
+            folders = []
+            for parent, children in partition:
+                for folder in [parent] + list(children):
+                    if folder in self.classifications and folder not in assigned:
+                        assigned.add(folder)
+                        folders.append(folder)
+            dag = dict(partition)
+            classifications = {
+                folder: self.classifications[folder]
+                for folder in set(dag).union(*dag.values()) if folder in self.classifications
+            }
+            ancestry = {folder: self.ancestry.get(folder, frozenset()) for folder in folders}
+            file_genres = {
+                folder: self.file_genres[folder]
+                for folder in set(folders).union(*(dag.get(folder, ()) for folder in folders)) if folder in self.file_genres
+            }
+            tasks.append((folders, dag, classifications, ancestry, file_genres))
+
+        if not tasks:
+            return
+        for genres, lookups in executor.map(_assemblePartition, repeat(self.dbpath), repeat(self.rules), *zip(*tasks)):
+            self.folder_genres.update(genres)
+            self.genre_lookups += lookups
+
+    @classmethod
+    def workerShell(cls, dbpath, rules, classifications=None, ancestry=None, file_genres=None):
+        """
+        Creates a lightweight instance for worker processes that skips loading the DAG and metadata.
+
+        Args:
+            dbpath (str): Path to the SQLite database.
+            rules (RuleEngine): The folder-name rule engine.
+            classifications (dict): Known classifications for the worker's folders.
+            ancestry (dict): Ancestry genres for the worker's folders.
+            file_genres (dict): File genres of the worker's release folders.
+
+        Returns:
+            SortingHat: An instance that can classify folders and assemble their genres.
+        """
+        hat = cls.__new__(cls)
+        hat.dbpath = dbpath
+        hat.backend = DAG_BACKEND
+        hat.rules = rules
+        hat.snapshot = None
+        hat.instrument = None
+        hat.last_run = None
+        hat.parents = {}
+        hat.dag = {}
+        hat.ancestry = ancestry if ancestry is not None else {}
+        hat.filemetadata = {}
+        hat.folder_genres = {}
+        hat.file_genres = file_genres if file_genres is not None else {}
+        hat.genre_lookups = 0
+        hat.classifications = classifications if classifications is not None else {}
+        return hat
+
+    def saveGenres(self, new_genres, genres, studios):
+        """
+        Adds folders that are neither movies nor franchises to the genre table.
+
+        Args:
+            new_genres (set): Folder names to store as genres.
+            genres (set): A set of unique genres.
+            studios (set): A set of studios to filter out.
+        """
+        with writer(self.dbpath) as conn:
             cursor = conn.cursor()
             for genre in new_genres:
                 if genre not in genres and genre not in studios:
                     cursor.execute("INSERT OR IGNORE INTO genre (name) VALUES (?)", (genre,))
-            conn.commit()
-
-    # Extract and store genres for each classified folder
-        for folder in self.classifications:
-            if self.classifications[folder] == 'Movie':
-                ancestry_genres = self.extractAncestryGenres(folder)
-                cursor.execute("SELECT filepath_id FROM filesteps WHERE child = ?", (folder,))
-                filepath_id_result = cursor.fetchone()
-                if filepath_id_result:
-                    filepath_id = filepath_id_result[0]
-                    cursor.execute("SELECT filetitle FROM filepaths WHERE id = ?", (filepath_id,))
-                    filetitle = cursor.fetchone()
-                    if filetitle:
-                        cursor.execute("SELECT genre FROM filemetadata WHERE title = ?", (filetitle[0],))
-                        result = cursor.fetchone()
-                        if result:
-                            file_genres = set(result[0].split(','))
-                            ancestry_genres.update(file_genres)
-                            self.filemetadata[folder] = {'genre': ', '.join(ancestry_genres)}
-            elif self.classifications[folder] == 'Franchise':
-                franchise_genres = set()
-                for child in filtered_dag.get(folder, []):
-                    if self.classifications.get(child) == 'Movie':
-                        cursor.execute("SELECT filepath_id FROM filesteps WHERE child = ?", (child,))
-                        filepath_id_result = cursor.fetchone()
-                        if filepath_id_result:
-                            filepath_id = filepath_id_result[0]
-                            cursor.execute("SELECT filetitle FROM filepaths WHERE id = ?", (filepath_id,))
-                            filetitle = cursor.fetchone()
-                            if filetitle:
-                                cursor.execute("SELECT genre FROM filemetadata WHERE title = ?", (filetitle[0],))
-                                result = cursor.fetchone()
-                            if result:
-                                franchise_genres.update(result[0].split(','))
-                self.filemetadata[folder] = {'genre': ', '.join(franchise_genres)}
-        log_info("Genres stored for classified folders")
 
+    @instrumented('buildFileGenres', rows=lambda hat, file_genres: len(file_genres))
+    def buildFileGenres(self, folders=None):
+        """
+        Precomputes the file genre of every release folder with a single join.
+
+        A folder's file is the first filesteps row where it is the child, and its genre comes from
+        the first filemetadata row whose title matches the file's title, which is what the
+        per-folder point queries used to return.
+
+        Args:
+            folders (iterable): Only look up these folders. Defaults to every folder classified as a Movie or Episode.
+
+        Returns:
+            dict: A dictionary where keys are folder names and values are their comma-separated file genres.
+        """
+        if folders is None:
+            folders = [folder for folder, type in self.classifications.items() if type in ('Movie', 'Episode')]
+        folders = set(folders)
+        start = time.perf_counter()
+        statements = []
+        file_genres = {}
+        with get_connection(self.dbpath, readonly=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS genrefolders (folder TEXT PRIMARY KEY)")
+            cursor.execute("DELETE FROM genrefolders")
+            cursor.executemany("INSERT OR IGNORE INTO genrefolders (folder) VALUES (?)", [(folder,) for folder in folders])
+            conn.set_trace_callback(statements.append)  # Count the lookup statements, not the staged rows
+            cursor.execute("""
+                SELECT steps.child, meta.genre
+                FROM (
+                    SELECT child, filepath_id, MIN(rowid)
+                    FROM filesteps WHERE child IN (SELECT folder FROM genrefolders)
+                    GROUP BY child
+                ) AS steps
+                JOIN filepaths ON filepaths.id = steps.filepath_id
+                JOIN (
+                    SELECT title, genre, MIN(rowid) FROM filemetadata GROUP BY title
+                ) AS meta ON meta.title = filepaths.filetitle
+            """)
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for folder, genre in rows:
+                    if genre is not None:
+                        file_genres[folder] = genre
+            cursor.execute("DELETE FROM genrefolders")
+            conn.set_trace_callback(None)
+        elapsed = time.perf_counter() - start
+        log_info("File genres precomputed for %d of %d folders with %d SQL statements in %.3fs",
+                 len(file_genres), len(folders), len(statements), elapsed)
+        return file_genres
+
+    def fileGenre(self, folder):
+        """
+        Looks up the precomputed file genre of a release folder.
+
+        Args:
+            folder (str): The folder whose file genre to look up.
+
+        Returns:
+            str: The comma-separated genre string, or None if the folder has no file metadata.
+        """
+        self.genre_lookups += 1
+        return self.file_genres.get(folder)
+
+    def assembleGenres(self, folder, filtered_dag):
+        """
+        Stores the genres of a classified folder in folder_genres.
+
+        Movies and episodes combine their ancestry genres with their file genres, while
+        franchises, seasons and series take the union of their members' file genres.
+
+        Args:
+            folder (str): The classified folder.
+            filtered_dag (dict): The filtered DAG dictionary.
+        """
+        if self.classifications.get(folder) in ('Movie', 'Episode'):
+            ancestry_genres = self.extractAncestryGenres(folder)
+            file_genre = self.fileGenre(folder)
+            if file_genre is not None:
+                ancestry_genres.update(file_genre.split(','))
+                self.folder_genres[folder] = ', '.join(ancestry_genres)
+        elif self.classifications.get(folder) in COLLECTIONS:
+            franchise_genres = self.memberGenres(folder, filtered_dag)
+            self.folder_genres[folder] = ', '.join(franchise_genres)
+
+    def memberGenres(self, folder, filtered_dag):
+        """
+        Collects the file genres of the releases grouped under a franchise, series or season.
+
+        Args:
+            folder (str): The collection folder.
+            filtered_dag (dict): The filtered DAG dictionary.
+
+        Returns:
+            set: The union of the members' file genres.
+        """
+        genres = set()
+        for child in filtered_dag.get(folder, []):
+            label = self.classifications.get(child)
+            if label == 'Season' and self.classifications.get(folder) == 'Series':
+                genres.update(self.memberGenres(child, filtered_dag))
+            elif label in ('Movie', 'Episode') and self.classifications.get(folder) != 'Series':
+                file_genre = self.fileGenre(child)
+                if file_genre is not None:
+                    genres.update(file_genre.split(','))
+        return genres
+
+    def folderGenre(self, folder):
+        """
+        Returns the stored genres of a folder as a sorted, de-duplicated string.
+
+        Args:
+            folder (str): The classified folder.
+
+        Returns:
+            str: A comma-separated list of genres.
+        """
+        return ', '.join(sorted(set(g.strip() for g in self.folder_genres.get(folder, '').split(','))))  # Remove duplicates and strip whitespace
+
+    def classifyFolder(self, folder, filtered_dag, parents_of):
+        """
+        Classifies a single folder with the same rules analyzeStructure applies to the whole DAG.
+
+        Args:
+            folder (str): The folder to classify.
+            filtered_dag (dict): The filtered DAG dictionary.
+            parents_of (dict): A dictionary where keys are folder names and values are lists of all their parents.
+
+        Returns:
+            str: The folder's classification, or None for genres and unclassified folders.
+        """
+        if folder in filtered_dag:
+            return self.classifyParent(folder, filtered_dag[folder])
+        if any(parent in filtered_dag for parent in parents_of.get(folder, ())):
+            return self.rules.classifyName(folder)
+        return None
+
+    def classifyParent(self, parent, children):
+        """
+        Classifies a folder that has children, first by its name and then by its structure.
+
+        A year in a show's name, as in "Doctor Who (2005)", does not make it a movie when all of
+        its children are seasons or episodes.
+
+        Args:
+            parent (str): The parent folder.
+            children (list): A list of child folders.
+
+        Returns:
+            str: 'Movie', 'Season', 'Episode', 'Franchise', 'Series', or None for genres.
+        """
+        label = self.rules.classifyName(parent)
+        if label == 'Movie' and self.isSeries(parent, children):
+            return 'Series'
+        if label:
+            return label
+        if self.isFranchise(parent, children):
+            return 'Franchise'
+        if self.isSeries(parent, children):
+            return 'Series'
+        return None
+
+    @instrumented('filterDAG', rows=lambda hat, filtered_dag: len(filtered_dag))
     def filterDAG(self):
         """
         Removes unwanted categories like root folders, types, genres, and studios.
@@ -216,14 +655,19 @@ class SortingHat:
             dict: A filtered DAG dictionary.
         """
         log_info("Filtering DAG to remove unwanted categories")
-        to_remove = {"E:", "Films", "Media", "Series", "Movies"}  # Types
-        with sqlite3.connect(self.dbpath) as conn:
+        types = {"E:", "Films", "Media", "Series", "Movies"}  # Types
+        to_remove = set(types)
+        with get_connection(self.dbpath, readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM genre")
             to_remove.update(row[0] for row in cursor.fetchall())  # Add genres to remove
-        
-        filtered_dag = {k: v for k, v in self.dag.items() if k not in to_remove} # Filter out unwanted categories
-        log_info("Filtered DAG: %s", filtered_dag)
+
+        # Folders stored as genres by earlier runs are kept when the rules now recognise them
+        filtered_dag = {
+            k: v for k, v in self.dag.items()
+            if k not in to_remove or (k not in types and (self.rules.classifyName(k) or self.isSeries(k, v)))
+        }  # Filter out unwanted categories
+        log_info("Filtered DAG: %s", summarize(filtered_dag))
         return filtered_dag
 
     def isFranchise(self, parent, children):
@@ -237,18 +681,38 @@ class SortingHat:
         Returns:
             bool: True if all children are movies, False otherwise.
         """
-        log_info("Checking if %s is a franchise", parent)
         for child in children:
-            if not self.isMovie(child, self.dag.get(child, [])):
-                log_info("%s is not a franchise because %s is not a movie", parent, child)  # Log statement
+            if not self.isMovie(child, []):
+                log_debug("%s is not a franchise because %s is not a movie", parent, child)  # Log statement
                 return False
-        log_info("%s is a franchise", parent)  # Log statement
+        log_debug("%s is a franchise", parent)  # Log statement
+        return True
+
+    def isSeries(self, parent, children):
+        """
+        Checks if all children are seasons or episodes.
+
+        Args:
+            parent (str): The parent folder.
+            children (list): A list of child folders.
+
+        Returns:
+            bool: True if the folder has children and all of them are seasons or episodes, False otherwise.
+        """
+        if not children:
+            return False
+        for child in children:
+            if self.rules.classifyName(child) not in ('Season', 'Episode'):
+                return False
+        log_debug("%s is a series", parent)  # Log statement
         return True
 
     def isMovie(self, parent, children):
         """
         Checks if a folder name has a year in it, i.e. in Hancock (2008).
 
+        Names that also carry an episode or season tag are classified as those instead.
+
         Args:
             parent (str): The parent folder.
             children (list): A list of child folders.
@@ -256,64 +720,158 @@ class SortingHat:
         Returns:
             bool: True if the folder name has a year in it, False otherwise.
         """
-        log_info("Checking if %s is a movie", parent)
-        if re.search(r"\(\d{4}\)", parent):
-            log_info("%s is a movie", parent)  # Log statement
-            return True
-        log_info("%s is not a movie", parent)  # Log statement
-        return False
+        movie = self.rules.classifyName(parent) == 'Movie'
+        log_debug("%s is %sa movie", parent, "" if movie else "not ")  # Log statement
+        return movie
+
+    def loadClassifications(self):
+        """
+        Loads previously saved classifications from the type table.
+
+        Returns:
+            dict: A dictionary where keys are folder names and values are their classifications.
+        """
+        with get_connection(self.dbpath, readonly=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'type'")
+            if not cursor.fetchone():
+                return {}
+            cursor.execute("SELECT folder, type FROM type")
+            return dict(cursor.fetchall())
+
+    def loadSavedGenres(self):
+        """
+        Loads previously saved folder genres from the classifications table.
+
+        Returns:
+            dict: A dictionary where keys are folder names and values are (type, genre) tuples.
+        """
+        with get_connection(self.dbpath, readonly=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'classifications'")
+            if not cursor.fetchone():
+                return {}
+            cursor.execute("SELECT folder, type, genre FROM classifications")
+            return {folder: (type, genre) for folder, type, genre in cursor.fetchall()}
 
-    def saveClassifications(self):
+    @instrumented('saveClassifications', rows=lambda hat, written: written)
+    def saveClassifications(self, folders=None, conn=None):
         """
         Saves classification results to the classifications table.
+
+        Rows are staged in a temporary table and written with one INSERT ... SELECT that resolves
+        every folder's file_id in a single join against filesteps.
+
+        Args:
+            folders (iterable): Only save these folders, deleting rows for those no longer classified. Saves all when None.
+            conn (sqlite3.Connection): Write inside this connection's transaction instead of opening and committing a new one.
+
+        Returns:
+            int: The number of rows written or deleted.
         """
         log_info("Saving classification results to the database")
-        with sqlite3.connect(self.dbpath) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS classifications (
-                    file_id INTEGER,
-                    folder TEXT PRIMARY KEY, 
-                    type TEXT,
-                    classes TEXT,
-                    levels TEXT,
-                    genre TEXT,
-                    FOREIGN KEY (file_id) REFERENCES filesteps(filepath_id),
-                    FOREIGN KEY (folder) REFERENCES filesteps(parent)
+        if conn is None:
+            with writer(self.dbpath) as conn:
+                written = self.saveClassifications(folders, conn)
+            return written
+
+        start = time.perf_counter()
+        if folders is None:
+            items = list(self.classifications.items())
+            removed = []
+        else:
+            items = [(folder, self.classifications[folder]) for folder in folders if folder in self.classifications]
+            removed = [(folder,) for folder in folders if folder not in self.classifications]
+
+        rows = []
+        for folder, type in items:
+            if type not in CLASS_LEVELS:
+                log_debug("Skipping %s with classification: %s", folder, type)  # Log statement
+                continue
+            classes, levels = CLASS_LEVELS[type]
+            owner, _, name = folder.rpartition(SCOPE_SEPARATOR)
+            rows.append((folder, type, classes, levels, self.folderGenre(folder), owner.rpartition(SCOPE_SEPARATOR)[2] or None, name))
+
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS classifications (
+                file_id INTEGER,
+                folder TEXT PRIMARY KEY, 
+                type TEXT,
+                classes TEXT,
+                levels TEXT,
+                genre TEXT,
+                FOREIGN KEY (file_id) REFERENCES filesteps(filepath_id),
+                FOREIGN KEY (folder) REFERENCES filesteps(parent)
+            )
+        """)
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS classificationstage (
+                folder TEXT PRIMARY KEY,
+                type TEXT,
+                classes TEXT,
+                levels TEXT,
+                genre TEXT,
+                owner TEXT,
+                name TEXT
+            )
+        """)
+        cursor.execute("DELETE FROM classificationstage")
+        cursor.executemany("INSERT OR REPLACE INTO classificationstage (folder, type, classes, levels, genre, owner, name) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+        # The file_id is the first filesteps row where the folder is the parent or the child;
+        # a scoped season's is the first row where it is the child of its show
+        cursor.execute("""
+            INSERT OR REPLACE INTO classifications (file_id, folder, type, classes, levels, genre)
+            SELECT steps.filepath_id, stage.folder, stage.type, stage.classes, stage.levels, stage.genre
+            FROM classificationstage AS stage
+            LEFT JOIN (
+                SELECT folder, filepath_id, MIN(step)
+                FROM (
+                    SELECT parent AS folder, filepath_id, rowid AS step
+                    FROM filesteps WHERE parent IN (SELECT folder FROM classificationstage)
+                    UNION ALL
+                    SELECT child AS folder, filepath_id, rowid AS step
+                    FROM filesteps WHERE child IN (SELECT folder FROM classificationstage)
+                    UNION ALL
+                    SELECT stage.folder, filesteps.filepath_id, filesteps.rowid AS step
+                    FROM classificationstage AS stage
+                    JOIN filesteps ON filesteps.parent = stage.owner AND filesteps.child = stage.name
                 )
-            """)
-            for folder, type in self.classifications.items():
-                if type == 'Movie':
-                    classes = 'Film'
-                    levels = 'Release'
-                    genre = ', '.join(sorted(set(g.strip() for g in self.filemetadata.get(folder, {}).get('genre', '').split(','))))  # Remove duplicates and strip whitespace
-                    log_info("Saving %s as Movie with classes: %s, levels: %s, genre: %s", folder, classes, levels, genre)  # Log statement
-                elif type == 'Franchise':
-                    classes = 'Franchise'
-                    levels = 'Playlist'
-                    genre = ', '.join(sorted(set(g.strip() for g in self.filemetadata.get(folder, {}).get('genre', '').split(','))))  # Remove duplicates and strip whitespace
-                    log_info("Saving %s as Franchise with classes: %s, levels: %s, genre: %s", folder, classes, levels, genre)  # Log statement
-                else:
-                    log_info("Skipping %s with classification: %s", folder, type)  # Log statement
-                    continue
-                
-                # Fetch the file_id from the filesteps table
-                cursor.execute("SELECT filepath_id FROM filesteps WHERE parent = ? OR child = ?", (folder, folder))
-                file_id_result = cursor.fetchone()
-                file_id = file_id_result[0] if file_id_result else None
-                
-                cursor.execute("INSERT OR REPLACE INTO classifications (file_id, folder, type, classes, levels, genre) VALUES (?, ?, ?, ?, ?, ?)", 
-                               (file_id, folder, type, classes, levels, genre))
-            conn.commit()
-        log_info("Classes saved to database.")  # Log statement
-
-    def saveType(self):
+                GROUP BY folder
+            ) AS steps ON steps.folder = stage.folder
+        """)
+        cursor.executemany("DELETE FROM classifications WHERE folder = ?", removed)
+        cursor.execute("DELETE FROM classificationstage")
+
+        elapsed = time.perf_counter() - start
+        written = len(rows) + len(removed)
+        log_info("Classes saved to database: %d rows in %.3fs (%.0f rows/s)", written, elapsed, written / elapsed if elapsed else 0)
+        return written
+
+    @instrumented('saveType', rows=lambda hat, written: written)
+    def saveType(self, folders=None):
         """
         Saves type to a new table in the database.
+
+        The type and classifications tables are written in a single transaction.
+
+        Args:
+            folders (iterable): Only save these folders, deleting rows for those no longer classified.
+                Saves all when None, deleting the rows of every folder that is no longer classified.
+
+        Returns:
+            int: The number of type rows written or deleted.
         """
         log_info("Saving type results to the database")
-        log_info("Type results: %s", self.classifications)  # Log classification results
-        with sqlite3.connect(self.dbpath) as conn:
+        start = time.perf_counter()
+        if folders is None:
+            folders = list(self.classifications) + [folder for folder in self.loadClassifications() if folder not in self.classifications]
+        else:
+            folders = list(folders)
+        items = [(folder, self.classifications[folder]) for folder in folders if folder in self.classifications]
+        removed = [(folder,) for folder in folders if folder not in self.classifications]
+        with writer(self.dbpath) as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS type (
@@ -322,26 +880,224 @@ class SortingHat:
                     FOREIGN KEY (folder) REFERENCES filesteps(parent)
                 )
             """)
-            for folder, type in self.classifications.items():
-                log_info("Saving %s with classification: %s", folder, type)  # Log statement
-                cursor.execute("INSERT OR REPLACE INTO type (folder, type) VALUES (?, ?)", (folder, type))
-            conn.commit()
-        log_info("Types saved to database.")  # Log statement
-        self.saveClassifications()  # Save to classifications table
+            cursor.executemany("INSERT OR REPLACE INTO type (folder, type) VALUES (?, ?)", items)
+            cursor.executemany("DELETE FROM type WHERE folder = ?", removed)
+            elapsed = time.perf_counter() - start
+            written = len(items) + len(removed)
+            log_info("Types saved to database: %d rows in %.3fs (%.0f rows/s)", written, elapsed, written / elapsed if elapsed else 0)
+            self.saveClassifications(folders, conn)  # Save to classifications table
+        return written
+
+    def classifyIncremental(self):
+        """
+        Re-classifies only the folders touched since the last run.
 
-    def classify(self):
+        Changed folders are read from the change journal. They are re-classified together with
+        their ancestors, genres are recomputed for those folders and for the descendants whose
+        ancestry may have moved, and only rows that actually changed are written. The first run
+        installs the journal and falls back to the full pipeline.
+
+        Returns:
+            dict: A dictionary of classifications where keys are folder names and values are their classifications.
+        """
+        log_info("Running the incremental classification pipeline")
+        with writer(self.dbpath) as conn:
+            install_journal(conn)
+            watermark = get_watermark(conn, 'sortinghat')
+            if watermark is None:
+                latest = latest_journal_id(conn)
+            else:
+                latest, changes = read_journal(conn, watermark)
+
+        if watermark is None:
+            log_info("No watermark found, running a full classification")
+            self.analyzeStructure(self.genres, self.studios)
+            self.saveType()
+            with writer(self.dbpath) as conn:
+                advance_watermark(conn, 'sortinghat', latest)
+            self.saveSnapshot()
+            return self.classifications
+
+        if not changes:
+            log_info("No changes since journal entry %d", watermark)
+            self.classifications = self.loadClassifications()
+            self.saveSnapshot()
+            return self.classifications
+
+        self.classifications = self.loadClassifications()
+        saved = self.loadSavedGenres()
+        filtered_dag = self.filterDAG()
+        parents_of = defaultdict(list)
+        for parent, children in self.dag.items():
+            for child in children:
+                parents_of[child].append(parent)
+
+        # The journal names folders as filesteps does, so a changed "Season 1" stands for every show's "Season 1"
+        scoped = defaultdict(list)
+        for folder in set(parents_of).union(self.classifications):
+            if SCOPE_SEPARATOR in folder:
+                scoped[folder.rpartition(SCOPE_SEPARATOR)[2]].append(folder)
+        if scoped:
+            journaled, changes = changes, {}
+            for folder, roles in journaled.items():
+                for node in [folder] + scoped.get(folder, []):
+                    changes.setdefault(node, set()).update(roles)
+
+        # Changed folders and all of their ancestors may classify differently
+        affected = set()
+        stack = list(changes)
+        while stack:
+            folder = stack.pop()
+            if folder not in affected:
+                affected.add(folder)
+                stack.extend(parents_of.get(folder, ()))
+
+        new_genres = set()
+        reclassified = set()
+        for folder in affected:
+            before = self.classifications.get(folder)
+            after = self.classifyFolder(folder, filtered_dag, parents_of)
+            if after is None:
+                self.classifications.pop(folder, None)
+                if folder in filtered_dag:
+                    new_genres.add(folder)
+            else:
+                self.classifications[folder] = after
+            if before != after:
+                reclassified.add(folder)
+        self.saveGenres(new_genres, self.genres, self.studios)
+
+        # Descendants inherit ancestry genres, so they change when a folder moves or is reclassified
+        regenerate = set(affected)
+        stack = [folder for folder, roles in changes.items() if 'child' in roles] + list(reclassified)
+        while stack:
+            folder = stack.pop()
+            for child in self.dag.get(folder, ()):
+                if child not in regenerate:
+                    regenerate.add(child)
+                    stack.append(child)
+
+        self.ancestry = self.buildAncestryIndex()
+        releases = {
+            member for folder in regenerate for member in [folder] + list(filtered_dag.get(folder, ()))
+            if self.classifications.get(member) in ('Movie', 'Episode')
+        }
+        releases.update(
+            grandchild for folder in regenerate if self.classifications.get(folder) == 'Series'
+            for child in filtered_dag.get(folder, ()) for grandchild in filtered_dag.get(child, ())
+        )
+        self.file_genres = self.buildFileGenres(releases)
+        for folder in regenerate:
+            self.assembleGenres(folder, filtered_dag)
+
+        # Journaled folders may have a new file_id, the rest are only written when their row differs
+        dirty = [
+            folder for folder in regenerate
+            if folder in changes
+            or saved.get(folder) != ((self.classifications[folder], self.folderGenre(folder)) if folder in self.classifications else None)
+        ]
+        log_info("Incremental run: %d changed, %d affected, %d regenerated, %d rows written",
+                 len(changes), len(affected), len(regenerate), len(dirty))
+        self.saveType(dirty)
+        with writer(self.dbpath) as conn:
+            advance_watermark(conn, 'sortinghat', latest)
+        self.saveSnapshot()
+        return self.classifications
+
+    def classify(self, incremental=False, workers=CLASSIFY_WORKERS, engine=CLASSIFY_ENGINE, optimize=OPTIMIZE_BEFORE_RUN):
         """
         Runs the full classification pipeline.
 
+        The stage measurements of the run, including construction, are stored in the
+        pipeline_runs table and kept in `last_run`.
+
+        Args:
+            incremental (bool): Only re-classify folders changed since the last incremental run.
+            workers (int): Number of worker processes for a full run, 1 runs serially.
+            engine (str): "python" or "columnar" for a full run; incremental runs always use the per-folder path.
+            optimize (bool): Create missing indexes and verify the known query plans first, see classifier.db.optimizer.
+
         Returns:
             dict: A dictionary of classifications where keys are folder names and values are their classifications.
         """
-        log_info("Running the full classification pipeline")
-        self.analyzeStructure(self.genres, self.studios)
-        self.saveType()
-        log_info("Classification results: %s", self.classifications)
+        with self.instrument.stage('classifyIncremental' if incremental else 'classify'):
+            if optimize:
+                self.prepareDatabase()
+            if incremental:
+                self.classifyIncremental()
+            else:
+                log_info("Running the full classification pipeline")
+                if engine == 'columnar':
+                    self.analyzeColumnar(self.genres, self.studios)
+                else:
+                    self.analyzeStructure(self.genres, self.studios, workers)
+                self.saveType()
+                self.saveSnapshot()
+                log_info("Classification results: %s", summarize(self.classifications))
+        self.finishRun()
         return self.classifications
 
+    @instrumented('prepareDatabase')
+    def prepareDatabase(self):
+        """
+        Creates the missing indexes, refreshes planner statistics and verifies the known query plans.
+
+        Raises:
+            QueryPlanError: If OPTIMIZER_STRICT is set and a known query still scans a whole table.
+        """
+        with writer(self.dbpath) as conn:
+            prepare_database(conn)
+
+    def finishRun(self):
+        """
+        Records the current run's stage measurements and starts a new run.
+
+        Returns:
+            PipelineRun: The finished run.
+        """
+        self.last_run, self.instrument = self.instrument, PipelineRun('sortinghat')
+        record_run(self.dbpath, self.last_run)
+        return self.last_run
+
+def _classifyPartition(dbpath, rules, items):
+    """
+    Classifies one partition of the filtered DAG in a worker process.
+
+    Args:
+        dbpath (str): Path to the SQLite database.
+        rules (RuleEngine): The folder-name rule engine.
+        items (list): (parent, children) items of the partition.
+
+    Returns:
+        tuple: Dictionaries of parent labels and child labels, keyed by folder name.
+    """
+    hat = SortingHat.workerShell(dbpath, rules)
+    parents = {parent: hat.classifyParent(parent, children) for parent, children in items}
+    children = {child: rules.classifyName(child) for _, members in items for child in members}
+    return parents, children
+
+
+def _assemblePartition(dbpath, rules, folders, filtered_dag, classifications, ancestry, file_genres):
+    """
+    Assembles the genres of one partition's classified folders in a worker process.
+
+    Args:
+        dbpath (str): Path to the SQLite database.
+        rules (RuleEngine): The folder-name rule engine.
+        folders (list): The folders to assemble genres for.
+        filtered_dag (dict): The partition's slice of the filtered DAG.
+        classifications (dict): Classifications of the partition's folders.
+        ancestry (dict): Ancestry genres of the folders.
+        file_genres (dict): File genres of the partition's release folders.
+
+    Returns:
+        tuple: A dictionary where keys are folder names and values are their genre strings, and the number of file genre lookups.
+    """
+    hat = SortingHat.workerShell(dbpath, rules, classifications, ancestry, file_genres)
+    for folder in folders:
+        hat.assembleGenres(folder, filtered_dag)
+    return hat.folder_genres, hat.genre_lookups
+
 if __name__ == "__main__":
     # Setup logging
     log_info("Starting SortingHat...")  # Log statement
@@ -351,13 +1107,13 @@ if __name__ == "__main__":
     
     # Save DAG to a JSON file
     with open('../dag.json', 'w') as f:
-        json.dump(sorter.dag, f, indent=4)
+        json.dump(dict(sorter.dag), f, indent=4)
     
     log_info("DAG saved to ../dag.json")
     
     # Verify database entries
-    with sqlite3.connect(sorter.dbpath) as conn:
+    with get_connection(sorter.dbpath, readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM classifications")
         rows = cursor.fetchall()
-        log_info("Database entries in classifications table: %s", rows)
+        log_info("Database entries in classifications table: %s", summarize(rows))
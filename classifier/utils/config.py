@@ -4,12 +4,106 @@ import os
 # Database file path (can be updated later if needed)
 DB_PATH = os.path.join(os.getcwd(), "../classified.db")
 
+# Pragmas applied to every connection from classifier.db.connection (journal_mode only on writable ones)
+DB_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,
+    "cache_size": -65536,
+}
+
+# Seconds a connection waits for a locked database before giving up
+DB_BUSY_TIMEOUT = 30
+
+# Create missing indexes, refresh planner statistics and verify the known query plans before each pipeline run
+OPTIMIZE_BEFORE_RUN = True
+
+# Abort the run when a known query still scans a whole table, instead of logging a warning
+OPTIMIZER_STRICT = False
+
 # Filesteps exclusions (used in Ancestry algorithm)
 EXCLUDED_FOLDERS = {"E:", "Films", "Media", "Series", "Movies"}
 
+# DAG storage backend used by the SortingHat: "dict" or "csr" (interned IDs in flat arrays)
+DAG_BACKEND = "dict"
+
+# Worker processes used to classify independent DAG subtrees (1 runs serially)
+CLASSIFY_WORKERS = 1
+
+# Engine for full classification runs: "python" (per-folder loops) or "columnar" (pandas joins and grouped reductions)
+CLASSIFY_ENGINE = "python"
+
+# File metadata records kept in the SortingHat's LRU cache
+METADATA_CACHE_SIZE = 10000
+
+# Assemble all franchises with one grouped join instead of querying each franchise separately
+BULK_ASSEMBLY = True
+
+# Workers assembling franchises concurrently (1 keeps the serial or bulk path) and their pool: "thread", "process",
+# or "async" for the asyncio pipeline overlapping aggregation (in ASSEMBLY_WORKERS threads) with text generation
+ASSEMBLY_WORKERS = 1
+ASSEMBLY_POOL = "thread"
+
+# Franchises the async assembly pipeline aggregates ahead of text generation
+ASSEMBLY_QUEUE = 64
+
+# Franchise rows the concurrent assembly writer commits per transaction
+ASSEMBLY_COMMIT_EVERY = 500
+
+# Generate franchise plots and awards with the local GPT4All model during assembly
+LLM_GENERATION = False
+
+# Local GPT4All model, loaded on first use (generation is skipped when the file is missing)
+GPT4ALL_MODEL_PATH = r"C:\Users\DELL\AppData\Local\nomic.ai\GPT4All\Meta-Llama-3-8B-Instruct.Q4_0.gguf"
+
+# Address of a shared model server started with `python -m classifier.metadata.gpt4all` (None loads the model in-process)
+GPT4ALL_SERVER = None
+
+# Environment variable holding the model server's secret key, checked before GPT4ALL_AUTHKEY_FILE
+GPT4ALL_AUTHKEY_ENV = "CLASSIFIER_GPT4ALL_AUTHKEY"
+
+# Per-install file holding the model server's secret key, created with `python -m classifier.metadata.gpt4all --new-key`
+GPT4ALL_AUTHKEY_FILE = os.path.join(os.path.expanduser("~"), ".classifier", "gpt4all.key")
+
+# Uncached prompts sent to the model per batch; each batch's responses are cached in one transaction
+GENERATION_BATCH = 16
+
+# Seconds of model time allowed per franchise plot before the extractive summary is used instead (None waits indefinitely)
+PLOT_BUDGET = 10.0
+
+# Suffix appended to the DB path for the SortingHat's binary state snapshot (None disables snapshots)
+SNAPSHOT_SUFFIX = ".snapshot"
+
+# Store each pipeline run's stage timings in the pipeline_runs table
+PIPELINE_RUN_HISTORY = True
+
+# Trace each stage's peak memory with tracemalloc (slows the pipeline down noticeably)
+INSTRUMENT_MEMORY = False
+
+# Synthetic library sizes (in files) and seed used by classifier.benchmarks
+BENCHMARK_SIZES = {"10k": 10000, "100k": 100000, "1M": 1000000}
+BENCHMARK_SEED = 42
+
 # Logging settings (can be toggled)
 DEBUG_MODE = True
 
+# Log file written by the background logging thread (skipped if its folder does not exist)
+LOG_FILE = "c:/Users/DELL/OneDrive/Documents/Projects/Packages/Classifier/classifier/classified.log"
+
+# Per-module log levels; the per-item hot paths only log progress in DEBUG_MODE
+LOG_LEVELS = {
+    "classifier.sortinghat": "INFO" if DEBUG_MODE else "WARNING",
+    "classifier.metadata": "INFO" if DEBUG_MODE else "WARNING",
+    "classifier.db": "INFO",
+}
+
+# Per-item messages are logged on their first and every Nth occurrence
+LOG_SAMPLE_EVERY = 1000
+
+# Maximum entries shown when a whole structure is logged
+LOG_SUMMARY_LIMIT = 20
+
 # Metadata merging fields (used in MetAssembly)
 METADATA_FIELDS = [
     "title", "year", "genre", "type", "runtime",
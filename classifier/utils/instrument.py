@@ -0,0 +1,226 @@
+import datetime
+import functools
+import time
+import tracemalloc
+from classifier.utils.config import INSTRUMENT_MEMORY
+
+
+class StageStats:
+    """
+    Accumulated measurements of one pipeline stage.
+
+    Attributes:
+        name (str): The stage name.
+        parent (str): The name of the enclosing stage, or None for top-level stages.
+        calls (int): The number of times the stage ran.
+        wall (float): Total wall time in seconds.
+        cpu (float): Total CPU time of this process in seconds (worker processes are only included in stages merged from their runs).
+        rows (int): Rows processed, as reported by the stage.
+        peak_memory (int): The highest traced memory in bytes while the stage ran, or None when not traced.
+    """
+
+    __slots__ = ("name", "parent", "calls", "wall", "cpu", "rows", "peak_memory")
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rows = 0
+        self.peak_memory = None
+
+    def asDict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class PipelineRun:
+    """
+    Records per-stage wall time, CPU time, rows and optional tracemalloc peaks for one pipeline run.
+
+    Stages nest: a stage entered while another is open records it as its parent, and its time
+    is included in the parent's. Repeated stages (such as one aggregate per franchise) are
+    accumulated under one name.
+
+    Attributes:
+        pipeline (str): The pipeline name, e.g. "sortinghat".
+        memory (bool): Whether stage peaks are traced with tracemalloc.
+        started (str): When the run started, in ISO format.
+        stages (dict): A dictionary where keys are stage names and values are StageStats, in order of first use.
+    """
+
+    def __init__(self, pipeline, memory=INSTRUMENT_MEMORY):
+        """
+        Initializes the PipelineRun instance.
+
+        Args:
+            pipeline (str): The pipeline name.
+            memory (bool): Whether to trace stage peaks with tracemalloc.
+        """
+        self.pipeline = pipeline
+        self.memory = memory
+        self.started = datetime.datetime.now().isoformat(timespec="seconds")
+        self.stages = {}
+        self.open = []
+        self.peaks = []
+
+    def stage(self, name):
+        """
+        Returns a context manager that measures one execution of a stage.
+
+        Args:
+            name (str): The stage name.
+
+        Returns:
+            StageTimer: The context manager; it yields the stage's StageStats so rows can be added.
+        """
+        return StageTimer(self, name)
+
+    def count(self, rows):
+        """
+        Adds processed rows to the innermost open stage.
+
+        Args:
+            rows (int): The number of rows.
+        """
+        if self.open:
+            self.open[-1].rows += rows
+
+    def merge(self, other):
+        """
+        Adds the stages of another run, such as one recorded by a pool worker, to this run.
+
+        Top-level stages of the other run are nested under the innermost open stage.
+
+        Args:
+            other (PipelineRun): The run to merge.
+        """
+        parent = self.open[-1].name if self.open else None
+        for theirs in other.stages.values():
+            stats = self.stages.get(theirs.name)
+            if stats is None:
+                stats = self.stages[theirs.name] = StageStats(theirs.name, theirs.parent or parent)
+            stats.calls += theirs.calls
+            stats.wall += theirs.wall
+            stats.cpu += theirs.cpu
+            stats.rows += theirs.rows
+            if theirs.peak_memory is not None:
+                stats.peak_memory = max(stats.peak_memory or 0, theirs.peak_memory)
+
+    def wall(self):
+        """
+        Returns the wall time of the run, the sum of its top-level stages.
+
+        Returns:
+            float: The wall time in seconds.
+        """
+        return sum(stats.wall for stats in self.stages.values() if stats.parent is None)
+
+    def cpu(self):
+        """
+        Returns the CPU time of the run, the sum of its top-level stages.
+
+        Returns:
+            float: The CPU time in seconds.
+        """
+        return sum(stats.cpu for stats in self.stages.values() if stats.parent is None)
+
+    def report(self):
+        """
+        Returns the stage measurements.
+
+        Returns:
+            list: One dictionary per stage, in order of first use.
+        """
+        return [stats.asDict() for stats in self.stages.values()]
+
+    def __str__(self):
+        parts = []
+        for stats in self.stages.values():
+            part = "{} {:.3f}s".format(stats.name, stats.wall)
+            if stats.calls > 1:
+                part += " x{}".format(stats.calls)
+            if stats.rows:
+                part += " {} rows".format(stats.rows)
+            parts.append(part)
+        return "{}: {}".format(self.pipeline, ", ".join(parts))
+
+
+class StageTimer:
+    """
+    Context manager measuring one execution of a stage of a PipelineRun.
+    """
+
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        run = self.run
+        stats = run.stages.get(self.name)
+        if stats is None:
+            stats = run.stages[self.name] = StageStats(self.name, run.open[-1].name if run.open else None)
+        self.stats = stats
+        if run.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            else:
+                self.started_tracing = False
+                self.foldPeak()
+            run.peaks.append(0)
+        run.open.append(stats)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return stats
+
+    def foldPeak(self):
+        # Carry the peak so far into every open stage before the counter is reset
+        peak = tracemalloc.get_traced_memory()[1]
+        peaks = self.run.peaks
+        for index in range(len(peaks)):
+            peaks[index] = max(peaks[index], peak)
+        tracemalloc.reset_peak()
+
+    def __exit__(self, *exc):
+        stats = self.stats
+        stats.calls += 1
+        stats.wall += time.perf_counter() - self.wall
+        stats.cpu += time.process_time() - self.cpu
+        run = self.run
+        run.open.pop()
+        if run.memory:
+            self.foldPeak()
+            peak = run.peaks.pop()
+            stats.peak_memory = max(stats.peak_memory or 0, peak)
+            if self.started_tracing:
+                tracemalloc.stop()
+        return False
+
+
+def instrumented(name, rows=None):
+    """
+    Decorates a method so that each call is measured as a stage of the object's `instrument` run.
+
+    Calls on objects without an `instrument` attribute (or with None) are not measured.
+
+    Args:
+        name (str): The stage name.
+        rows (callable): Optional function of the object and the method's result returning the rows processed.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            run = getattr(self, "instrument", None)
+            if run is None:
+                return method(self, *args, **kwargs)
+            with run.stage(name) as stats:
+                result = method(self, *args, **kwargs)
+                if rows is not None:
+                    stats.rows += rows(self, result)
+                return result
+        return wrapper
+    return decorate
@@ -1,26 +1,151 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import sys
+from collections.abc import Mapping, Sized
+from classifier.utils.config import DEBUG_MODE, LOG_FILE, LOG_LEVELS, LOG_SAMPLE_EVERY, LOG_SUMMARY_LIMIT
 
-# Configure logging to log to a file
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("c:/Users/DELL/OneDrive/Documents/Projects/Packages/Classifier/classifier/classified.log"),
-        logging.StreamHandler()
-    ]
-)
+# All package loggers hang off this one; it hands records to a background writer thread
+PACKAGE = "classifier"
+
+_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+_queue = queue.SimpleQueue()
+_listener = None
+_samples = {}
+
+
+def _start_listener():
+    """
+    Starts the background thread that writes queued records to the file and the console.
+    """
+    global _listener
+    handlers = [logging.StreamHandler()]
+    if os.path.isdir(os.path.dirname(LOG_FILE)):
+        handlers.append(logging.FileHandler(LOG_FILE))
+    for handler in handlers:
+        handler.setFormatter(_formatter)
+    _listener = logging.handlers.QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # A forked child inherits the queue but not the writer thread
+    global _queue
+    _queue = queue.SimpleQueue()
+    package_logger.handlers[:] = [logging.handlers.QueueHandler(_queue)]
+    _start_listener()
+
+
+def stop_logging():
+    """
+    Flushes queued records and stops the background writer.
+    """
+    if _listener is not None:
+        _listener.stop()
+
+
+# Configure the package logger to log through the queue
+package_logger = logging.getLogger(PACKAGE)
+package_logger.addHandler(logging.handlers.QueueHandler(_queue))
+package_logger.propagate = False
+package_logger.setLevel(logging.DEBUG if DEBUG_MODE else logging.INFO)
+for _name, _level in LOG_LEVELS.items():
+    logging.getLogger(_name).setLevel(_level)
+_start_listener()
+atexit.register(stop_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
 
 # Create a logger instance
 logger = logging.getLogger(__name__)
 
+
+def get_logger(name=None):
+    """
+    Returns the package logger for a module, so per-module levels in LOG_LEVELS apply.
+
+    Args:
+        name (str): The module name, e.g. __name__.
+
+    Returns:
+        logging.Logger: The module's logger, or the package logger for scripts run as __main__.
+    """
+    if not name or not (name == PACKAGE or name.startswith(PACKAGE + ".")):
+        return package_logger
+    return logging.getLogger(name)
+
+
+def _caller():
+    return get_logger(sys._getframe(2).f_globals.get("__name__"))
+
+
 def log_info(message, *args):
-    logger.info(message, *args)
+    _caller().info(message, *args)
 
 def log_debug(message, *args):
-    logger.debug(message, *args)
+    _caller().debug(message, *args)
 
 def log_warning(message, *args):
-    logger.warning(message, *args)
+    _caller().warning(message, *args)
 
 def log_error(message, *args):
-    logger.error(message, *args)
+    _caller().error(message, *args)
+
+
+def log_sampled(message, *args):
+    """
+    Logs a per-item message at INFO, but only its first and every LOG_SAMPLE_EVERY-th occurrence.
+
+    Occurrences are counted per message template, so one noisy loop does not drown out others.
+
+    Args:
+        message (str): The message template.
+        *args: Arguments for the template.
+    """
+    count = _samples.get(message, 0) + 1
+    _samples[message] = count
+    if count == 1 or count % LOG_SAMPLE_EVERY == 0:
+        target = _caller()
+        if target.isEnabledFor(logging.INFO):
+            target.info(message + " (occurrence %d)", *args, count)
+
+
+class summarize:
+    """
+    Wraps a large structure so that logging it prints a size-capped summary.
+
+    The summary is only built if the record is actually emitted.
+
+    Attributes:
+        value: The wrapped structure.
+        limit (int): The maximum number of entries shown.
+    """
+
+    def __init__(self, value, limit=LOG_SUMMARY_LIMIT):
+        self.value = value
+        self.limit = limit
+
+    def short(self, entry):
+        # Nested collections are shown by size once they exceed the limit
+        if isinstance(entry, Sized) and not isinstance(entry, (str, bytes)) and len(entry) > self.limit:
+            return "<{} of {} items>".format(type(entry).__name__, len(entry))
+        return str(entry)
+
+    def __str__(self):
+        value = self.value
+        if isinstance(value, (str, bytes)) or not isinstance(value, Sized):
+            text = str(value)
+            return text if len(text) <= self.limit * 20 else text[:self.limit * 20] + "..."
+        entries = value.items() if isinstance(value, Mapping) else value
+        shown = []
+        for index, entry in enumerate(entries):
+            if index == self.limit:
+                break
+            if isinstance(value, Mapping):
+                shown.append("{}: {}".format(entry[0], self.short(entry[1])))
+            else:
+                shown.append(self.short(entry))
+        more = ", ..." if len(value) > self.limit else ""
+        return "{} of {} items [{}{}]".format(type(value).__name__, len(value), ", ".join(shown), more)
@@ -0,0 +1,43 @@
+import shutil
+import sqlite3
+import pytest
+from classifier.benchmarks.generator import LibraryGenerator
+from classifier.sortinghat.sorter import SortingHat
+
+
+@pytest.fixture(scope="session")
+def library(tmp_path_factory):
+    """
+    A small generated library with franchises and shows whose season folders share names.
+    """
+    path = str(tmp_path_factory.mktemp("library") / "library.db")
+    LibraryGenerator(files=400, seed=7, series_share=0.4).generate(path)
+    return path
+
+
+@pytest.fixture
+def database(library, tmp_path):
+    """
+    A fresh copy of the generated library for one test.
+    """
+    path = str(tmp_path / "classifier.db")
+    shutil.copy(library, path)
+    return path
+
+
+@pytest.fixture
+def classified(library, tmp_path):
+    """
+    Classifies a fresh copy of the library and returns its classifications rows.
+    """
+    def classify(name, backend="dict", **options):
+        path = str(tmp_path / "{}.db".format(name))
+        shutil.copy(library, path)
+        SortingHat(path, backend=backend, snapshot="").classify(**options)
+        return classification_rows(path)
+    return classify
+
+
+def classification_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT file_id, folder, type, classes, levels, genre FROM classifications ORDER BY folder").fetchall()
@@ -0,0 +1,44 @@
+import shutil
+import sqlite3
+import pytest
+from classifier.metadata.assembler import MetAssembly
+from classifier.sortinghat.sorter import SortingHat
+
+
+@pytest.fixture(scope="module")
+def franchises(library, tmp_path_factory):
+    """
+    A classified copy of the library, ready to be assembled.
+    """
+    path = str(tmp_path_factory.mktemp("franchises") / "classified.db")
+    shutil.copy(library, path)
+    SortingHat(path, snapshot="").classify()
+    return path
+
+
+@pytest.fixture
+def assembled(franchises, tmp_path):
+    """
+    Assembles a fresh copy of the classified library and returns its franchiseassemble rows.
+    """
+    def assemble(name, **options):
+        path = str(tmp_path / "{}.db".format(name))
+        # The classification is still in the WAL file, which a file copy would leave behind
+        with sqlite3.connect(franchises) as source, sqlite3.connect(path) as target:
+            source.backup(target)
+        MetAssembly(path).fetchType(**options)
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT * FROM franchiseassemble ORDER BY id").fetchall()
+    return assemble
+
+
+@pytest.mark.parametrize("options", [
+    {"bulk": True},
+    {"workers": 3, "pool": "thread"},
+    {"workers": 3, "pool": "process"},
+    {"workers": 3, "pool": "async"},
+])
+def test_assembly_matches_the_per_franchise_rows(assembled, options):
+    expected = assembled("serial", bulk=False, workers=1, pool="thread")
+    assert expected
+    assert assembled("variant", **options) == expected
@@ -0,0 +1,83 @@
+import pytest
+from classifier.db.connection import writer, get_connection
+from classifier.db.awards import parse_awards, format_awards, install_awards, ingest_awards, get_folder_awards, load_folder_awards
+
+
+def counts(oscar_wins=0, oscar_nominations=0, wins=0, nominations=0):
+    return {"oscar_wins": oscar_wins, "oscar_nominations": oscar_nominations, "wins": wins, "nominations": nominations}
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("Won 2 Oscars. 45 wins & 120 nominations total", counts(oscar_wins=2, wins=43, nominations=120)),
+    ("Nominated for 3 Oscars. 10 wins & 20 nominations total", counts(oscar_nominations=3, wins=10, nominations=17)),
+    ("Won 1 Oscar. Another 2 wins & 3 nominations.", counts(oscar_wins=1, wins=2, nominations=3)),
+    ("Nominated for 1 Golden Globe. Another 3 wins & 7 nominations.", counts(wins=3, nominations=8)),
+    ("Won 1 BAFTA Film Award. 5 wins & 9 nominations total", counts(wins=5, nominations=9)),
+    ("Won 2 Oscars. 1 win total", counts(oscar_wins=2)),
+    ("Won 3 Oscars", counts(oscar_wins=3)),
+    ("45 wins & 120 nominations", counts(wins=45, nominations=120)),
+    ("1 win", counts(wins=1)),
+    ("12 nominations", counts(nominations=12)),
+])
+def test_parse_awards(value, expected):
+    assert parse_awards(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    "Some text",
+    "Another 3 wins & 1 nomination",
+    "Won 2 Oscars. Another 3 wins & 1 nomination total",
+    "Won 2 Oscars. 3 wins. 4 nominations",
+])
+def test_parse_awards_rejects_unknown_strings(value):
+    assert parse_awards(value) is None
+
+
+def test_format_awards_includes_oscars():
+    assert format_awards(counts(oscar_wins=2, oscar_nominations=1, wins=43, nominations=120)) == "Total: 45 wins & 121 nominations"
+
+
+def folder_awards(database, folder):
+    return get_folder_awards(get_connection(database, readonly=True), folder)
+
+
+def test_folder_awards_follow_metadata_changes(database):
+    with writer(database) as conn:
+        assert install_awards(conn)
+        ingest_awards(conn)
+        folder, file_id = conn.execute("""
+            SELECT filesteps.parent, filesteps.filepath_id FROM filesteps
+            JOIN filemetadata ON filemetadata.file_id = filesteps.filepath_id
+            WHERE filesteps.child LIKE '%.mkv' ORDER BY filesteps.rowid LIMIT 1
+        """).fetchone()
+        conn.execute("UPDATE filemetadata SET awards = 'Won 1 Oscar. 4 wins & 6 nominations total' WHERE file_id = ?", (file_id,))
+        ingest_awards(conn)
+    assert folder_awards(database, folder) == counts(oscar_wins=1, wins=3, nominations=6)
+
+    with writer(database) as conn:
+        conn.execute("UPDATE filemetadata SET awards = 'Some text' WHERE file_id = ?", (file_id,))
+        ingest_awards(conn)
+    assert folder_awards(database, folder) is None
+
+    with writer(database) as conn:
+        conn.execute("UPDATE filemetadata SET awards = 'N/A' WHERE file_id = ?", (file_id,))
+        ingest_awards(conn)
+    assert folder_awards(database, folder) == {}
+
+
+def test_folder_awards_skip_files_without_a_path(database):
+    with writer(database) as conn:
+        install_awards(conn)
+        conn.execute("UPDATE filemetadata SET awards = 'Won 1 Oscar'")
+        ingest_awards(conn)
+        folder, files, file_id = conn.execute("""
+            SELECT filesteps.parent, COUNT(*), MIN(filesteps.filepath_id) FROM filesteps
+            JOIN fileawards ON fileawards.file_id = filesteps.filepath_id
+            GROUP BY filesteps.parent HAVING COUNT(*) > 1 ORDER BY filesteps.parent LIMIT 1
+        """).fetchone()
+    assert folder_awards(database, folder) == counts(oscar_wins=files)
+
+    with writer(database) as conn:
+        conn.execute("DELETE FROM filepaths WHERE id = ?", (file_id,))
+    assert folder_awards(database, folder) == counts(oscar_wins=files - 1)
+    assert load_folder_awards(get_connection(database, readonly=True), [folder]) == {folder: counts(oscar_wins=files - 1)}
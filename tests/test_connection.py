@@ -0,0 +1,54 @@
+import sqlite3
+import pytest
+from classifier.db.connection import writer, get_connection, execute_script
+from classifier.db.journal import install_journal, advance_watermark
+from classifier.db.normalize import install_typed_metadata
+from classifier.db.stats import install_franchise_stats
+from classifier.db.people import install_people
+from classifier.db.awards import install_awards
+
+
+def test_execute_script_keeps_trigger_bodies_whole(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "script.db"))
+    execute_script(conn, """
+        CREATE TABLE a (x INTEGER);
+        CREATE TABLE b (x INTEGER);
+        CREATE TRIGGER a_insert AFTER INSERT ON a
+        BEGIN
+            INSERT INTO b (x) VALUES (NEW.x);
+            INSERT INTO b (x) VALUES (NEW.x + 1);
+        END;
+    """)
+    conn.execute("INSERT INTO a (x) VALUES (1)")
+    assert conn.execute("SELECT x FROM b ORDER BY x").fetchall() == [(1,), (2,)]
+
+
+def test_installs_stay_inside_the_writer_transaction(database):
+    with pytest.raises(RuntimeError):
+        with writer(database) as conn:
+            install_journal(conn)
+            install_typed_metadata(conn)
+            install_franchise_stats(conn)
+            install_people(conn)
+            install_awards(conn)
+            advance_watermark(conn, "test", 0)
+            raise RuntimeError("roll back")
+
+    tables = {row[0] for row in get_connection(database, readonly=True).execute("SELECT name FROM sqlite_master")}
+    assert not tables & {"changejournal", "watermark", "filemetadatatyped", "franchisestats", "fileawards"}
+
+
+def test_writer_does_not_join_an_implicit_transaction(database):
+    conn = get_connection(database)
+    conn.execute("CREATE TABLE IF NOT EXISTS notes (note TEXT)")
+    conn.execute("INSERT INTO notes (note) VALUES ('outside')")
+    assert conn.in_transaction
+
+    with pytest.raises(RuntimeError):
+        with writer(database) as conn:
+            with writer(database) as nested:
+                nested.execute("INSERT INTO notes (note) VALUES ('inside')")
+            raise RuntimeError("roll back")
+
+    assert not conn.in_transaction
+    assert conn.execute("SELECT note FROM notes").fetchall() == [("outside",)]
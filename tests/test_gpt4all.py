@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import threading
+import pytest
+from classifier.metadata import gpt4all
+
+
+def test_authkey_comes_from_the_environment_before_the_key_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "keys" / "gpt4all.key")
+    monkeypatch.delenv(gpt4all.GPT4ALL_AUTHKEY_ENV, raising=False)
+    assert gpt4all.load_authkey(path) is None
+
+    gpt4all.create_authkey(path)
+    key = gpt4all.load_authkey(path)
+    assert key and len(key) == 64
+    if os.name == "posix":
+        assert os.stat(path).st_mode & 0o777 == 0o600
+
+    monkeypatch.setenv(gpt4all.GPT4ALL_AUTHKEY_ENV, "from-the-environment")
+    assert gpt4all.load_authkey(path) == b"from-the-environment"
+
+
+def test_serve_refuses_to_start_without_a_key(monkeypatch):
+    monkeypatch.setattr(gpt4all, "load_authkey", lambda: None)
+    monkeypatch.setattr(gpt4all, "load_model", lambda path: pytest.fail("the model was loaded"))
+    assert gpt4all.serve(("localhost", 0)) is None
+
+
+def test_plots_past_their_budget_fall_back_to_extracts_and_are_cached_late(database, monkeypatch):
+    release = threading.Event()
+
+    def slow_generate(prompts, options):
+        release.wait(10)
+        return ["A generated plot."] * len(prompts)
+
+    monkeypatch.setattr(gpt4all, "generate", slow_generate)
+    monkeypatch.setattr(gpt4all, "LLM_GENERATION", True)
+    with sqlite3.connect(database) as conn:
+        folders = [row[0] for row in conn.execute("""
+            SELECT DISTINCT filesteps.parent FROM filesteps
+            JOIN filemetadata ON filemetadata.file_id = filesteps.filepath_id
+            WHERE filemetadata.plot NOT IN ('', 'N/A') ORDER BY filesteps.parent LIMIT 3
+        """)]
+    records = [{"classifications": {"folder": folder}} for folder in folders]
+    service = gpt4all.GenerationService(database, model_path="test-model.gguf")
+
+    summaries = gpt4all.summarize_plots(records, database, service, budget=0.01)
+    assert len(folders) == 3
+    assert [tier for _, tier in summaries] == ["extractive"] * 3
+    assert service.stats["expired"] == service.stats["misses"] > 0
+    assert service.stats["generated"] == 0
+
+    # The abandoned batch is still cached once the model finishes it
+    stored = threading.Event()
+    service.abandoned.add_done_callback(lambda future: stored.set())
+    release.set()
+    assert stored.wait(10)
+    summaries = gpt4all.summarize_plots(records, database, service, budget=0.01)
+    assert summaries == [("A generated plot.", "cache")] * 3
@@ -0,0 +1,18 @@
+import pytest
+from classifier.db import optimizer
+from classifier.db.connection import writer
+
+
+def test_full_scans_only_abort_a_strict_run(database, monkeypatch):
+    monkeypatch.setitem(optimizer.KNOWN_QUERIES, "every step", "SELECT * FROM filesteps")
+    with writer(database) as conn:
+        assert optimizer.prepare_database(conn) is None
+        with pytest.raises(optimizer.QueryPlanError) as error:
+            optimizer.prepare_database(conn, strict=True)
+    assert list(error.value.scans) == ["every step"]
+
+
+def test_known_queries_include_the_folder_lookups(database):
+    with writer(database) as conn:
+        plans = optimizer.prepare_database(conn)
+    assert "people of a folder" in plans and "awards of a folder" in plans
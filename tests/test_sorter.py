@@ -0,0 +1,149 @@
+import os
+import sqlite3
+from array import array
+import pytest
+from classifier.sortinghat.sorter import SortingHat
+from conftest import classification_rows
+
+
+@pytest.fixture
+def serial(classified):
+    return classified("serial", workers=1)
+
+
+def test_parallel_matches_serial_with_repeated_season_names(library, classified, serial):
+    with sqlite3.connect(library) as conn:
+        shows = conn.execute("SELECT COUNT(DISTINCT parent) FROM filesteps WHERE child = 'Season 1'").fetchone()[0]
+    assert shows > 1
+    assert any(row[2] == 'Series' and row[5] for row in serial)
+    assert classified("parallel", workers=3) == serial
+
+
+@pytest.mark.parametrize("options", [
+    {"backend": "csr"},
+    {"engine": "columnar"},
+    {"incremental": True},
+], ids=["csr", "columnar", "incremental"])
+def test_engines_match_serial(classified, serial, options):
+    assert classified("engine", **options) == serial
+
+
+def test_series_genres_come_from_their_own_episodes(serial):
+    rows = {row[1]: row for row in serial}
+    seasons = [folder for folder, row in rows.items() if row[2] == 'Season']
+    assert seasons and all("\\" in folder for folder in seasons)
+    assert len({rows[folder][0] for folder in seasons}) == len(seasons)
+
+    for folder, row in rows.items():
+        if row[2] != 'Series':
+            continue
+        expected = set()
+        for name, other in rows.items():
+            if other[2] == 'Episode' and name.startswith(folder + " S") and not name.endswith(".mkv") and other[5]:
+                expected.update(other[5].split(", "))
+        assert set(filter(None, row[5].split(", "))) == expected
+
+
+def change_library(path):
+    with sqlite3.connect(path) as conn:
+        show, episode = conn.execute(
+            "SELECT s.parent, e.child FROM filesteps AS s JOIN filesteps AS e ON e.filepath_id = s.filepath_id AND e.parent = s.child "
+            "WHERE s.child = 'Season 2' ORDER BY s.rowid LIMIT 1"
+        ).fetchone()
+        conn.execute("UPDATE filemetadata SET genre = 'Western' WHERE title = ?", (episode,))
+        conn.execute("DELETE FROM filemetadata WHERE file_id = (SELECT MIN(file_id) FROM filemetadata WHERE type = 'movie')")
+        conn.executemany("INSERT INTO filesteps (filepath_id, parent, child) VALUES (?, ?, ?)", [
+            (100000, "Series", "New Show"),
+            (100000, "New Show", "Season 2"),
+            (100000, "Season 2", "New Show S02E01"),
+        ])
+    return show
+
+
+def test_incremental_run_matches_full_run_after_changes(database, tmp_path):
+    SortingHat(database, snapshot="").classify(incremental=True)
+    change_library(database)
+    SortingHat(database, snapshot="").classify(incremental=True)
+
+    full = str(tmp_path / "full.db")
+    with sqlite3.connect(database) as source, sqlite3.connect(full) as target:
+        source.backup(target)
+    SortingHat(full, snapshot="").classify()
+    assert classification_rows(database) == classification_rows(full)
+    assert ("New Show\\Season 2", "Season") in [row[1:3] for row in classification_rows(database)]
+
+
+def test_snapshot_round_trip(database):
+    snapshot = database + ".snapshot"
+    hat = SortingHat(database, snapshot=snapshot)
+    hat.classify()
+    assert os.path.exists(snapshot)
+    rows = classification_rows(database)
+
+    warm = SortingHat(database, snapshot=snapshot)
+    assert warm.instrument.stages['loadSnapshot'].rows == len(hat.dag)
+    assert dict(warm.dag) == dict(hat.dag)
+    assert warm.classifications == hat.classifications
+    warm.classify()
+    assert classification_rows(database) == rows
+
+
+def test_stale_snapshot_is_rebuilt(database):
+    snapshot = database + ".snapshot"
+    SortingHat(database, snapshot=snapshot).classify()
+    change_library(database)
+
+    hat = SortingHat(database, snapshot=snapshot)
+    assert hat.instrument.stages['loadSnapshot'].rows == 0
+    assert "New Show" in hat.dag
+
+
+def test_snapshot_is_stale_after_an_in_place_update(database):
+    snapshot = database + ".snapshot"
+    SortingHat(database, snapshot=snapshot).classify()
+    with sqlite3.connect(database) as conn:
+        rowid, child = conn.execute("SELECT rowid, child FROM filesteps WHERE child LIKE '%(%).mkv' ORDER BY rowid LIMIT 1").fetchone()
+        conn.execute("UPDATE filesteps SET child = 'Renamed Movie (1999).mkv' WHERE rowid = ?", (rowid,))
+
+    hat = SortingHat(database, snapshot=snapshot)
+    assert hat.instrument.stages['loadSnapshot'].rows == 0
+    assert 'Renamed Movie (1999).mkv' in hat.parents
+    assert child not in hat.parents
+
+
+def test_csr_snapshot_can_be_replaced_after_loading(database):
+    snapshot = database + ".snapshot"
+    SortingHat(database, backend="csr", snapshot=snapshot).classify()
+    warm = SortingHat(database, backend="csr", snapshot=snapshot)
+    assert warm.instrument.stages['loadSnapshot'].rows == len(warm.dag)
+    assert isinstance(warm.dag.children, array)
+    warm.classify()
+    assert SortingHat(database, backend="csr", snapshot=snapshot).instrument.stages['loadSnapshot'].rows == len(warm.dag)
+
+
+def add_show(conn, file_id, show, season, episode):
+    parts = ["E:", "Series", show, season, episode, episode + ".mkv"]
+    conn.execute("INSERT INTO filepaths (id, filepath, filetitle) VALUES (?, ?, ?)", (file_id, "\\".join(parts), episode))
+    conn.executemany("INSERT INTO filesteps (filepath_id, parent, child) VALUES (?, ?, ?)",
+                     [(file_id, parent, child) for parent, child in zip(parts, parts[1:])])
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"workers": 3},
+    {"engine": "columnar"},
+], ids=["serial", "parallel", "columnar"])
+def test_year_tagged_and_lowercase_shows_are_series(database, tmp_path, options):
+    with sqlite3.connect(database) as conn:
+        add_show(conn, 200001, "Doctor Who (2005)", "Season 1", "Doctor Who (2005) S01E01")
+        add_show(conn, 200002, "Doctor Who (2005)", "Season 2", "Doctor Who (2005) S02E01")
+        add_show(conn, 200003, "quiet show", "season 1", "quiet show s01e01")
+    SortingHat(database, snapshot="").classify(**options)
+    types = {row[1]: row[2] for row in classification_rows(database)}
+
+    assert types["Doctor Who (2005)"] == "Series"
+    assert types["Doctor Who (2005)\\Season 2"] == "Season"
+    assert types["Doctor Who (2005) S01E01"] == "Episode"
+    assert types["quiet show"] == "Series"
+    assert types["quiet show\\season 1"] == "Season"
+    assert types["quiet show s01e01"] == "Episode"
@@ -0,0 +1,30 @@
+from classifier.db.connection import writer, get_connection
+from classifier.db.stats import install_franchise_stats, rebuild_franchise_stats, get_franchise_stats
+
+
+def all_stats(conn):
+    folders = [row[0] for row in conn.execute("SELECT DISTINCT parent FROM filesteps")]
+    return {folder: get_franchise_stats(conn, folder) for folder in folders}
+
+
+def test_triggers_keep_stats_equal_to_a_rebuild(database):
+    with writer(database) as conn:
+        assert install_franchise_stats(conn)
+        folder, file_id = conn.execute(
+            "SELECT parent, filepath_id FROM filesteps WHERE child LIKE '%.mkv' AND filepath_id IN (SELECT file_id FROM filemetadata) ORDER BY rowid LIMIT 1"
+        ).fetchone()
+        before = get_franchise_stats(conn, folder)
+
+        conn.execute("UPDATE filemetadata SET runtime = '999 min', imdbRating = '9.9', released = '01 Jan 1900' WHERE file_id = ?", (file_id,))
+        conn.execute("DELETE FROM filemetadata WHERE file_id = (SELECT MAX(file_id) FROM filemetadata)")
+        conn.execute("DELETE FROM filedetails WHERE file_id = (SELECT MIN(file_id) FROM filedetails)")
+        conn.execute("UPDATE filesteps SET parent = ? WHERE rowid = (SELECT MAX(rowid) FROM filesteps)", (folder,))
+
+    conn = get_connection(database, readonly=True)
+    maintained = all_stats(conn)
+    assert maintained[folder]["release"] == "01 Jan 1900"
+    assert maintained[folder]["runtime"] > before["runtime"]
+
+    with writer(database) as conn:
+        rebuild_franchise_stats(conn)
+    assert all_stats(get_connection(database, readonly=True)) == maintained